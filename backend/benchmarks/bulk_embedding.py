@@ -0,0 +1,73 @@
+"""
+Benchmark sharded bulk embedding.
+Reports chunks per second for each worker count (and threads per worker)
+using ShardedEmbeddings, so ingestion nodes can be sized for backfills.
+Worker start-up and model loading are excluded by a warm-up pass.
+
+Usage (from the backend directory):
+    python -m benchmarks.bulk_embedding [--pdf path/to/datasheet.pdf] [--chunks 5000] [--workers 1 2 4 8] [--threads 1]
+"""
+
+import argparse
+import os
+import time
+from typing import List
+
+from config import get_settings
+from services.bulk_embedding import ShardedEmbeddings
+from services.chunking import ChunkSplitter
+
+def load_chunks(pdf_path: str, count: int) -> List[str]:
+    """Chunks of a PDF's text layer (as ingestion would split them), or synthetic ones, repeated up to count."""
+    chunks: List[str] = []
+    if pdf_path:
+        import fitz  # PyMuPDF
+        splitter = ChunkSplitter()
+        with fitz.open(pdf_path) as pdf_document:
+            for page in pdf_document:
+                chunks.extend(unit for unit, _ in splitter.split_text(page.get_text()))
+    if not chunks:
+        chunks = [
+            f"Connector housing {i}: {i % 24 + 1} cavities, pitch 2.54 mm, sealed, operating temperature "
+            f"-40 to 125 °C, contact plating gold over nickel, mating cycles {10 + i % 40}."
+            for i in range(500)
+        ]
+    # Make every chunk unique so no layer can shortcut repeated texts
+    return [f"{chunks[i % len(chunks)]} [{i}]" for i in range(count)]
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Measure bulk embedding throughput per worker count.")
+    parser.add_argument("--pdf", help="PDF whose text layer supplies the chunks (default: synthetic)")
+    parser.add_argument("--chunks", type=int, default=5000, help="Number of chunks to embed")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, os.cpu_count() or 1],
+                        help="Worker counts to compare")
+    parser.add_argument("--threads", type=int, default=settings.BULK_EMBEDDING_THREADS_PER_WORKER,
+                        help="Threads per worker")
+    parser.add_argument("--backend", default=settings.EMBEDDING_BACKEND if settings.EMBEDDING_BACKEND == "torch" else
+                        ("onnx-int8" if settings.EMBEDDING_ONNX_QUANTIZE else "onnx-fp32"),
+                        choices=["torch", "onnx-fp32", "onnx-int8"], help="Backend the workers load")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.pdf, args.chunks)
+    print(f"{'workers':>8}{'threads':>9}{'chunks/s':>11}{'speedup':>9}")
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        embeddings = ShardedEmbeddings(
+            workers=workers,
+            threads_per_worker=args.threads,
+            shard_size=settings.BULK_EMBEDDING_SHARD_SIZE,
+            backend=args.backend
+        )
+        try:
+            embeddings.start()
+            start = time.perf_counter()
+            embeddings.embed_documents(chunks)
+            rate = len(chunks) / (time.perf_counter() - start)
+        finally:
+            embeddings.close()
+        baseline = baseline or rate
+        print(f"{workers:>8}{args.threads:>9}{rate:>11.1f}{rate / baseline:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
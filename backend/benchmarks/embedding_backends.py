@@ -0,0 +1,129 @@
+"""
+Benchmark embedding backends on CPU.
+Reports load time, sentences per second, peak RSS and cosine agreement with
+the torch backend for sentence-transformers (torch) and the fp32 and int8
+ONNX exports of EMBEDDING_MODEL_NAME. Each backend runs in its own process so
+RSS figures are not mixed.
+
+Usage (from the backend directory):
+    python -m benchmarks.embedding_backends [--pdf path/to/datasheet.pdf] [--sentences 2000]
+"""
+
+import argparse
+import multiprocessing
+import re
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from config import get_settings
+from services.onnx_embeddings import cosine_agreement, load_onnx_embeddings
+from utils.misc import format_file_size
+
+BACKENDS = ("torch", "onnx-fp32", "onnx-int8")
+PARITY_SENTENCES = 200
+
+def load_sentences(pdf_path: Optional[str], count: int) -> List[str]:
+    """Sentences from a PDF's text layer, or synthetic datasheet lines, repeated up to count."""
+    sentences: List[str] = []
+    if pdf_path:
+        import fitz  # PyMuPDF
+        with fitz.open(pdf_path) as pdf_document:
+            text = " ".join(page.get_text() for page in pdf_document)
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n{2,}", text) if len(s.strip()) > 20]
+    if not sentences:
+        sentences = [
+            f"Part {i:05d}: {cavities} cavities, pitch {pitch} mm, operating temperature -40 to {temp} °C, "
+            f"contact plating {plating}, housing PA66 color {color}."
+            for i, (cavities, pitch, temp, plating, color) in enumerate(
+                (c, p, t, pl, col)
+                for c in (2, 4, 8, 12, 16, 24)
+                for p in (1.5, 2.54, 3.5)
+                for t in (85, 105, 125, 150)
+                for pl in ("tin", "gold", "silver")
+                for col in ("black", "natural", "grey")
+            )
+        ]
+    return [sentences[i % len(sentences)] for i in range(count)]
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is reported in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def run_backend(backend: str, sentences: List[str], results: Any) -> None:
+    """Load one backend, embed the sentences and report timing and memory (runs in a child process)."""
+    settings = get_settings()
+    baseline_rss = peak_rss_bytes()
+    start = time.perf_counter()
+    if backend == "torch":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(
+            model_name=settings.EMBEDDING_MODEL_NAME,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={
+                'normalize_embeddings': settings.NORMALIZE_EMBEDDINGS,
+                'batch_size': settings.EMBEDDING_BATCH_SIZE
+            }
+        )
+    else:
+        embeddings = load_onnx_embeddings(
+            model_name=settings.EMBEDDING_MODEL_NAME,
+            base_dir=settings.EMBEDDING_ONNX_DIR,
+            normalize=settings.NORMALIZE_EMBEDDINGS,
+            quantized=backend == "onnx-int8",
+            min_cosine=0.0,  # Agreement is reported below rather than enforced
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            num_threads=settings.EMBEDDING_ONNX_THREADS
+        )
+    load_seconds = time.perf_counter() - start
+
+    embeddings.embed_documents(sentences[:8])  # Warm up
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(sentences)
+    embed_seconds = time.perf_counter() - start
+
+    results.put({
+        "backend": backend,
+        "load_s": load_seconds,
+        "sentences_per_s": len(sentences) / embed_seconds,
+        "peak_rss": peak_rss_bytes(),
+        "model_rss": peak_rss_bytes() - baseline_rss,
+        "parity_vectors": vectors[:PARITY_SENTENCES],
+    })
+
+def benchmark_backend(backend: str, sentences: List[str]) -> Dict[str, Any]:
+    """Run one backend in a fresh process and collect its stats."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_backend, args=(backend, sentences, results))
+    process.start()
+    stats = results.get()
+    process.join()
+    return stats
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare torch and ONNX embedding backends on CPU.")
+    parser.add_argument("--pdf", help="PDF whose text layer supplies the sentences (default: synthetic)")
+    parser.add_argument("--sentences", type=int, default=2000, help="Number of sentences to embed")
+    parser.add_argument("--backends", nargs="*", default=list(BACKENDS), choices=BACKENDS,
+                        help="Backends to compare (default: all)")
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.pdf, args.sentences)
+    all_stats = [benchmark_backend(backend, sentences) for backend in args.backends]
+    reference = next((s["parity_vectors"] for s in all_stats if s["backend"] == "torch"), None)
+
+    print(f"{'backend':<12}{'load s':>8}{'sent/s':>10}{'peak RSS':>12}{'model RSS':>12}{'min cos':>9}{'mean cos':>10}")
+    for stats in all_stats:
+        agreement = cosine_agreement(reference, stats["parity_vectors"]) if reference else None
+        print(
+            f"{stats['backend']:<12}{stats['load_s']:>8.1f}{stats['sentences_per_s']:>10.1f}"
+            f"{format_file_size(stats['peak_rss']):>12}{format_file_size(stats['model_rss']):>12}"
+            f"{agreement['min_cosine'] if agreement else float('nan'):>9.4f}"
+            f"{agreement['mean_cosine'] if agreement else float('nan'):>10.4f}"
+        )
+
+if __name__ == "__main__":
+    main()
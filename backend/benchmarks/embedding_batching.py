@@ -0,0 +1,83 @@
+"""
+Benchmark micro-batched embedding under concurrent load.
+Compares texts per second when many coroutines embed small inputs directly
+against the same load routed through BatchingEmbeddings, and against one
+large batch (the model's best-case throughput).
+
+Usage (from the backend directory):
+    python -m benchmarks.embedding_batching [--callers 64] [--texts-per-call 2] [--rounds 10]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from config import get_settings
+from services.embedding_batcher import BatchingEmbeddings
+
+def make_texts(count: int) -> List[str]:
+    return [f"Extract information about attribute {i} for part number {1000 + i}" for i in range(count)]
+
+async def run_load(embed, callers: int, texts_per_call: int, rounds: int) -> float:
+    """Run callers coroutines, each embedding texts_per_call texts rounds times; return texts/sec."""
+    texts = make_texts(texts_per_call)
+
+    async def caller() -> None:
+        for _ in range(rounds):
+            await embed(texts)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(callers)))
+    return callers * rounds * texts_per_call / (time.perf_counter() - start)
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Compare direct and micro-batched embedding under concurrent load.")
+    parser.add_argument("--callers", type=int, default=64, help="Concurrent coroutines")
+    parser.add_argument("--texts-per-call", type=int, default=2, help="Texts per embedding call")
+    parser.add_argument("--rounds", type=int, default=10, help="Calls per coroutine")
+    args = parser.parse_args()
+
+    model = HuggingFaceEmbeddings(
+        model_name=settings.EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': settings.EMBEDDING_DEVICE},
+        encode_kwargs={
+            'normalize_embeddings': settings.NORMALIZE_EMBEDDINGS,
+            'batch_size': settings.EMBEDDING_BATCH_SIZE
+        }
+    )
+    total = args.callers * args.rounds * args.texts_per_call
+    model.embed_documents(make_texts(8))  # Warm up
+
+    start = time.perf_counter()
+    model.embed_documents(make_texts(total))
+    best = total / (time.perf_counter() - start)
+
+    direct = asyncio.run(run_load(
+        lambda texts: asyncio.to_thread(model.embed_documents, texts),
+        args.callers, args.texts_per_call, args.rounds
+    ))
+
+    batcher = BatchingEmbeddings(
+        model,
+        max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS
+    )
+    batched = asyncio.run(run_load(batcher.aembed_documents, args.callers, args.texts_per_call, args.rounds))
+    stats: Dict[str, Any] = batcher.stats()
+    batcher.close()
+
+    print(f"{'mode':<14}{'texts/s':>10}{'of best':>9}")
+    for mode, rate in (("single batch", best), ("direct", direct), ("micro-batched", batched)):
+        print(f"{mode:<14}{rate:>10.1f}{rate / best:>9.0%}")
+    print(
+        f"\nbatches: {stats['batches']}, avg texts/batch: {stats['avg_batch_texts']:.1f}, "
+        f"max texts/batch: {stats['max_batch_texts']}, avg queue wait: {stats['avg_queue_wait_ms']:.1f}ms, "
+        f"max queue wait: {stats['max_queue_wait_ms']:.1f}ms"
+    )
+
+if __name__ == "__main__":
+    main()
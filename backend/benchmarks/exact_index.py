@@ -0,0 +1,109 @@
+"""
+Benchmark single-document retrieval: in-memory exact index vs Chroma.
+For documents of 10 to 10,000 chunks, reports the time to index the chunks
+and to answer one batch of attribute queries, both with ExactIndex and with a
+Chroma collection that also holds other documents' chunks (so the query has
+to filter by doc_id, as in production). Random unit vectors of the embedding
+model's dimension stand in for real embeddings.
+
+Usage (from the backend directory):
+    python -m benchmarks.exact_index [--sizes 10 100 1000 10000] [--other-chunks 10000] [--queries 26]
+"""
+
+import argparse
+import tempfile
+import time
+from statistics import median
+from typing import Dict, List
+
+import chromadb
+import numpy as np
+from langchain.docstore.document import Document
+
+from config import get_settings
+from services.exact_index import ExactIndex, normalize_rows
+
+DIMENSION = 384  # all-MiniLM-L6-v2
+REPEATS = 5
+
+def random_vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    return normalize_rows(rng.standard_normal((count, DIMENSION)).astype(np.float32))
+
+def add_in_batches(collection, ids: List[str], vectors: np.ndarray, doc_id: str, batch_size: int) -> None:
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        collection.add(
+            ids=ids[start:end],
+            embeddings=vectors[start:end].tolist(),
+            documents=[f"chunk {i}" for i in range(start, min(end, len(ids)))],
+            metadatas=[{"doc_id": doc_id}] * len(ids[start:end])
+        )
+
+def benchmark_size(size: int, other_chunks: int, num_queries: int, k: int, batch_size: int) -> Dict[str, float]:
+    rng = np.random.default_rng(size)
+    vectors = random_vectors(rng, size)
+    queries = random_vectors(rng, num_queries)
+
+    # In-memory exact index
+    start = time.perf_counter()
+    index = ExactIndex(vectors, [Document(page_content=f"chunk {i}") for i in range(size)])
+    exact_index_ms = (time.perf_counter() - start) * 1000
+    exact_query_times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        exact_hits = index.search(queries, k)
+        exact_query_times.append(time.perf_counter() - start)
+
+    # Persistent Chroma collection shared with other documents
+    with tempfile.TemporaryDirectory() as persist_directory:
+        client = chromadb.PersistentClient(path=persist_directory)
+        collection = client.create_collection("benchmark")
+        if other_chunks:
+            add_in_batches(collection, [f"other:{i}" for i in range(other_chunks)],
+                           random_vectors(rng, other_chunks), "other", batch_size)
+        start = time.perf_counter()
+        add_in_batches(collection, [f"doc:{i}" for i in range(size)], vectors, "doc", batch_size)
+        chroma_index_ms = (time.perf_counter() - start) * 1000
+        chroma_query_times = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            results = collection.query(
+                query_embeddings=queries.tolist(), n_results=min(k, size),
+                where={"doc_id": "doc"}, include=["documents", "distances"]
+            )
+            chroma_query_times.append(time.perf_counter() - start)
+
+    # Share of the exact top-k that Chroma's approximate search also returned
+    overlap = [
+        len({doc.page_content for doc, _ in exact} & set(chroma)) / max(1, len(exact))
+        for exact, chroma in zip(exact_hits, results["documents"])
+    ]
+    return {
+        "size": size,
+        "exact_index_ms": exact_index_ms,
+        "exact_query_ms": median(exact_query_times) * 1000,
+        "chroma_index_ms": chroma_index_ms,
+        "chroma_query_ms": median(chroma_query_times) * 1000,
+        "chroma_recall": float(np.mean(overlap)),
+    }
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Compare in-memory exact search with Chroma for one document.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 100, 1000, 10000], help="Chunks per document")
+    parser.add_argument("--other-chunks", type=int, default=10000, help="Chunks of other documents in the collection")
+    parser.add_argument("--queries", type=int, default=26, help="Queries per batch (one per attribute)")
+    parser.add_argument("--k", type=int, default=settings.RETRIEVER_K * settings.PARENT_FETCH_FACTOR,
+                        help="Results per query")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8}{'exact idx ms':>14}{'exact q ms':>12}{'chroma idx ms':>15}{'chroma q ms':>13}{'chroma recall':>15}")
+    for size in args.sizes:
+        stats = benchmark_size(size, args.other_chunks, args.queries, args.k, settings.RAG_UPSERT_BATCH_SIZE)
+        print(
+            f"{stats['size']:>8}{stats['exact_index_ms']:>14.2f}{stats['exact_query_ms']:>12.2f}"
+            f"{stats['chroma_index_ms']:>15.1f}{stats['chroma_query_ms']:>13.2f}{stats['chroma_recall']:>15.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark collection-wide search: memory-mapped flat store vs Chroma.
+Builds a corpus of random unit vectors in both stores, then opens each one in
+a fresh process and reports the cold open time, first and median query
+latency for a batch of queries, and how much the process's peak RSS grew.
+With --runs above 1, later flat store runs open against a warm page cache,
+as additional worker processes would. Mapped pages count towards RSS but are
+shared between processes rather than copied.
+
+Usage (from the backend directory):
+    python -m benchmarks.flat_store [--chunks 100000] [--queries 26] [--dtype float16] [--runs 3]
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from statistics import median
+from typing import Any, Dict
+
+import numpy as np
+
+from benchmarks.embedding_backends import peak_rss_bytes
+from benchmarks.exact_index import DIMENSION, random_vectors
+from config import get_settings
+from utils.misc import format_file_size
+
+REPEATS = 5
+STORES = ("flat", "chroma")
+
+def build_corpus(directory: str, chunks: int, dtype: str, batch_size: int) -> None:
+    """Write the same random corpus to a flat store and a Chroma collection under directory."""
+    import chromadb
+    from services.flat_store import FlatVectorStore
+
+    rng = np.random.default_rng(0)
+    flat_store = FlatVectorStore(os.path.join(directory, "flat"), dtype=dtype)
+    collection = chromadb.PersistentClient(path=os.path.join(directory, "chroma")).create_collection(
+        "benchmark", metadata={"hnsw:space": "cosine"}
+    )
+    for start in range(0, chunks, batch_size):
+        count = min(batch_size, chunks - start)
+        ids = [f"chunk:{i}" for i in range(start, start + count)]
+        vectors = random_vectors(rng, count)
+        documents = [f"chunk {i}" for i in range(start, start + count)]
+        metadatas = [{"doc_id": f"doc{i // 100}"} for i in range(start, start + count)]
+        flat_store.append(ids, vectors, documents, metadatas)
+        collection.add(ids=ids, embeddings=vectors.tolist(), documents=documents, metadatas=metadatas)
+    flat_store.close()
+
+def run_store(store: str, directory: str, num_queries: int, k: int, results: Any) -> None:
+    """Open one store, query it and report timing and memory (runs in a child process)."""
+    queries = random_vectors(np.random.default_rng(1), num_queries)
+    baseline_rss = peak_rss_bytes()
+    start = time.perf_counter()
+    if store == "flat":
+        from services.flat_store import FlatVectorStore
+        flat_store = FlatVectorStore(os.path.join(directory, "flat"))
+        search = lambda: flat_store.search(queries, k)
+    else:
+        import chromadb
+        collection = chromadb.PersistentClient(path=os.path.join(directory, "chroma")).get_collection("benchmark")
+        search = lambda: collection.query(query_embeddings=queries.tolist(), n_results=k,
+                                          include=["documents", "metadatas", "distances"])
+    open_seconds = time.perf_counter() - start
+
+    query_times = []
+    for _ in range(REPEATS + 1):
+        start = time.perf_counter()
+        search()
+        query_times.append(time.perf_counter() - start)
+
+    results.put({
+        "store": store,
+        "open_ms": open_seconds * 1000,
+        "first_query_ms": query_times[0] * 1000,
+        "query_ms": median(query_times[1:]) * 1000,
+        "rss": peak_rss_bytes() - baseline_rss,
+    })
+
+def benchmark_store(store: str, directory: str, num_queries: int, k: int) -> Dict[str, Any]:
+    """Run one store in a fresh process and collect its stats."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_store, args=(store, directory, num_queries, k, results))
+    process.start()
+    stats = results.get()
+    process.join()
+    return stats
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Compare the memory-mapped flat store with Chroma for corpus search.")
+    parser.add_argument("--chunks", type=int, default=100_000, help="Chunks in the corpus")
+    parser.add_argument("--queries", type=int, default=26, help="Queries per batch (one per attribute)")
+    parser.add_argument("--k", type=int, default=settings.RETRIEVER_K * settings.PARENT_FETCH_FACTOR,
+                        help="Results per query")
+    parser.add_argument("--dtype", default=settings.FLAT_STORE_DTYPE, choices=("float16", "float32"),
+                        help="Flat store storage type")
+    parser.add_argument("--runs", type=int, default=1, help="Fresh processes per store")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        build_corpus(directory, args.chunks, args.dtype, settings.RAG_UPSERT_BATCH_SIZE)
+        print(f"Built {args.chunks} chunks of dimension {DIMENSION} in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'store':<8}{'open ms':>10}{'first q ms':>12}{'query ms':>10}{'RSS growth':>12}")
+        for store in STORES:
+            for _ in range(args.runs):
+                stats = benchmark_store(store, directory, args.queries, args.k)
+                print(
+                    f"{stats['store']:<8}{stats['open_ms']:>10.1f}{stats['first_query_ms']:>12.1f}"
+                    f"{stats['query_ms']:>10.1f}{format_file_size(stats['rss']):>12}"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark quantized first-pass search: recall vs latency.
+Compares, on the same corpus and queries, the uncompressed baseline used by
+VectorStore.search (Chroma over full-precision vectors), an exact scan of the
+flat store, and int8 and binary first passes with exact re-scoring at several
+oversampling factors. Recall@k is measured against brute-force float32 search.
+
+The corpus is read from the configured Chroma collection with --collection,
+otherwise it is synthetic: clustered random vectors, which resemble real
+embeddings more closely than uniform ones (binary codes do much worse on
+uniform noise).
+
+Usage (from the backend directory):
+    python -m benchmarks.quantized_search [--chunks 200000] [--queries 26] [--oversample 1 2 4 8 16] [--collection]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from statistics import median
+from typing import Callable, Dict, List, Set, Tuple
+
+import numpy as np
+
+from benchmarks.exact_index import DIMENSION
+from config import get_settings
+from services.exact_index import normalize_rows, top_k
+from services.flat_store import FlatVectorStore, SUPPORTED_QUANTIZATIONS
+from utils.misc import format_file_size
+
+REPEATS = 5
+CLUSTERS = 500
+
+def synthetic_corpus(chunks: int, num_queries: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors, with queries drawn near corpus points."""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((CLUSTERS, DIMENSION)).astype(np.float32)
+    corpus = centers[rng.integers(0, CLUSTERS, chunks)] + 0.6 * rng.standard_normal((chunks, DIMENSION)).astype(np.float32)
+    queries = corpus[rng.integers(0, chunks, num_queries)] + 0.4 * rng.standard_normal((num_queries, DIMENSION)).astype(np.float32)
+    return normalize_rows(corpus), normalize_rows(queries)
+
+def collection_corpus(num_queries: int, batch_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectors of the configured Chroma collection; queries are held-out perturbed copies of stored chunks."""
+    import chromadb
+    settings = get_settings()
+    collection = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY).get_collection(settings.COLLECTION_NAME)
+    vectors: List[List[float]] = []
+    while True:
+        page = collection.get(limit=batch_size, offset=len(vectors), include=["embeddings"])
+        if not page["ids"]:
+            break
+        vectors.extend(page["embeddings"])
+    corpus = normalize_rows(np.asarray(vectors, dtype=np.float32))
+    rng = np.random.default_rng(0)
+    queries = corpus[rng.integers(0, len(corpus), num_queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    return corpus, normalize_rows(queries)
+
+def timed(search: Callable[[], List[Set[int]]]) -> Tuple[List[Set[int]], float]:
+    search()  # Warm up
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        hits = search()
+        times.append(time.perf_counter() - start)
+    return hits, median(times) * 1000
+
+def recall(truth: List[Set[int]], hits: List[Set[int]]) -> float:
+    return float(np.mean([len(t & h) / max(1, len(t)) for t, h in zip(truth, hits)]))
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Recall vs latency of quantized first-pass search with exact re-scoring.")
+    parser.add_argument("--chunks", type=int, default=200_000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=26, help="Queries per batch (one per attribute)")
+    parser.add_argument("--k", type=int, default=settings.RETRIEVER_K * settings.PARENT_FETCH_FACTOR,
+                        help="Results per query")
+    parser.add_argument("--oversample", type=float, nargs="*", default=[1, 2, 4, 8, 16],
+                        help="Oversampling factors to try")
+    parser.add_argument("--dtype", default=settings.FLAT_STORE_DTYPE, choices=("float16", "float32"),
+                        help="Flat store storage type for the full-precision vectors")
+    parser.add_argument("--collection", action="store_true", help="Use the configured Chroma collection as corpus")
+    args = parser.parse_args()
+
+    if args.collection:
+        corpus, queries = collection_corpus(args.queries, settings.RAG_UPSERT_BATCH_SIZE)
+    else:
+        corpus, queries = synthetic_corpus(args.chunks, args.queries)
+    _, truth_rows = top_k(queries @ corpus.T, args.k)
+    truth = [set(row.tolist()) for row in truth_rows]
+    print(f"{len(corpus)} chunks, {len(queries)} queries, k={args.k}")
+
+    rows: List[Dict] = []
+    with tempfile.TemporaryDirectory() as directory:
+        # Uncompressed baseline: what VectorStore.search queries
+        import chromadb
+        collection = chromadb.PersistentClient(path=os.path.join(directory, "chroma")).create_collection(
+            "benchmark", metadata={"hnsw:space": "cosine"}
+        )
+        for start in range(0, len(corpus), settings.RAG_UPSERT_BATCH_SIZE):
+            end = min(start + settings.RAG_UPSERT_BATCH_SIZE, len(corpus))
+            collection.add(ids=[str(i) for i in range(start, end)], embeddings=corpus[start:end].tolist())
+        hits, ms = timed(lambda: [
+            {int(i) for i in ids}
+            for ids in collection.query(query_embeddings=queries.tolist(), n_results=args.k, include=[])["ids"]
+        ])
+        rows.append({"method": "chroma (baseline)", "oversample": "-", "recall": recall(truth, hits), "ms": ms, "bytes": None})
+
+        flat_directory = os.path.join(directory, "flat")
+        store = FlatVectorStore(flat_directory, dtype=args.dtype, scan_rows=settings.FLAT_STORE_SCAN_ROWS)
+        store.append([str(i) for i in range(len(corpus))], corpus)
+        flat_search = lambda oversample=None: [
+            {int(hit["id"]) for hit in query_hits} for query_hits in store.search(queries, args.k, oversample)
+        ]
+        hits, ms = timed(flat_search)
+        rows.append({"method": f"flat {args.dtype}", "oversample": "-", "recall": recall(truth, hits), "ms": ms,
+                     "bytes": store.stats()["bytes"]})
+        store.close()
+
+        for quantization in SUPPORTED_QUANTIZATIONS:
+            store = FlatVectorStore(flat_directory, scan_rows=settings.FLAT_STORE_SCAN_ROWS, quantization=quantization)
+            for oversample in args.oversample:
+                hits, ms = timed(lambda: flat_search(oversample))
+                rows.append({"method": quantization, "oversample": f"{oversample:g}", "recall": recall(truth, hits),
+                             "ms": ms, "bytes": store.stats()["code_bytes"]})
+            store.close()
+
+    print(f"{'method':<20}{'oversample':>11}{'recall@k':>10}{'query ms':>10}{'scanned':>12}")
+    for row in rows:
+        scanned = format_file_size(row["bytes"]) if row["bytes"] is not None else "-"
+        print(f"{row['method']:<20}{row['oversample']:>11}{row['recall']:>10.3f}{row['ms']:>10.1f}{scanned:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark raster profiles for Vision OCR.
+Reports Base64 payload size and render/encode time per page for each profile
+in Settings.RASTER_PROFILES, so a deployment can pick RASTER_PROFILE.
+
+Usage (from the backend directory):
+    python -m benchmarks.raster_profiles path/to/datasheet.pdf [--pages 5] [--profiles fast balanced]
+"""
+
+import argparse
+import time
+from statistics import mean
+from typing import Dict, List, Any
+
+import fitz  # PyMuPDF
+
+from config import get_settings
+from services.rasterizer import encode_image, get_raster_profile, render_page_image, split_into_tiles
+from utils.misc import format_file_size
+
+def benchmark_profile(pdf_path: str, profile_name: str, max_pages: int) -> Dict[str, Any]:
+    """Rasterize up to max_pages pages with one profile and collect size/timing stats."""
+    profile = get_raster_profile(profile_name)
+    render_times: List[float] = []
+    encode_times: List[float] = []
+    payload_bytes: List[int] = []
+    tile_counts: List[int] = []
+
+    with fitz.open(pdf_path) as pdf_document:
+        for page_num in range(min(max_pages, len(pdf_document))):
+            page = pdf_document[page_num]
+
+            start = time.perf_counter()
+            image = render_page_image(page, profile)
+            render_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            tiles = split_into_tiles(image, profile)
+            payloads = [encode_image(tile, profile.image_format, profile.quality)[0] for tile in tiles]
+            encode_times.append(time.perf_counter() - start)
+
+            payload_bytes.append(sum(len(payload) for payload in payloads))
+            tile_counts.append(len(tiles))
+
+    return {
+        "profile": profile_name,
+        "pages": len(payload_bytes),
+        "avg_payload_bytes": mean(payload_bytes) if payload_bytes else 0,
+        "max_payload_bytes": max(payload_bytes, default=0),
+        "avg_render_ms": mean(render_times) * 1000 if render_times else 0,
+        "avg_encode_ms": mean(encode_times) * 1000 if encode_times else 0,
+        "avg_tiles": mean(tile_counts) if tile_counts else 0,
+    }
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Compare raster profiles for Vision OCR payloads.")
+    parser.add_argument("pdf_path", help="PDF to rasterize")
+    parser.add_argument("--pages", type=int, default=5, help="Maximum number of pages to rasterize")
+    parser.add_argument("--profiles", nargs="*", default=list(settings.RASTER_PROFILES),
+                        help="Profiles to compare (default: all configured)")
+    args = parser.parse_args()
+
+    print(f"{'profile':<16}{'pages':>6}{'avg payload':>14}{'max payload':>14}{'render ms':>11}{'encode ms':>11}{'tiles':>7}")
+    for profile_name in args.profiles:
+        stats = benchmark_profile(args.pdf_path, profile_name, args.pages)
+        print(
+            f"{stats['profile']:<16}{stats['pages']:>6}"
+            f"{format_file_size(stats['avg_payload_bytes']):>14}{format_file_size(stats['max_payload_bytes']):>14}"
+            f"{stats['avg_render_ms']:>11.1f}{stats['avg_encode_ms']:>11.1f}{stats['avg_tiles']:>7.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
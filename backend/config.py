@@ -22,21 +22,76 @@ class Settings(BaseSettings):
     
     # Vision Model Configuration
     VISION_MODEL_NAME: str = "mistral-small-latest"
+    OCR_MAX_CONCURRENT_PAGES_PER_DOC: int = 8  # Pages of one PDF in flight at once
+    OCR_MAX_CONCURRENT_PAGES: int = 16  # Pages in flight across all PDFs
+    RASTER_PROFILE: str = "high_fidelity"  # Key into RASTER_PROFILES used for Vision pages
+    RASTER_PROFILES: Dict[str, Dict[str, Any]] = {
+        # 300 DPI RGB PNG, the original rendering
+        "high_fidelity": {"dpi": 300, "grayscale": False, "image_format": "PNG"},
+        "balanced": {"dpi": 200, "grayscale": True, "image_format": "JPEG", "quality": 85},
+        "fast": {"dpi": 150, "grayscale": True, "image_format": "WEBP", "quality": 75},
+        # Dense pages are sent as overlapping horizontal strips of at most 1600px
+        "dense_tiled": {
+            "dpi": 250, "grayscale": True, "image_format": "JPEG", "quality": 85,
+            "tile_max_height": 1600, "tile_overlap": 64
+        },
+    }
+    RASTER_PROCESS_WORKERS: Optional[int] = None  # None = one per CPU, 0 = render in threads instead
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_DIR: str = "./ocr_cache"
+    OCR_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 512MB
+    OCR_CACHE_MAX_AGE_SECONDS: int = 30 * 24 * 3600  # 30 days
     
     # Embedding Configuration
     EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDING_DEVICE: str = "cpu"
     NORMALIZE_EMBEDDINGS: bool = True
     EMBEDDING_CACHE_DIR: Optional[str] = None
+    EMBEDDING_BACKEND: str = "torch"  # "torch" (sentence-transformers) or "onnx" (ONNX Runtime)
+    EMBEDDING_ONNX_DIR: str = "./onnx_models"  # Exported models, created on first use
+    EMBEDDING_ONNX_QUANTIZE: bool = True  # Serve the int8 dynamically quantized export
+    EMBEDDING_ONNX_MIN_COSINE: float = 0.99  # Parity with torch required to use the export
+    EMBEDDING_ONNX_THREADS: Optional[int] = None  # None = ONNX Runtime default
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_MICRO_BATCHING_ENABLED: bool = True  # Merge concurrent embedding calls into shared batches
+    EMBEDDING_MAX_BATCH_SIZE: int = 64  # Texts after which a shared batch runs immediately
+    EMBEDDING_MAX_WAIT_MS: float = 5.0  # Longest a shared batch waits for more requests
+    BULK_EMBEDDING_WORKERS: int = 0  # Worker processes for bulk create_embeddings calls, 0 = off
+    BULK_EMBEDDING_THREADS_PER_WORKER: int = 1  # Threads each worker's model may use
+    BULK_EMBEDDING_SHARD_SIZE: int = 256  # Texts per worker task
+    BULK_EMBEDDING_MIN_TEXTS: int = 1000  # Smaller calls embed in-process
+    EMBEDDING_VECTOR_CACHE_ENABLED: bool = True  # Reuse vectors of chunks embedded before
+    EMBEDDING_VECTOR_CACHE_PATH: str = "./embedding_cache.sqlite3"
+    EMBEDDING_VECTOR_CACHE_MAX_ENTRIES: int = 500_000
     
     # Vector Store Configuration
     CHROMA_PERSIST_DIRECTORY: Optional[str] = "./chroma_db_prod"
     COLLECTION_NAME: str = "pdf_qa_prod_collection"
+    DOCUMENT_REGISTRY_PATH: str = "./document_registry.sqlite3"
+    EXACT_INDEX_ENABLED: bool = True  # Search single-document retrieval in memory instead of in Chroma
+    EXACT_INDEX_MAX_DOCUMENTS: int = 32  # Per-document indexes kept in memory
+    EXACT_INDEX_MAX_CHUNKS: int = 20_000  # Larger documents are searched in Chroma
+    ATTRIBUTE_ROUTING_ENABLED: bool = True  # Precompute each document's best chunks per extraction attribute at ingest
+    STRUCTURED_EXTRACTION_ENABLED: bool = True  # Answer attributes found literally in datasheet tables and key/value pairs without the LLM
+    FLAT_STORE_ENABLED: bool = False  # Also keep corpus vectors in a memory-mapped flat store and search it for collection-wide retrieval
+    FLAT_STORE_DIR: str = "./flat_store"
+    FLAT_STORE_DTYPE: str = "float16"  # float16 halves the file size and page cache footprint; float32 for exact stored vectors
+    FLAT_STORE_SCAN_ROWS: int = 65536  # Rows scored per block during a flat store search
+    FLAT_STORE_QUANTIZATION: Optional[str] = None  # "int8" or "binary" codes for a compressed first pass, re-scored exactly
+    FLAT_STORE_OVERSAMPLE: float = 4.0  # First-pass candidates per result re-scored with full vectors
     
     # Text Processing Configuration
-    CHUNK_SIZE: int = 5000
+    CHUNK_SIZE: int = 5000  # Chunk size in "characters" chunking mode
     CHUNK_OVERLAP: int = 75
-    RETRIEVER_K: int = 4
+    CHUNKING_MODE: str = "parent_child"  # "parent_child" (token-sized units linked to passages) or "characters"
+    PARENT_CHUNK_SIZE: int = 2000  # Characters per parent passage sent to the LLM
+    EMBEDDING_CHUNK_TOKENS: int = 200  # Embedding unit size in model tokens (all-MiniLM-L6-v2 reads 256)
+    EMBEDDING_CHUNK_OVERLAP_TOKENS: int = 20
+    PARENT_FETCH_FACTOR: int = 3  # Units fetched per requested passage, since units share parents
+    RETRIEVER_K: int = 4  # Maximum chunks retrieved per query
+    RETRIEVER_MIN_K: int = 1  # Chunks kept even when below the score threshold
+    RETRIEVER_SCORE_THRESHOLD: float = 0.25  # Minimum cosine similarity for further chunks
+    RAG_UPSERT_BATCH_SIZE: int = 256  # Chunks embedded and written per Chroma upsert
     
     # Health Check Configuration
     HEALTH_CHECK_TIMEOUT: int = 300  # 5 minutes
@@ -48,8 +103,16 @@ class Settings(BaseSettings):
     ATTRIBUTE_CHUNK_SIZE: int = 1000
     
     # PDF Processing Settings
+    PDF_TEXT_LAYER_ENABLED: bool = True  # Read good embedded text directly instead of calling Vision
+    TEXT_LAYER_MIN_CHARS: int = 200  # Non-whitespace characters a page needs to skip Vision
+    TEXT_LAYER_MIN_GLYPH_RATIO: float = 0.95  # Share of characters mapped to real glyphs
+    TEXT_LAYER_MAX_IMAGE_COVERAGE: float = 0.5  # Max share of the page covered by raster images
+    TEXT_LAYER_MAX_DRAWINGS: int = 500  # More vector paths than this means a drawing-heavy page
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: set = {"pdf"}
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB read/write chunks when streaming uploads
+    UPLOAD_INFLIGHT_BYTES_BUDGET: int = 200 * 1024 * 1024  # 200MB of uploads processed at once
+    UPLOAD_TEMP_DIR: Optional[str] = None  # None = system temp directory
     
     # Web Scraping Configuration
     SUPPLIER_URLS: List[str] = [
@@ -60,11 +123,21 @@ class Settings(BaseSettings):
     SCRAPING_TIMEOUT: int = 5000  # 5 seconds
     SCRAPING_RETRIES: int = 3
     SCRAPING_DELAY: float = 1.0  # 1 second between retries
+    SCRAPE_CACHE_TTL: int = 3600  # 1 hour per scraped part number
+    SCRAPE_CACHE_NEGATIVE_TTL: int = 300  # 5 minutes when no supplier page was found
+    SCRAPE_CACHE_MAX_ENTRIES: int = 256
     
     # Extraction Configuration
     EXTRACTION_TIMEOUT: int = 30  # 30 seconds per extraction
     EXTRACTION_RETRIES: int = 2
     EXTRACTION_DELAY: float = 0.5  # 0.5 seconds between retries
+    BATCH_EXTRACTION_ENABLED: bool = True  # One LLM call per stage for all attributes
+    BATCH_EXTRACTION_MAX_CONTEXT_CHUNKS: int = 12  # Union of per-attribute hits sent in one PDF prompt
+    CONTEXT_PACKING_ENABLED: bool = True  # Dedupe, rank and trim PDF context to a token budget
+    CONTEXT_TOKEN_BUDGET: int = 3000  # Chunk tokens in a single-attribute PDF prompt
+    BATCH_CONTEXT_TOKEN_BUDGET: int = 8000  # Chunk tokens in a batch PDF prompt
+    # Per-model overrides keyed by LLM_MODEL_NAME, e.g. {"llama3-8b-8192": {"single": 2000, "batch": 5000}}
+    CONTEXT_TOKEN_BUDGETS: Dict[str, Dict[str, int]] = {}
     
     # Metrics Configuration
     METRICS_PRECISION: int = 2  # Decimal places for metrics
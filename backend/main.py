@@ -1,15 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import extract, rag
+from services.registry import ServiceRegistry
 from config import get_settings
 
 # Get settings
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared services once at startup and release them at shutdown."""
+    services = ServiceRegistry()
+    await services.startup()
+    app.state.services = services
+    try:
+        yield
+    finally:
+        await services.shutdown()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API for document processing, information extraction, and RAG-based retrieval",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS with specific settings
@@ -8,12 +8,17 @@ from datetime import datetime
 import os
 from pathlib import Path
 import time
+import weakref
 
 from services.llm_interface import LLMInterface
 from services.pdf_processor import PDFProcessor
 from services.vector_store import VectorStore
 from services.web_scraper import WebScraper
+from services.registry import ServiceRegistry
+from services.structured_extractor import Field, StructuredExtractor, parse_pages
 from config import get_settings
+from utils.misc import gather_with_concurrency, generate_file_id
+from utils.uploads import spooled_pdf_upload
 
 # Import prompts
 from prompts.extraction_prompts import get_prompt as get_pdf_prompt
@@ -21,6 +26,7 @@ from prompts.extraction_prompts_web import get_prompt as get_web_prompt
 
 router = APIRouter()
 settings = get_settings()
+structured_extractor = StructuredExtractor()
 
 # Pydantic models for request/response
 class ExtractionRequest(BaseModel):
@@ -72,18 +78,21 @@ class MetricsResponse(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
-# Service dependencies
-def get_llm_service():
-    return LLMInterface()
+# Service dependencies (app-lifetime instances built by the lifespan in main.py)
+def get_services(request: Request) -> ServiceRegistry:
+    return request.app.state.services
 
-def get_pdf_service():
-    return PDFProcessor()
+def get_llm_service(services: ServiceRegistry = Depends(get_services)) -> LLMInterface:
+    return services.llm
 
-def get_vector_store():
-    return VectorStore()
+def get_pdf_service(services: ServiceRegistry = Depends(get_services)) -> PDFProcessor:
+    return services.pdf
 
-def get_web_scraper():
-    return WebScraper()
+def get_vector_store(services: ServiceRegistry = Depends(get_services)) -> VectorStore:
+    return services.vector_store
+
+def get_web_scraper(services: ServiceRegistry = Depends(get_services)) -> WebScraper:
+    return services.web_scraper
 
 # Define the prompts dictionary using the prompt functions
 PROMPTS = {
@@ -218,129 +227,347 @@ async def process_file(
         # Parse attributes if provided
         attribute_list = json.loads(attributes) if attributes else None
         
-        # Save the uploaded file temporarily
-        temp_path = f"temp_{file.filename}"
-        try:
-            with open(temp_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
-            
-            # Process the file
+        if not (file.filename or "").lower().endswith(".pdf"):
+            # Non-PDF input: nothing to ingest, extraction is web-only
             results = await process_single_file(
-                file_path=temp_path,
+                file_path=None,
                 part_number=part_number,
                 llm_service=llm_service,
                 pdf_service=pdf_service,
                 vector_store=vector_store,
-                web_scraper=web_scraper
+                web_scraper=web_scraper,
+                attribute_names=attribute_list
             )
-            
-            # Filter results if specific attributes were requested
-            if attribute_list:
-                results = [r for r in results if r.attribute in attribute_list]
-            
-            return results
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        else:
+            # Stream the upload to a unique temporary file, removed on exit
+            async with spooled_pdf_upload(file) as upload:
+                results = await process_single_file(
+                    file_path=upload.path,
+                    part_number=part_number,
+                    llm_service=llm_service,
+                    pdf_service=pdf_service,
+                    vector_store=vector_store,
+                    web_scraper=web_scraper,
+                    attribute_names=attribute_list,
+                    file_name=upload.filename,
+                    document_id=upload.sha256
+                )
+        
+        # Filter results if specific attributes were requested
+        if attribute_list:
+            results = [r for r in results if r.attribute in attribute_list]
+        
+        return results
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing file: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 async def process_single_file(
-    file_path: str,
+    file_path: Optional[str],
     part_number: Optional[str],
     llm_service: LLMInterface,
     pdf_service: PDFProcessor,
     vector_store: VectorStore,
-    web_scraper: WebScraper
+    web_scraper: WebScraper,
+    attribute_names: Optional[List[str]] = None,
+    file_name: Optional[str] = None,
+    document_id: Optional[str] = None
 ) -> List[ExtractionResult]:
     """
     Process a single file and extract attributes using all available services:
     1. PDFProcessor: Process PDF with Mistral Vision
     2. VectorStore: Store and retrieve PDF chunks
     3. LLMInterface: Handle web scraping and LLM extraction
-    """
-    results = []
-    start_time = time.time()
     
+    Without a PDF file_path, extraction is web-only. file_name is the original
+    upload name recorded as the chunks' source (defaults to the path's basename).
+    document_id is the PDF content hash; it is computed from the file if omitted.
+    """
     try:
+        retriever = None
+        attribute_contexts = None
+        names = select_attributes(attribute_names)
+        structured_results: Dict[str, ExtractionResult] = {}
+        
         # Stage 1: Process PDF using PDFProcessor
-        if file_path.endswith('.pdf'):
+        if file_path and file_path.endswith('.pdf'):
+            document_id = document_id or generate_file_id(file_path)
+            retriever = await ingest_pdf(
+                file_path=file_path,
+                file_name=file_name or os.path.basename(file_path),
+                document_id=document_id,
+                pdf_service=pdf_service,
+                vector_store=vector_store
+            )
+            # Attributes stated literally in the datasheet's tables need no LLM call
+            structured_results = await extract_structured_attributes(vector_store, document_id, names)
+            names = [name for name in names if name not in structured_results]
+            if names:
+                attribute_contexts = await retrieve_attribute_contexts(
+                    vector_store, document_id, names, part_number
+                )
+        
+        # Stage 2: Extract the remaining attributes using LLMInterface's two-stage approach.
+        # Without a retriever (non-PDF input) extraction is web-only.
+        llm_results: List[ExtractionResult] = []
+        if names and settings.BATCH_EXTRACTION_ENABLED:
+            llm_results = await extract_attributes_batched(
+                llm_service=llm_service,
+                part_number=part_number,
+                retriever=retriever,
+                attribute_names=names,
+                attribute_contexts=attribute_contexts
+            )
+        elif names:
+            llm_results = await extract_attributes_concurrently(
+                llm_service=llm_service,
+                part_number=part_number,
+                retriever=retriever,
+                attribute_names=names,
+                attribute_contexts=attribute_contexts
+            )
+        
+        if not structured_results:
+            return llm_results
+        # Keep the order of PROMPTS across both sources
+        results = {result.attribute: result for result in llm_results}
+        results.update(structured_results)
+        return [results[name] for name in PROMPTS if name in results]
+        
+    except Exception as e:
+        logger.error(f"Error processing file {file_path}: {e}")
+        raise
+
+# Per-document locks so concurrent uploads of the same bytes are ingested once
+_ingest_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+async def ingest_pdf(
+    file_path: str,
+    file_name: str,
+    document_id: str,
+    pdf_service: PDFProcessor,
+    vector_store: VectorStore
+) -> Any:
+    """
+    Return a retriever scoped to one PDF, indexing it only if its bytes are new.
+    
+    A document already in the registry is reused without OCR or embedding.
+    Either way, the document's attribute routes are brought up to date.
+    """
+    lock = _ingest_locks.get(document_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _ingest_locks[document_id] = lock
+    
+    async with lock:
+        indexed = await asyncio.to_thread(vector_store.get_indexed_document, document_id)
+        if indexed:
+            logger.info(f"Reusing indexed document {document_id[:12]} ({indexed['filename']}, {indexed['chunk_count']} chunks)")
+            retriever = vector_store.get_document_retriever(document_id)
+        else:
             # Process PDF using Mistral Vision
-            documents = await pdf_service.process_single_pdf(file_path, os.path.basename(file_path))
+            pages = await pdf_service.extract_pages(file_path, file_name)
+            documents = pdf_service.split_pages(pages, file_name)
             if not documents:
                 raise ValueError("No text could be extracted from PDF")
             
-            # Create vector store with PDF chunks
-            retriever = vector_store.create_retriever(documents)
+            # Key/value index for the structured fast path, registered together with
+            # the chunks so a reused document always has its fields
+            fields = parse_pages(pages)
+            
+            # Create vector store with PDF chunks; embedding runs off the event loop so
+            # other requests can keep adding to the shared embedding batches
+            retriever = await asyncio.to_thread(
+                vector_store.create_retriever, documents, doc_id=document_id, filename=file_name, fields=fields
+            )
             if not retriever:
                 raise ValueError("Failed to create vector store from PDF")
-            
-            # Stage 2: Extract attributes using LLMInterface's two-stage approach
-            for attribute, prompts in PROMPTS.items():
-                try:
-                    # Use LLMInterface for extraction (it handles web scraping internally)
-                    value, source, latency = await llm_service.extract_attribute(
-                        attribute_key=attribute,
-                        extraction_instructions=prompts['web'],  # Use web prompt as it's more specific
-                        part_number=part_number,
-                        retriever=retriever
-                    )
-                    
-                    # Create result with proper status flags
-                    result = ExtractionResult(
-                        attribute=attribute,
-                        value=value,
-                        source=source,
-                        latency=latency,
-                        is_success=value != "NOT FOUND",
-                        is_error=False,
-                        is_not_found=value == "NOT FOUND",
-                        is_rate_limit=False
-                    )
-                    results.append(result)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting {attribute}: {e}")
-                    continue
-        else:
-            # Handle non-PDF files (e.g., direct web URLs)
-            # Use LLMInterface's extract_attribute with no retriever for web-only processing
-            for attribute, prompts in PROMPTS.items():
-                try:
-                    value, source, latency = await llm_service.extract_attribute(
-                        attribute_key=attribute,
-                        extraction_instructions=prompts['web'],
-                        part_number=part_number,
-                        retriever=None  # No PDF fallback for web-only processing
-                    )
-                    
-                    result = ExtractionResult(
-                        attribute=attribute,
-                        value=value,
-                        source=source,
-                        latency=latency,
-                        is_success=value != "NOT FOUND",
-                        is_error=False,
-                        is_not_found=value == "NOT FOUND",
-                        is_rate_limit=False
-                    )
-                    results.append(result)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting {attribute}: {e}")
-                    continue
+            logger.info(f"Indexed {len(fields)} key/value fields for document {document_id[:12]}")
         
+        await route_attributes(vector_store, document_id)
+        return retriever
+
+def attribute_route_queries() -> Dict[str, str]:
+    """Retrieval query per known attribute, without a part number, used for ingest-time routing."""
+    return {name: LLMInterface.build_retrieval_query(name, None) for name in PROMPTS}
+
+async def route_attributes(vector_store: VectorStore, document_id: str) -> None:
+    """Precompute the document's best chunks for every attribute in PROMPTS, if not already current."""
+    if not settings.ATTRIBUTE_ROUTING_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(vector_store.ensure_attribute_routes, document_id, attribute_route_queries())
     except Exception as e:
-        logger.error(f"Error processing file {file_path}: {e}")
-        raise
+        # Extraction falls back to searching per request
+        logger.warning(f"Attribute routing failed for document {document_id[:12]}: {e}")
+
+async def extract_structured_attributes(
+    vector_store: VectorStore,
+    document_id: str,
+    names: List[str]
+) -> Dict[str, ExtractionResult]:
+    """
+    Answer attributes from the document's key/value fields, without an LLM.
     
+    Only attributes with a single unambiguous value under a known key are
+    answered; their results have source "structured".
+    """
+    if not settings.STRUCTURED_EXTRACTION_ENABLED or not names:
+        return {}
+    start_time = time.perf_counter()
+    try:
+        stored = await asyncio.to_thread(vector_store.document_registry.get_fields, document_id)
+        values = structured_extractor.extract([Field(*field) for field in stored], names)
+    except Exception as e:
+        logger.warning(f"Structured extraction failed for document {document_id[:12]}: {e}")
+        return {}
+    latency = time.perf_counter() - start_time
+    if values:
+        logger.info(f"Resolved {len(values)} of {len(names)} attributes from document fields: {sorted(values)}")
+    return {
+        name: build_extraction_result(name, value, "structured", latency)
+        for name, value in values.items()
+    }
+
+def select_attributes(attribute_names: Optional[List[str]] = None) -> List[str]:
+    """Return the requested attribute names in PROMPTS order (all of them if None)."""
+    return [name for name in PROMPTS if attribute_names is None or name in attribute_names]
+
+async def retrieve_attribute_contexts(
+    vector_store: VectorStore,
+    document_id: str,
+    names: List[str],
+    part_number: Optional[str]
+) -> Optional[Dict[str, List[Any]]]:
+    """
+    Retrieve PDF chunks for every attribute.
+    
+    Uses the document's ingest-time attribute routes when they are current
+    (a key lookup, no embedding or search). Otherwise all attributes are
+    embedded and searched in one batch. Returns None if the batched
+    retrieval fails, in which case extraction falls back to querying the
+    retriever per attribute.
+    """
+    if settings.ATTRIBUTE_ROUTING_ENABLED:
+        try:
+            routed = await asyncio.to_thread(
+                vector_store.retrieve_routed, document_id, names, attribute_route_queries()
+            )
+        except Exception as e:
+            logger.warning(f"Routed retrieval failed, searching instead: {e}")
+            routed = None
+        if routed is not None:
+            logger.debug(f"Retrieved contexts for {len(names)} attributes from routes of document {document_id[:12]}")
+            return dict(zip(names, routed))
+    
+    queries = [LLMInterface.build_retrieval_query(name, part_number) for name in names]
+    try:
+        hits = await asyncio.to_thread(vector_store.retrieve_for_queries, queries, document_id)
+    except Exception as e:
+        logger.warning(f"Batched retrieval failed, falling back to per-attribute retrieval: {e}")
+        return None
+    return dict(zip(names, hits))
+
+async def extract_attributes_batched(
+    llm_service: LLMInterface,
+    part_number: Optional[str],
+    retriever: Optional[Any] = None,
+    attribute_names: Optional[List[str]] = None,
+    attribute_contexts: Optional[Dict[str, List[Any]]] = None
+) -> List[ExtractionResult]:
+    """
+    Extract all attributes with one LLM call per stage over a shared context.
+    
+    Results keep the order of PROMPTS. Keys the batch call misses are retried
+    per attribute inside LLMInterface.extract_attributes.
+    """
+    attributes = {
+        name: PROMPTS[name]['web']  # Use web prompt as it's more specific
+        for name in select_attributes(attribute_names)
+    }
+    
+    extracted = await llm_service.extract_attributes(
+        attributes=attributes,
+        part_number=part_number,
+        retriever=retriever,
+        attribute_contexts=attribute_contexts
+    )
+    
+    return [
+        build_extraction_result(attribute, *extracted[attribute])
+        for attribute in attributes
+    ]
+
+async def extract_attributes_concurrently(
+    llm_service: LLMInterface,
+    part_number: Optional[str],
+    retriever: Optional[Any] = None,
+    attribute_names: Optional[List[str]] = None,
+    attribute_contexts: Optional[Dict[str, List[Any]]] = None
+) -> List[ExtractionResult]:
+    """
+    Extract attributes with at most MAX_PARALLEL_ATTRIBUTES LLM calls in flight.
+    
+    Results keep the order of PROMPTS. An attribute whose extraction raises is
+    logged and left out of the results without affecting the others.
+    """
+    names = select_attributes(attribute_names)
+    
+    outcomes = await gather_with_concurrency(
+        settings.MAX_PARALLEL_ATTRIBUTES,
+        [
+            extract_single_attribute(
+                llm_service, name, part_number, retriever,
+                attribute_contexts.get(name) if attribute_contexts is not None else None
+            )
+            for name in names
+        ],
+        return_exceptions=True
+    )
+    
+    results = []
+    for attribute, outcome in zip(names, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Error extracting {attribute}: {outcome}")
+            continue
+        results.append(outcome)
     return results
 
+async def extract_single_attribute(
+    llm_service: LLMInterface,
+    attribute: str,
+    part_number: Optional[str],
+    retriever: Optional[Any] = None,
+    context_docs: Optional[List[Any]] = None
+) -> ExtractionResult:
+    """Extract one attribute and wrap it in an ExtractionResult with status flags."""
+    # Use LLMInterface for extraction (it handles web scraping internally)
+    value, source, latency = await llm_service.extract_attribute(
+        attribute_key=attribute,
+        extraction_instructions=PROMPTS[attribute]['web'],  # Use web prompt as it's more specific
+        part_number=part_number,
+        retriever=retriever,
+        context_docs=context_docs
+    )
+    
+    return build_extraction_result(attribute, value, source, latency)
+
+def build_extraction_result(attribute: str, value: str, source: str, latency: float) -> ExtractionResult:
+    """Create an ExtractionResult with status flags derived from the value."""
+    return ExtractionResult(
+        attribute=attribute,
+        value=value,
+        source=source,
+        latency=latency,
+        is_success=value != "NOT FOUND",
+        is_error=False,
+        is_not_found=value == "NOT FOUND",
+        is_rate_limit=False
+    )
+
 @router.post("/metrics")
 async def calculate_metrics(request: MetricsRequest) -> MetricsResponse:
     """
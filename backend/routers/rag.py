@@ -1,13 +1,17 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from pydantic import BaseModel
-from typing import List, Optional
-import os
-import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+from loguru import logger
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
+from langchain.docstore.document import Document
 import chromadb
 from chromadb.config import Settings
 from config import get_settings
+from services.chunking import CHUNKING_CHARACTERS, create_token_splitter
+from utils.misc import chunk_list, distance_to_similarity, generate_id, select_by_score
+from utils.uploads import spooled_pdf_upload
 
 router = APIRouter(
     prefix="/rag",
@@ -33,67 +37,135 @@ collection = chroma_client.get_or_create_collection(
 class Query(BaseModel):
     text: str
     n_results: Optional[int] = settings.RETRIEVER_K
+    min_results: Optional[int] = settings.RETRIEVER_MIN_K
+    score_threshold: Optional[float] = settings.RETRIEVER_SCORE_THRESHOLD
 
 class DocumentResponse(BaseModel):
     text: str
     metadata: dict
+    score: float
 
 @router.post("/upload")
 async def upload_document(file: UploadFile = File(...)):
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
-    
-    if file.size > settings.MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail=f"File size exceeds maximum limit of {settings.MAX_FILE_SIZE/1024/1024}MB")
-    
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-        content = await file.read()
-        temp_file.write(content)
-        temp_file_path = temp_file.name
-
-    try:
+    # Stream the upload to a unique temporary file, removed on exit
+    async with spooled_pdf_upload(file) as upload:
         # Load and process PDF
-        loader = PyPDFLoader(temp_file_path)
+        loader = PyPDFLoader(upload.path)
         pages = loader.load()
         
-        # Split text into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.CHUNK_SIZE,
-            chunk_overlap=settings.CHUNK_OVERLAP,
-            length_function=len,
-        )
+        # Split text into chunks that fit the embedding model's window, unless
+        # the original character chunking is configured. Query results are
+        # returned as-is, so there are no parent passages here.
+        if settings.CHUNKING_MODE == CHUNKING_CHARACTERS:
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=settings.CHUNK_SIZE,
+                chunk_overlap=settings.CHUNK_OVERLAP,
+                length_function=len,
+            )
+        else:
+            text_splitter = create_token_splitter(
+                settings.EMBEDDING_MODEL_NAME,
+                settings.EMBEDDING_CHUNK_TOKENS,
+                settings.EMBEDDING_CHUNK_OVERLAP_TOKENS
+            )
         chunks = text_splitter.split_documents(pages)
         
-        # Add documents to ChromaDB
-        for i, chunk in enumerate(chunks):
-            collection.add(
-                documents=[chunk.page_content],
-                metadatas=[{
-                    "source": file.filename,
-                    "page": chunk.metadata.get("page", 0),
-                    "chunk": i
-                }],
-                ids=[f"{file.filename}_{i}"]
-            )
+        # Upsert chunks into ChromaDB in batches, skipping unchanged ones
+        counts = await asyncio.to_thread(upsert_chunks, upload.sha256, upload.filename, chunks)
         
-        return {"message": f"Successfully processed {len(chunks)} chunks from {file.filename}"}
+        return {
+            "message": f"Successfully processed {len(chunks)} chunks from {upload.filename}",
+            **counts
+        }
+
+def upsert_chunks(doc_id: str, source: str, chunks: List[Document]) -> Dict[str, int]:
+    """
+    Idempotently sync a file's chunks into the collection.
     
-    finally:
-        # Clean up temporary file
-        os.unlink(temp_file_path)
+    Chunks are scoped by doc_id, the SHA-256 of the file's content, so two
+    different files uploaded under the same name never touch each other's
+    chunks. Chunk IDs are derived from doc_id and chunk content: re-uploading
+    a file only embeds chunks whose text changed (e.g. after a chunking
+    settings change), chunks that no longer appear are removed, and the
+    metadata of unchanged chunks (file name, page, chunk index) is refreshed.
+    
+    Args:
+        doc_id: Content hash of the file
+        source: File name, stored as metadata only
+        chunks: Chunks of the file in order
+    
+    Returns:
+        Counts of added, updated, unchanged and removed chunks
+    """
+    records: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for i, chunk in enumerate(chunks):
+        chunk_id = generate_id(f"{doc_id}\0{chunk.page_content}")
+        if chunk_id in records:
+            continue  # Identical text repeated within the file
+        records[chunk_id] = (chunk.page_content, {
+            "doc_id": doc_id,
+            "source": source,
+            "page": chunk.metadata.get("page", 0),
+            "chunk": i
+        })
+    
+    existing = collection.get(where={"doc_id": doc_id}, include=["metadatas"])
+    existing_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+    to_add = [chunk_id for chunk_id in records if chunk_id not in existing_metadata]
+    to_update = [
+        chunk_id for chunk_id in records
+        if chunk_id in existing_metadata and existing_metadata[chunk_id] != records[chunk_id][1]
+    ]
+    to_remove = [chunk_id for chunk_id in existing_metadata if chunk_id not in records]
+    
+    batch_size = min(settings.RAG_UPSERT_BATCH_SIZE, getattr(chroma_client, "max_batch_size", settings.RAG_UPSERT_BATCH_SIZE))
+    for batch_ids in chunk_list(to_add, batch_size):
+        collection.upsert(
+            ids=batch_ids,
+            documents=[records[chunk_id][0] for chunk_id in batch_ids],
+            metadatas=[records[chunk_id][1] for chunk_id in batch_ids]
+        )
+    for batch_ids in chunk_list(to_update, batch_size):
+        collection.update(ids=batch_ids, metadatas=[records[chunk_id][1] for chunk_id in batch_ids])
+    for batch_ids in chunk_list(to_remove, batch_size):
+        collection.delete(ids=batch_ids)
+    
+    counts = {
+        "added": len(to_add),
+        "updated": len(to_update),
+        "unchanged": len(records) - len(to_add) - len(to_update),
+        "removed": len(to_remove)
+    }
+    logger.info(f"Synced {source} into {settings.COLLECTION_NAME}: {counts}")
+    return counts
 
 @router.post("/query", response_model=List[DocumentResponse])
 async def query_documents(query: Query):
+    n_results = query.n_results or settings.RETRIEVER_K
     results = collection.query(
         query_texts=[query.text],
-        n_results=query.n_results
+        n_results=n_results,
+        include=["documents", "metadatas", "distances"]
+    )
+    
+    # Rank by cosine similarity and drop weak matches beyond min_results
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    scored = [
+        ((doc, meta), distance_to_similarity(distance, space))
+        for doc, meta, distance in zip(results["documents"][0], results["metadatas"][0], results["distances"][0])
+    ]
+    selected = select_by_score(
+        scored,
+        threshold=settings.RETRIEVER_SCORE_THRESHOLD if query.score_threshold is None else query.score_threshold,
+        min_k=settings.RETRIEVER_MIN_K if query.min_results is None else query.min_results,
+        max_k=n_results
     )
     
     return [
         DocumentResponse(
             text=doc,
-            metadata=meta
+            metadata=meta or {},
+            score=score
         )
-        for doc, meta in zip(results["documents"][0], results["metadatas"][0])
+        for (doc, meta), score in selected
     ] 
\ No newline at end of file
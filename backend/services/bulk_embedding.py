@@ -0,0 +1,118 @@
+"""
+Sharded multi-process embedding for bulk ingestion.
+Splits a large list of texts into shards and embeds them in a pool of worker
+processes, each holding its own copy of the embedding model with a fixed
+number of threads, so backfills scale across cores instead of relying on
+torch's intra-op threading in one process.
+"""
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from loguru import logger
+from langchain_core.embeddings import Embeddings
+
+from config import get_settings
+
+# Set in each worker process by _init_worker
+_worker_embeddings: Optional[Embeddings] = None
+
+def _init_worker(backend: str, threads: int) -> None:
+    """Pin the worker's thread count and load its copy of the embedding model."""
+    global _worker_embeddings
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+
+    settings = get_settings()
+    if backend.startswith("onnx"):
+        from services.onnx_embeddings import load_onnx_embeddings
+        _worker_embeddings = load_onnx_embeddings(
+            model_name=settings.EMBEDDING_MODEL_NAME,
+            base_dir=settings.EMBEDDING_ONNX_DIR,
+            normalize=settings.NORMALIZE_EMBEDDINGS,
+            quantized=backend == "onnx-int8",
+            min_cosine=settings.EMBEDDING_ONNX_MIN_COSINE,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            num_threads=threads
+        )
+    else:
+        import torch
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        torch.set_num_threads(threads)
+        _worker_embeddings = HuggingFaceEmbeddings(
+            model_name=settings.EMBEDDING_MODEL_NAME,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={
+                'normalize_embeddings': settings.NORMALIZE_EMBEDDINGS,
+                'batch_size': settings.EMBEDDING_BATCH_SIZE
+            }
+        )
+
+def _embed_shard(texts: List[str]) -> List[List[float]]:
+    return _worker_embeddings.embed_documents(texts)
+
+class ShardedEmbeddings(Embeddings):
+    """Embeddings computed in a pool of worker processes, shard by shard.
+
+    Shards are dispatched with executor.map, so vectors come back in input
+    order. Workers start lazily on first use and stay up until close().
+    """
+
+    def __init__(self, workers: int, threads_per_worker: int = 1, shard_size: int = 256,
+                 backend: str = "torch"):
+        """
+        Initialize the sharded embedder.
+
+        Args:
+            workers: Number of worker processes
+            threads_per_worker: Threads each worker's model may use
+            shard_size: Texts sent to a worker per task
+            backend: Embedding backend the workers load ("torch", "onnx-fp32" or "onnx-int8")
+        """
+        self.workers = max(1, workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.shard_size = max(1, shard_size)
+        self.backend = backend
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawn so workers do not inherit the parent's torch threads and open handles
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.backend, self.threads_per_worker)
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """Start all workers and load their models now instead of on first use."""
+        # One task per worker; the pool spawns a new process for each while none are idle
+        list(self._get_executor().map(_embed_shard, [["warm up"]] * self.workers))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        shards = [texts[start:start + self.shard_size] for start in range(0, len(texts), self.shard_size)]
+        start = time.perf_counter()
+        vectors: List[List[float]] = []
+        for shard_vectors in self._get_executor().map(_embed_shard, shards):
+            vectors.extend(shard_vectors)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Bulk embedded {len(texts)} chunks in {len(shards)} shards with {self.workers} workers "
+            f"x {self.threads_per_worker} threads: {len(texts) / elapsed:.1f} chunks/sec"
+        )
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,125 @@
+"""
+Chunking for embedding and retrieval.
+In "parent_child" mode, page text is split into parent passages (the context
+sent to the LLM), and each passage is split into embedding units whose length
+is measured with the embedding model's own tokenizer, so nothing is cut off
+by the model's input window. Each unit records its parent so retrieval can
+return the passage instead of the unit. "characters" mode keeps the original
+CHUNK_SIZE character chunks.
+"""
+
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from loguru import logger
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from config import Settings, get_settings
+from utils.misc import generate_id
+
+CHUNKING_CHARACTERS = "characters"
+CHUNKING_PARENT_CHILD = "parent_child"
+
+PARENT_ID_KEY = "parent_id"
+# Carries the passage text from the splitter to VectorStore.index_document,
+# which moves it to the document registry instead of storing it per unit
+PARENT_CONTENT_KEY = "parent_content"
+
+# Rough characters per token, used if the tokenizer cannot be loaded
+CHARS_PER_TOKEN = 4
+
+@lru_cache()
+def get_embedding_tokenizer(model_name: str):
+    """Load the Hugging Face tokenizer of an embedding model, or None if unavailable."""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model_name}, approximating token counts: {e}")
+        return None
+
+def create_token_splitter(model_name: str, chunk_tokens: int, overlap_tokens: int) -> RecursiveCharacterTextSplitter:
+    """
+    Create a splitter whose chunk length is measured in the embedding model's tokens.
+
+    Args:
+        model_name: Embedding model whose tokenizer measures length
+        chunk_tokens: Maximum tokens per chunk, special tokens included
+        overlap_tokens: Tokens shared by neighbouring chunks
+
+    Returns:
+        RecursiveCharacterTextSplitter
+    """
+    tokenizer = get_embedding_tokenizer(model_name)
+    if tokenizer is None:
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_tokens * CHARS_PER_TOKEN,
+            chunk_overlap=overlap_tokens * CHARS_PER_TOKEN,
+            length_function=len
+        )
+    max_length = getattr(tokenizer, "model_max_length", None)
+    if max_length and chunk_tokens > max_length:
+        logger.warning(f"EMBEDDING_CHUNK_TOKENS={chunk_tokens} exceeds the {max_length}-token window of {model_name}")
+    return RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+        tokenizer, chunk_size=chunk_tokens, chunk_overlap=overlap_tokens
+    )
+
+def chunking_signature(settings: Optional[Settings] = None) -> str:
+    """Describe the active chunking configuration; documents indexed under another one are re-indexed."""
+    settings = settings or get_settings()
+    if settings.CHUNKING_MODE == CHUNKING_PARENT_CHILD:
+        return (
+            f"{CHUNKING_PARENT_CHILD}:{settings.PARENT_CHUNK_SIZE}/{settings.CHUNK_OVERLAP}:"
+            f"{settings.EMBEDDING_CHUNK_TOKENS}/{settings.EMBEDDING_CHUNK_OVERLAP_TOKENS}:{settings.EMBEDDING_MODEL_NAME}"
+        )
+    return f"{CHUNKING_CHARACTERS}:{settings.CHUNK_SIZE}/{settings.CHUNK_OVERLAP}"
+
+class ChunkSplitter:
+    """Splits page text into embedding units, each paired with its parent passage (if any)."""
+
+    def __init__(self, settings: Optional[Settings] = None):
+        settings = settings or get_settings()
+        self.mode = settings.CHUNKING_MODE
+        if self.mode == CHUNKING_PARENT_CHILD:
+            self.parent_splitter: Optional[RecursiveCharacterTextSplitter] = RecursiveCharacterTextSplitter(
+                chunk_size=settings.PARENT_CHUNK_SIZE,
+                chunk_overlap=settings.CHUNK_OVERLAP,
+                length_function=len,
+                is_separator_regex=False
+            )
+            self.unit_splitter = create_token_splitter(
+                settings.EMBEDDING_MODEL_NAME,
+                settings.EMBEDDING_CHUNK_TOKENS,
+                settings.EMBEDDING_CHUNK_OVERLAP_TOKENS
+            )
+        else:
+            if self.mode != CHUNKING_CHARACTERS:
+                logger.warning(f"Unknown CHUNKING_MODE '{self.mode}', using {CHUNKING_CHARACTERS}")
+                self.mode = CHUNKING_CHARACTERS
+            self.parent_splitter = None
+            self.unit_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=settings.CHUNK_SIZE,
+                chunk_overlap=settings.CHUNK_OVERLAP,
+                length_function=len,
+                is_separator_regex=False
+            )
+
+    def split_text(self, text: str) -> List[Tuple[str, Optional[str]]]:
+        """
+        Split text into (embedding unit, parent passage) pairs.
+
+        In characters mode the parent is None and the unit is the whole chunk.
+        """
+        if self.parent_splitter is None:
+            return [(chunk, None) for chunk in self.unit_splitter.split_text(text)]
+        return [
+            (unit, parent)
+            for parent in self.parent_splitter.split_text(text)
+            for unit in self.unit_splitter.split_text(parent)
+        ]
+
+    @staticmethod
+    def parent_metadata(parent: Optional[str]) -> dict:
+        """Metadata linking a unit to its parent passage."""
+        if parent is None:
+            return {}
+        return {PARENT_ID_KEY: generate_id(parent), PARENT_CONTENT_KEY: parent}
@@ -0,0 +1,154 @@
+"""
+Token-budgeted packing of retrieved chunks into LLM context.
+Keeps chunks in the order the retriever ranked them, drops sentences and
+table rows already included from another chunk (duplicates and chunk
+overlaps), and trims at sentence/row boundaries so the packed context,
+including per-chunk headers, fits a token budget.
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional
+from loguru import logger
+from langchain.docstore.document import Document
+
+# Rough characters per token, used if tiktoken is not installed
+CHARS_PER_TOKEN = 4
+# Segments shorter than this (normalized) are never treated as duplicates,
+# e.g. blank lines, table separators, short labels
+MIN_DEDUPE_CHARS = 20
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])(\s+)")
+
+class PackResult(NamedTuple):
+    """Chunks that fit the budget and the token counts before and after packing."""
+    documents: List[Document]
+    tokens_before: int
+    tokens_after: int
+
+@lru_cache()
+def get_token_counter() -> Callable[[str], int]:
+    """Token counter for budgeting: tiktoken's cl100k_base if available, else a character estimate."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating context tokens from characters: {e}")
+        return lambda text: (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def split_segments(text: str) -> List[str]:
+    """
+    Split text into trim units: one per table row or blank line, one per sentence otherwise.
+
+    Segments keep their trailing whitespace, so "".join(segments) == text.
+    """
+    segments: List[str] = []
+    for line in text.splitlines(keepends=True):
+        if not line.strip() or line.lstrip().startswith("|"):
+            segments.append(line)
+            continue
+        parts = SENTENCE_BOUNDARY.split(line)
+        # parts alternates sentence, separator, sentence, ...; attach separators to their sentence
+        for i in range(0, len(parts), 2):
+            segment = parts[i] + (parts[i + 1] if i + 1 < len(parts) else "")
+            if segment:
+                segments.append(segment)
+    return segments
+
+def _dedupe_key(segment: str) -> Optional[str]:
+    key = " ".join(segment.split()).lower()
+    if len(key) < MIN_DEDUPE_CHARS or set(key) <= set("|-: "):
+        return None
+    return key
+
+class ContextPacker:
+    """Packs retrieved chunks into a token budget.
+
+    Chunks are taken in the order given, which is the retriever's ranking;
+    for batch prompts that order interleaves the attributes' hits rank by
+    rank, so every attribute keeps its best chunks. Sentences and table rows
+    already packed from an earlier chunk are dropped, which removes both
+    duplicate chunks and the overlap between neighbouring chunks. When the
+    budget runs out, the current chunk is cut at the last sentence or row
+    that fits.
+    """
+
+    def __init__(self, count_tokens: Optional[Callable[[str], int]] = None):
+        self.count_tokens = count_tokens or get_token_counter()
+
+    def pack(self, docs: List[Document], token_budget: int,
+             chunk_header: Optional[Callable[[int, Document], str]] = None) -> PackResult:
+        """
+        Select and trim chunks to fit token_budget.
+
+        Args:
+            docs: Retrieved chunks, in ranked order
+            token_budget: Maximum tokens of the packed context
+            chunk_header: Text the prompt puts before the i-th packed chunk
+                (e.g. source, page and separator), charged to the budget
+
+        Returns:
+            PackResult with the packed chunks in the given order; token counts include headers
+        """
+        tokens_before = sum(
+            self.count_tokens((chunk_header(i, doc) if chunk_header else "") + doc.page_content)
+            for i, doc in enumerate(docs)
+        )
+
+        packed: List[Document] = []
+        seen = set()
+        used = 0
+        budget_exhausted = False
+        for doc in docs:
+            used_before = used
+            used += self.count_tokens(chunk_header(len(packed), doc)) if chunk_header else 0
+            kept: List[str] = []
+            dropped_duplicates = False
+            adds_content = False
+            for segment in split_segments(doc.page_content):
+                key = _dedupe_key(segment)
+                if key is not None and key in seen:
+                    dropped_duplicates = True
+                    # Keep the line break so a following table row still starts a line
+                    if segment.endswith("\n") and kept and not kept[-1].endswith("\n"):
+                        kept[-1] = kept[-1].rstrip() + "\n"
+                    continue
+                cost = self.count_tokens(segment)
+                if used + cost > token_budget:
+                    if not packed and not kept:
+                        # Even the first sentence does not fit: keep what fits of it
+                        segment = self._truncate(segment, token_budget - used)
+                        kept.append(segment)
+                        used += self.count_tokens(segment)
+                    budget_exhausted = True
+                    break
+                if key is not None:
+                    seen.add(key)
+                    adds_content = True
+                kept.append(segment)
+                used += cost
+
+            # A duplicate chunk would otherwise leave blank lines and table separators behind
+            content = "".join(kept).strip()
+            if content and (adds_content or not dropped_duplicates):
+                packed.append(Document(page_content=content, metadata=doc.metadata))
+            else:
+                used = used_before  # Its header is not emitted either
+            if budget_exhausted:
+                break
+
+        return PackResult(documents=packed, tokens_before=tokens_before, tokens_after=used)
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text, by the character estimate and then shortened, with at most max_tokens tokens."""
+        if max_tokens <= 0:
+            return ""
+        text = text[:max_tokens * CHARS_PER_TOKEN]
+        while text:
+            tokens = self.count_tokens(text)
+            if tokens <= max_tokens:
+                break
+            # Shorten in proportion to the excess, by at least one character
+            text = text[:min(len(text) - 1, len(text) * max_tokens // tokens)]
+        return text
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+
+class DocumentRegistry:
+    """SQLite-backed registry of indexed documents keyed by PDF content hash.
+
+    The vector store holds the chunks; the registry records which documents
+    have been indexed, under what name, with how many chunks and with which
+    chunking configuration, so the same bytes arriving again can reuse the
+    existing chunks. It also keeps the parent passages that embedded chunks
+    point to, so they are stored once rather than in every chunk's metadata,
+    and each document's attribute routes (the best chunk IDs per extraction
+    attribute) and key/value fields, both computed at ingest.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, path: str):
+        """
+        Initialize the registry, creating the database file if needed.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " doc_id TEXT PRIMARY KEY,"
+            " filename TEXT,"
+            " chunk_count INTEGER NOT NULL,"
+            " indexed_at REAL NOT NULL,"
+            " last_used REAL NOT NULL"
+            ")"
+        )
+        self._ensure_column("documents", "chunking", "TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS passages ("
+            " doc_id TEXT NOT NULL,"
+            " parent_id TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " PRIMARY KEY (doc_id, parent_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_passages_parent_id ON passages (parent_id)")
+        self._ensure_column("documents", "routing", "TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS routes ("
+            " doc_id TEXT NOT NULL,"
+            " attribute TEXT NOT NULL,"
+            " chunks TEXT NOT NULL,"
+            " PRIMARY KEY (doc_id, attribute)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fields ("
+            " doc_id TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " page INTEGER,"
+            " PRIMARY KEY (doc_id, position)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+        logger.info(f"Document registry opened at {path}")
+
+    def _ensure_column(self, table: str, column: str, definition: str) -> None:
+        """Add a column to a table created by an older version of the registry."""
+        columns = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Return the registry entry for a document, marking it as used."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE documents SET last_used = ? WHERE doc_id = ?", (time.time(), doc_id))
+            self._conn.commit()
+            return dict(row)
+
+    def register(self, doc_id: str, filename: Optional[str], chunk_count: int,
+                 chunking: Optional[str] = None, passages: Optional[Dict[str, str]] = None,
+                 fields: Optional[Iterable[Tuple[str, str, Optional[int]]]] = None) -> None:
+        """
+        Record that a document's chunks have been indexed.
+
+        Args:
+            doc_id: Document content hash
+            filename: Original upload name
+            chunk_count: Number of chunks stored in the vector store
+            chunking: Signature of the chunking configuration used
+            passages: Parent passages by parent_id, replacing any stored for the document
+            fields: (key, value, page) tuples in reading order, replacing any stored for the document;
+                written in the same transaction so a registered document never lacks its fields
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO documents (doc_id, filename, chunk_count, indexed_at, last_used, chunking) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET filename = excluded.filename, chunk_count = excluded.chunk_count, "
+                "indexed_at = excluded.indexed_at, last_used = excluded.last_used, chunking = excluded.chunking, "
+                "routing = NULL",
+                (doc_id, filename, chunk_count, now, now, chunking)
+            )
+            # Routes and fields describe the content this registration replaces
+            self._conn.execute("DELETE FROM routes WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM fields WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM passages WHERE doc_id = ?", (doc_id,))
+            if passages:
+                self._conn.executemany(
+                    "INSERT INTO passages (doc_id, parent_id, content) VALUES (?, ?, ?)",
+                    [(doc_id, parent_id, content) for parent_id, content in passages.items()]
+                )
+            if fields:
+                self._insert_fields_locked(doc_id, fields)
+            self._conn.commit()
+
+    def get_passages(self, parent_ids: Iterable[str]) -> Dict[str, str]:
+        """Look up parent passages by parent_id."""
+        unique_ids = list(dict.fromkeys(parent_ids))
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(unique_ids), self.LOOKUP_BATCH_SIZE):
+                batch = unique_ids[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT parent_id, content FROM passages WHERE parent_id IN ({placeholders})", batch
+                ).fetchall()
+                found.update((row["parent_id"], row["content"]) for row in rows)
+        return found
+
+    def set_routes(self, doc_id: str, signature: str, routes: Dict[str, List[Tuple[str, float]]]) -> None:
+        """
+        Replace a document's attribute routes.
+
+        Args:
+            doc_id: Document content hash
+            signature: Signature of the attribute queries and retrieval settings the routes were built with
+            routes: Ranked (chunk ID, score) pairs per attribute
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM routes WHERE doc_id = ?", (doc_id,))
+            self._conn.executemany(
+                "INSERT INTO routes (doc_id, attribute, chunks) VALUES (?, ?, ?)",
+                [(doc_id, attribute, json.dumps(chunks)) for attribute, chunks in routes.items()]
+            )
+            self._conn.execute("UPDATE documents SET routing = ? WHERE doc_id = ?", (signature, doc_id))
+            self._conn.commit()
+
+    def get_routes(self, doc_id: str, signature: str) -> Optional[Dict[str, List[Tuple[str, float]]]]:
+        """Return a document's attribute routes, or None if they were built with another signature."""
+        with self._lock:
+            row = self._conn.execute("SELECT routing FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is None or row["routing"] != signature:
+                return None
+            rows = self._conn.execute("SELECT attribute, chunks FROM routes WHERE doc_id = ?", (doc_id,)).fetchall()
+        return {
+            row["attribute"]: [(chunk_id, score) for chunk_id, score in json.loads(row["chunks"])]
+            for row in rows
+        }
+
+    def set_fields(self, doc_id: str, fields: Iterable[Tuple[str, str, Optional[int]]]) -> None:
+        """
+        Replace a document's key/value fields.
+
+        Args:
+            doc_id: Document content hash
+            fields: (key, value, page) tuples in reading order
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM fields WHERE doc_id = ?", (doc_id,))
+            self._insert_fields_locked(doc_id, fields)
+            self._conn.commit()
+
+    def _insert_fields_locked(self, doc_id: str, fields: Iterable[Tuple[str, str, Optional[int]]]) -> None:
+        self._conn.executemany(
+            "INSERT INTO fields (doc_id, position, key, value, page) VALUES (?, ?, ?, ?, ?)",
+            [(doc_id, position, key, value, page) for position, (key, value, page) in enumerate(fields)]
+        )
+
+    def get_fields(self, doc_id: str) -> List[Tuple[str, str, Optional[int]]]:
+        """Return a document's key/value fields as (key, value, page) tuples in reading order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, page FROM fields WHERE doc_id = ? ORDER BY position", (doc_id,)
+            ).fetchall()
+        return [(row["key"], row["value"], row["page"]) for row in rows]
+
+    def remove(self, doc_id: str) -> None:
+        """Forget a document."""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM passages WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM routes WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM fields WHERE doc_id = ?", (doc_id,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Forget all documents."""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("DELETE FROM passages")
+            self._conn.execute("DELETE FROM routes")
+            self._conn.execute("DELETE FROM fields")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,186 @@
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+from langchain_core.embeddings import Embeddings
+
+class BatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that merges concurrent requests into batched forward passes.
+
+    Every embed call, from any thread or coroutine, is queued for a single
+    worker thread. The worker takes the oldest request, keeps collecting
+    requests until max_batch_size texts are queued or max_wait_ms has passed
+    since it started the batch, embeds them with one call to the wrapped
+    model and resolves each caller's future with its slice of the vectors.
+    Larger embed_documents calls are fed in max_batch_size slices, one at a
+    time, so queries queued meanwhile wait for one slice rather than for a
+    whole document.
+
+    Queries are embedded like documents, which holds for the symmetric
+    sentence-transformers models used by VectorStore.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """
+        Initialize the batcher and start its worker thread.
+
+        Args:
+            embeddings: Model to run the batches on
+            max_batch_size: Texts after which a batch is run without waiting further
+            max_wait_ms: Longest time a batch waits for more requests
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Optional[Tuple[List[str], Future, float]]]" = queue.Queue()
+        # Guards _closed, so nothing is queued behind close()'s stop marker
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._max_batch_texts = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._compute_total = 0.0
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        Queue texts for embedding as one request and return a future resolving to their vectors.
+
+        The request is never split, so callers with more than max_batch_size
+        texts should go through embed_documents instead.
+        """
+        future: Future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        with self._submit_lock:
+            if self._closed or not self._worker.is_alive():
+                future.set_exception(RuntimeError("Embedding batcher is closed"))
+                return future
+            self._queue.put((list(texts), future, time.perf_counter()))
+        return future
+
+    def _slices(self, texts: List[str]) -> List[List[str]]:
+        return [texts[start:start + self.max_batch_size] for start in range(0, len(texts), self.max_batch_size)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for texts_slice in self._slices(texts):
+            vectors.extend(self.submit(texts_slice).result())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit([text]).result()[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for texts_slice in self._slices(texts):
+            vectors.extend(await asyncio.wrap_future(self.submit(texts_slice)))
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await asyncio.wrap_future(self.submit([text])))[0]
+
+    def _collect(self, first: Tuple[List[str], Future, float]) -> Tuple[List[Tuple[List[str], Future, float]], bool]:
+        """Gather requests after the first one until the batch is full or the wait is over."""
+        batch = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            size += len(item[0])
+        return batch, False
+
+    def _run(self) -> None:
+        closing = False
+        while not closing:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, closing = self._collect(first)
+            self._run_batch(batch)
+
+        self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        """Fail requests still queued once the worker stops, so no caller waits forever."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("Embedding batcher is closed"))
+
+    def _run_batch(self, batch: List[Tuple[List[str], Future, float]]) -> None:
+        started = time.perf_counter()
+        texts = [text for item_texts, _, _ in batch for text in item_texts]
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        compute = time.perf_counter() - started
+
+        offset = 0
+        for item_texts, future, _ in batch:
+            future.set_result(vectors[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+
+        waits = [started - enqueued for _, _, enqueued in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._texts += len(texts)
+            self._max_batch_texts = max(self._max_batch_texts, len(texts))
+            self._queue_wait_total += sum(waits)
+            self._queue_wait_max = max(self._queue_wait_max, max(waits))
+            self._compute_total += compute
+        logger.debug(
+            f"Embedded batch of {len(texts)} texts from {len(batch)} requests in {compute * 1000:.1f}ms "
+            f"(max queue wait {max(waits) * 1000:.1f}ms)"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch size, queue wait and throughput counters."""
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "avg_batch_texts": self._texts / self._batches if self._batches else 0.0,
+                "max_batch_texts": self._max_batch_texts,
+                "avg_requests_per_batch": self._requests / self._batches if self._batches else 0.0,
+                "avg_queue_wait_ms": self._queue_wait_total / self._requests * 1000 if self._requests else 0.0,
+                "max_queue_wait_ms": self._queue_wait_max * 1000,
+                "texts_per_second": self._texts / self._compute_total if self._compute_total else 0.0,
+                "queued_requests": self._queue.qsize(),
+            }
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Finish queued batches and stop the worker thread."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout)
+        self._fail_pending()
+        logger.info(f"Embedding batcher stopped: {self.stats()}")
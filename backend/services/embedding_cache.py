@@ -0,0 +1,170 @@
+import os
+import time
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+from loguru import logger
+from langchain_core.embeddings import Embeddings
+
+from utils.misc import generate_id
+
+class EmbeddingCache:
+    """SQLite-backed store of embedding vectors with least-recently-used eviction.
+
+    Rows are keyed by (namespace, chunk hash), where the namespace identifies the
+    model and normalize flag. Vectors are stored as packed float32 blobs.
+    """
+
+    # Evict down to this fraction of max_entries so eviction is not run on every write
+    LOW_WATERMARK = 0.9
+    # SQLite limits the number of bound parameters per statement
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, path: str, max_entries: int):
+        """
+        Initialize the cache, creating the database file if needed.
+
+        Args:
+            path: SQLite database file
+            max_entries: Number of vectors kept before evicting least recently used ones
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " namespace TEXT NOT NULL,"
+            " chunk_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (namespace, chunk_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Embedding cache at {path} holds {self._count} vectors")
+
+    @staticmethod
+    def namespace(model_name: str, normalize: bool) -> str:
+        """Build the namespace for a model and normalize flag."""
+        return f"{model_name}|normalize={bool(normalize)}"
+
+    def get_many(self, namespace: str, chunk_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Look up vectors for several chunk hashes, marking hits as recently used.
+
+        Returns:
+            Mapping of chunk hash to vector for the hashes found
+        """
+        unique_hashes = list(dict.fromkeys(chunk_hashes))
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(unique_hashes), self.LOOKUP_BATCH_SIZE):
+                batch = unique_hashes[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM embeddings WHERE namespace = ? AND chunk_hash IN ({placeholders})",
+                    [namespace, *batch]
+                ).fetchall()
+                for chunk_hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[chunk_hash] = vector.tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE namespace = ? AND chunk_hash = ?",
+                    [(now, namespace, chunk_hash) for chunk_hash in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(unique_hashes) - len(found)
+        return found
+
+    def put_many(self, namespace: str, vectors: Dict[str, List[float]]) -> None:
+        """Store vectors for several chunk hashes, evicting old entries if over budget."""
+        if not vectors:
+            return
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (namespace, chunk_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [
+                    (namespace, chunk_hash, array("f", vector).tobytes(), now)
+                    for chunk_hash, vector in vectors.items()
+                ]
+            )
+            self._conn.commit()
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_entries:
+                self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        target = int(self.max_entries * self.LOW_WATERMARK)
+        excess = self._count - target
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE (namespace, chunk_hash) IN "
+            "(SELECT namespace, chunk_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Evicted {excess} cached embeddings, {self._count} remain")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document vectors from an EmbeddingCache.
+
+    Only the texts not already cached for this model and normalize flag are
+    sent to the wrapped embedding function. Queries are passed through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str, normalize: bool):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.namespace = EmbeddingCache.namespace(model_name, normalize)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [generate_id(text) for text in texts]
+        vectors = self.cache.get_many(self.namespace, hashes)
+
+        missing: Dict[str, str] = {}
+        for chunk_hash, text in zip(hashes, texts):
+            if chunk_hash not in vectors:
+                missing.setdefault(chunk_hash, text)
+
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), computed))
+            self.cache.put_many(self.namespace, new_vectors)
+            vectors.update(new_vectors)
+
+        logger.debug(f"Embedded {len(texts)} texts: {len(texts) - len(missing)} from cache, {len(missing)} computed")
+        return [list(vectors[chunk_hash]) for chunk_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
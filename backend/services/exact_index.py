@@ -0,0 +1,112 @@
+"""
+In-process exact vector search.
+Holds one document's chunk vectors in a contiguous NumPy float32 matrix and
+answers queries with a vectorized dot product and top-k selection. Meant for
+the few dozen to few thousand chunks of a single datasheet, where a brute-force
+scan is faster than querying a persistent ANN index.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain.docstore.document import Document
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, leaving zero rows as zeros."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest scores per row.
+
+    Args:
+        scores: (queries, items) score matrix
+        k: Number of results per query
+
+    Returns:
+        Tuple of (scores, indices), each (queries, k), best first
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty, empty.astype(np.int64)
+    if k < scores.shape[1]:
+        indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    top_scores = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+class ExactIndex:
+    """Brute-force cosine similarity index over a fixed set of documents."""
+
+    def __init__(self, vectors: Sequence[Sequence[float]], documents: List[Document],
+                 ids: Optional[List[str]] = None):
+        """
+        Build the index.
+
+        Args:
+            vectors: One embedding per document
+            documents: Documents returned for matching rows
+            ids: Optional chunk ID per document, for search_ids and get_documents
+        """
+        if len(vectors) != len(documents):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(documents)} documents")
+        if ids is not None and len(ids) != len(documents):
+            raise ValueError(f"Got {len(ids)} ids for {len(documents)} documents")
+        if not documents:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        else:
+            matrix = np.asarray(vectors, dtype=np.float32).reshape(len(documents), -1)
+            self.matrix = np.ascontiguousarray(normalize_rows(matrix))
+        self.documents = documents
+        self.ids = ids
+        self._positions: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def search(self, query_vectors: Sequence[Sequence[float]], k: int) -> List[List[Tuple[Document, float]]]:
+        """
+        Find the k most similar documents for each query.
+
+        Args:
+            query_vectors: One embedding per query
+            k: Results per query
+
+        Returns:
+            One list of (document, cosine similarity) per query, best first
+        """
+        return [
+            [(self.documents[i], score) for i, score in row]
+            for row in self._search_positions(query_vectors, k)
+        ]
+
+    def search_ids(self, query_vectors: Sequence[Sequence[float]], k: int) -> List[List[Tuple[str, float]]]:
+        """Like search, but returning (chunk ID, cosine similarity) pairs; requires ids."""
+        if self.ids is None:
+            raise ValueError("Index was built without chunk ids")
+        return [
+            [(self.ids[i], score) for i, score in row]
+            for row in self._search_positions(query_vectors, k)
+        ]
+
+    def _search_positions(self, query_vectors: Sequence[Sequence[float]], k: int) -> List[List[Tuple[int, float]]]:
+        if not len(self.documents):
+            return [[] for _ in query_vectors]
+        queries = normalize_rows(np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1))
+        scores, indices = top_k(queries @ self.matrix.T, k)
+        return [list(zip(row_indices, row_scores)) for row_indices, row_scores in zip(indices.tolist(), scores.tolist())]
+
+    def get_documents(self, ids: List[str]) -> Dict[str, Document]:
+        """Look up documents by chunk ID, skipping unknown IDs."""
+        if self.ids is None:
+            return {}
+        if self._positions is None:
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        return {chunk_id: self.documents[self._positions[chunk_id]] for chunk_id in ids if chunk_id in self._positions}
@@ -0,0 +1,555 @@
+"""
+Memory-mapped flat embedding store for the persistent corpus.
+Vectors are appended to a single raw float16/float32 file that readers map
+with np.memmap, so every worker process shares the same pages through the OS
+page cache instead of loading its own copy. IDs, texts and metadata live in
+an SQLite sidecar keyed by row number. Search is an exact, block-wise
+vectorized scan, optionally over compressed codes (int8 or binary) with the
+best candidates re-scored against the full-precision vectors.
+
+Layout of a store directory:
+    header.json      dimension, dtype, quantization, committed row count, a version
+                     bumped by every write and a generation bumped by every rebuild
+    vectors.bin      row-major matrix of unit vectors, one row per chunk
+    codes.bin        quantized rows, if quantization is enabled
+    scales.bin       float32 scale per row for int8 codes
+    sidecar.sqlite3  row -> (id, document, metadata, live), and the generation of those rows
+
+Rows are only ever appended. Re-adding an ID or deleting it marks the old
+row as dead; dead rows are skipped by search until the store is rebuilt.
+The committed row count in header.json is written last, so readers never
+see a partially written append.
+
+Several processes may share a store. Writers take an exclusive flock on
+store.lock; readers take a shared one only while re-mapping after a change.
+Clearing, rebuilding and re-quantizing write new files and swap them in with
+os.replace, so a file another process has mapped is never truncated. A
+rebuild renumbers the rows, so a search over a mapping from an older
+generation finds its row lookups rejected and runs again on the new files.
+"""
+
+import os
+import json
+import fcntl
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from loguru import logger
+
+from services.exact_index import normalize_rows, top_k
+
+HEADER_FILE = "header.json"
+VECTORS_FILE = "vectors.bin"
+SIDECAR_FILE = "sidecar.sqlite3"
+CODES_FILE = "codes.bin"
+SCALES_FILE = "scales.bin"
+LOCK_FILE = "store.lock"
+# Suffix of the files a rebuild writes before swapping them in
+NEXT_SUFFIX = ".next"
+SUPPORTED_DTYPES = ("float16", "float32")
+QUANTIZATION_INT8 = "int8"
+QUANTIZATION_BINARY = "binary"
+SUPPORTED_QUANTIZATIONS = (QUANTIZATION_INT8, QUANTIZATION_BINARY)
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric int8 codes with one scale per row.
+
+    Returns:
+        Tuple of (codes, scales) with codes * scales[:, None] ~= matrix
+    """
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+def quantize_binary(matrix: np.ndarray) -> np.ndarray:
+    """Sign bits, packed eight dimensions per byte."""
+    return np.packbits(matrix > 0, axis=1)
+
+def code_row_bytes(quantization: str, dimension: int) -> int:
+    return dimension if quantization == QUANTIZATION_INT8 else (dimension + 7) // 8
+
+class FlatVectorStore:
+    """Append-only, memory-mapped matrix of embeddings with an SQLite sidecar."""
+
+    # SQLite limits the number of bound parameters per statement
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, directory: str, dtype: str = "float16", scan_rows: int = 65536,
+                 quantization: Optional[str] = None, oversample: float = 4.0):
+        """
+        Open or create a store.
+
+        Args:
+            directory: Store directory
+            dtype: Storage type for new stores (float16 or float32); existing stores keep theirs
+            scan_rows: Rows converted and scored per block during search
+            quantization: Compressed codes for the first search pass ("int8", "binary") or None
+                to scan the full vectors; codes are (re)built if the store has different ones
+            oversample: Candidates per result taken from the first pass for exact re-scoring
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}', expected one of {SUPPORTED_DTYPES}")
+        if quantization is not None and quantization not in SUPPORTED_QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization '{quantization}', expected one of {SUPPORTED_QUANTIZATIONS}")
+        self.directory = directory
+        self.scan_rows = scan_rows
+        self.oversample = max(1.0, oversample)
+        # _lock guards the connection and reader state; _write_lock serializes
+        # this process's writers before they take the cross-process flock
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._header_path = os.path.join(directory, HEADER_FILE)
+        self._vectors_path = os.path.join(directory, VECTORS_FILE)
+        self._codes_path = os.path.join(directory, CODES_FILE)
+        self._scales_path = os.path.join(directory, SCALES_FILE)
+        self._lock_path = os.path.join(directory, LOCK_FILE)
+
+        self._conn = sqlite3.connect(os.path.join(directory, SIDECAR_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " row INTEGER PRIMARY KEY,"
+            " id TEXT NOT NULL,"
+            " document TEXT,"
+            " metadata TEXT,"
+            " live INTEGER NOT NULL DEFAULT 1"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_id ON rows (id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+
+        # Reader state, refreshed when header.json's version changes
+        self._view_version: Optional[int] = None
+        self._view_generation = 0
+        self._view: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._dead_rows = np.empty(0, dtype=np.int64)
+
+        with self._exclusive():
+            if not os.path.exists(self._header_path):
+                self._write_header({"dimension": None, "dtype": dtype, "quantization": quantization, "count": 0, "version": 0})
+            for path in self._data_paths():
+                open(path, "ab").close()
+            header = self._read_header()
+            if header.get("quantization") != quantization:
+                self._rebuild_codes_locked(header, quantization)
+        logger.info(
+            f"Flat vector store at {directory}: {header['count']} rows, {header['dtype']}, "
+            f"dimension {header['dimension']}, quantization {quantization or 'none'}"
+        )
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the store's write lock, across threads and processes."""
+        with self._write_lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    @contextmanager
+    def _shared(self, blocking: bool = True) -> Iterator[bool]:
+        """
+        Keep writers out while mapping the files.
+
+        Uses its own file descriptor, so it also conflicts with a writer in
+        this process. Yields whether the lock was acquired, which is always
+        the case when blocking.
+        """
+        with open(self._lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if blocking else fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+
+    def _data_paths(self, suffix: str = "") -> Tuple[str, str, str]:
+        return tuple(f"{path}{suffix}" for path in (self._vectors_path, self._codes_path, self._scales_path))
+
+    def _read_header(self) -> Dict[str, Any]:
+        with open(self._header_path) as f:
+            return json.load(f)
+
+    def _write_header(self, header: Dict[str, Any]) -> None:
+        temp_path = f"{self._header_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(header, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._header_path)
+
+    def append(self, ids: List[str], vectors: Sequence[Sequence[float]],
+               documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Append rows; IDs already in the store have their old rows marked dead.
+
+        Args:
+            ids: Row IDs
+            vectors: One embedding per ID (normalized before storing)
+            documents: Optional text per ID
+            metadatas: Optional metadata per ID
+        """
+        if not ids:
+            return
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._exclusive():
+            header = self._read_header()
+            if header["dimension"] is None:
+                header["dimension"] = int(matrix.shape[1])
+            elif matrix.shape[1] != header["dimension"]:
+                raise ValueError(f"Expected vectors of dimension {header['dimension']}, got {matrix.shape[1]}")
+
+            start = header["count"]
+            # Overwrite anything left behind by an append that never committed
+            self._write_rows(self._vectors_path, start, matrix.astype(header["dtype"]))
+            self._write_codes(header, start, matrix)
+
+            with self._lock:
+                self._mark_dead_locked(ids)
+                self._insert_rows_locked("rows", start, ids, documents, metadatas)
+                self._conn.commit()
+
+            header["count"] = start + len(ids)
+            header["version"] += 1
+            self._write_header(header)
+
+    def _insert_rows_locked(self, table: str, start: int, ids: List[str], documents: Sequence[Optional[str]],
+                            metadatas: Sequence[Optional[Dict[str, Any]]]) -> None:
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO {table} (row, id, document, metadata, live) VALUES (?, ?, ?, ?, 1)",
+            [
+                (start + i, row_id, document, json.dumps(metadata) if metadata is not None else None)
+                for i, (row_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+            ]
+        )
+
+    @staticmethod
+    def _write_rows(path: str, start: int, rows: np.ndarray) -> None:
+        """Write rows from row index start on, dropping anything after them."""
+        with open(path, "r+b") as f:
+            f.seek(start * rows.itemsize * int(np.prod(rows.shape[1:])))
+            f.write(rows.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_codes(self, header: Dict[str, Any], start: int, matrix: np.ndarray, suffix: str = "") -> None:
+        _, codes_path, scales_path = self._data_paths(suffix)
+        if header.get("quantization") == QUANTIZATION_INT8:
+            codes, scales = quantize_int8(matrix)
+            self._write_rows(codes_path, start, codes)
+            self._write_rows(scales_path, start, scales.reshape(-1, 1))
+        elif header.get("quantization") == QUANTIZATION_BINARY:
+            self._write_rows(codes_path, start, quantize_binary(matrix))
+
+    @staticmethod
+    def _create_next_files(paths: Sequence[str]) -> None:
+        for path in paths:
+            open(f"{path}{NEXT_SUFFIX}", "wb").close()
+
+    @staticmethod
+    def _swap_in_next_files(paths: Sequence[str]) -> None:
+        for path in paths:
+            os.replace(f"{path}{NEXT_SUFFIX}", path)
+
+    def _rebuild_codes_locked(self, header: Dict[str, Any], quantization: Optional[str]) -> None:
+        """Recompute the quantized codes of all rows for a new quantization setting. Call with the write lock held."""
+        self._create_next_files((self._codes_path, self._scales_path))
+        header["quantization"] = quantization
+        if quantization and header["count"] and header["dimension"]:
+            vectors = np.memmap(self._vectors_path, dtype=header["dtype"], mode="r",
+                                shape=(header["count"], header["dimension"]))
+            for start in range(0, header["count"], self.scan_rows):
+                self._write_codes(header, start, np.asarray(vectors[start:start + self.scan_rows], dtype=np.float32),
+                                  NEXT_SUFFIX)
+            del vectors
+            logger.info(f"Built {quantization} codes for {header['count']} flat store rows")
+        self._swap_in_next_files((self._codes_path, self._scales_path))
+        header["version"] += 1
+        self._write_header(header)
+
+    def delete(self, ids: List[str]) -> None:
+        """Mark the rows of these IDs as dead."""
+        with self._exclusive():
+            with self._lock:
+                self._mark_dead_locked(ids)
+                self._conn.commit()
+            header = self._read_header()
+            header["version"] += 1
+            self._write_header(header)
+
+    def _mark_dead_locked(self, ids: List[str]) -> None:
+        for start in range(0, len(ids), self.LOOKUP_BATCH_SIZE):
+            batch = ids[start:start + self.LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(f"UPDATE rows SET live = 0 WHERE live = 1 AND id IN ({placeholders})", batch)
+
+    def clear(self) -> None:
+        """Remove all rows, keeping the storage dtype."""
+        self.rebuild([])
+
+    def rebuild(self, batches: Iterable[Tuple[List[str], Sequence[Sequence[float]], Optional[List[str]],
+                                              Optional[List[Dict[str, Any]]]]],
+                expected_rows: Optional[int] = None) -> Optional[int]:
+        """
+        Replace all rows, compacting away dead ones.
+
+        The rows are written to new files and an SQLite staging table, then
+        swapped in at once; searches keep using the old rows until then.
+
+        Args:
+            batches: (ids, vectors, documents, metadatas) tuples, consumed with the write lock held
+            expected_rows: Skip the rebuild if the store already holds this many live rows once
+                the lock is acquired, e.g. because another process rebuilt it meanwhile
+
+        Returns:
+            Number of rows written, or None if the rebuild was skipped
+        """
+        with self._exclusive():
+            if expected_rows is not None and self._live_count() == expected_rows:
+                return None
+            header = self._read_header()
+            header.update(dimension=None, count=0)
+            self._create_next_files(self._data_paths())
+            with self._lock:
+                self._conn.execute("DROP TABLE IF EXISTS rows_next")
+                self._conn.execute("CREATE TABLE rows_next AS SELECT * FROM rows WHERE 0")
+                self._conn.commit()
+
+            for ids, vectors, documents, metadatas in batches:
+                if not ids:
+                    continue
+                matrix = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+                if header["dimension"] is None:
+                    header["dimension"] = int(matrix.shape[1])
+                elif matrix.shape[1] != header["dimension"]:
+                    raise ValueError(f"Expected vectors of dimension {header['dimension']}, got {matrix.shape[1]}")
+                start = header["count"]
+                self._write_rows(f"{self._vectors_path}{NEXT_SUFFIX}", start, matrix.astype(header["dtype"]))
+                self._write_codes(header, start, matrix, NEXT_SUFFIX)
+                with self._lock:
+                    self._insert_rows_locked("rows_next", start, ids, documents or [None] * len(ids),
+                                             metadatas or [None] * len(ids))
+                    self._conn.commit()
+                header["count"] = start + len(ids)
+
+            # Rows and generation change in one transaction, so lookups by
+            # readers of the previous generation can tell they are stale
+            header["generation"] = header.get("generation", 0) + 1
+            self._swap_in_next_files(self._data_paths())
+            with self._lock:
+                self._conn.execute("DELETE FROM rows")
+                self._conn.execute("INSERT INTO rows SELECT * FROM rows_next")
+                self._conn.execute("DROP TABLE rows_next")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (header["generation"],)
+                )
+                self._conn.commit()
+            header["version"] += 1
+            self._write_header(header)
+            return header["count"]
+
+    def _current_view(self, wait: bool = False) -> Tuple[Optional[np.ndarray], Optional[np.ndarray],
+                                                         Optional[np.ndarray], np.ndarray, int]:
+        """
+        Committed rows, codes, scales, dead-row list and generation, re-mapped
+        if the store changed since the last search.
+
+        Args:
+            wait: Wait for a running writer instead of keeping the previous mapping
+        """
+        if self._read_header()["version"] != self._view_version:
+            # While a writer holds the lock (a rebuild can take minutes), keep
+            # searching the previous mapping if there is one: its files stay
+            # intact until swapped out, rows deleted since are filtered out by
+            # _get_rows, and _get_rows rejects lookups once a rebuild has
+            # renumbered the rows
+            with self._shared(blocking=wait or self._view_version is None) as acquired:
+                if acquired:
+                    with self._lock:
+                        self._refresh_view_locked()
+        with self._lock:
+            return self._view, self._codes, self._scales, self._dead_rows, self._view_generation
+
+    def _refresh_view_locked(self) -> None:
+        """Map the committed rows and load the dead-row list. Call with the shared lock and _lock held."""
+        header = self._read_header()
+        if header["version"] != self._view_version:
+            count, dimension = header["count"], header["dimension"]
+            quantization = header.get("quantization")
+            self._view = self._codes = self._scales = None
+            if count and dimension:
+                self._view = np.memmap(self._vectors_path, dtype=header["dtype"], mode="r", shape=(count, dimension))
+                if quantization:
+                    self._codes = np.memmap(
+                        self._codes_path, dtype=np.int8 if quantization == QUANTIZATION_INT8 else np.uint8,
+                        mode="r", shape=(count, code_row_bytes(quantization, dimension))
+                    )
+                if quantization == QUANTIZATION_INT8:
+                    self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(count,))
+            dead = self._conn.execute("SELECT row FROM rows WHERE live = 0").fetchall()
+            self._dead_rows = np.fromiter((row for (row,) in dead), dtype=np.int64, count=len(dead))
+            self._dead_rows.sort()
+            self._view_version = header["version"]
+            self._view_generation = header.get("generation", 0)
+
+    def live_count(self) -> int:
+        return self._live_count()
+
+    def _live_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rows WHERE live = 1").fetchone()[0]
+
+    def search(self, query_vectors: Sequence[Sequence[float]], k: int,
+               oversample: Optional[float] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Cosine search over all live rows.
+
+        Rows are scored scan_rows at a time straight from the memory map,
+        keeping a running top-k per query, so memory use does not grow with
+        the corpus. With quantized codes, the scan runs over the codes and
+        the best k * oversample candidates per query are re-scored with
+        their full-precision vectors.
+
+        Args:
+            query_vectors: One embedding per query
+            k: Results per query
+            oversample: Overrides the store's oversampling factor
+
+        Returns:
+            One list per query of {"id", "document", "metadata", "score"}, best first
+        """
+        queries = normalize_rows(np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1))
+        wait = False
+        while True:
+            view, codes, scales, dead_rows, generation = self._current_view(wait)
+            if view is None:
+                return [[] for _ in range(len(queries))]
+            best_scores, best_rows = self._search_view(view, codes, scales, dead_rows, queries, k, oversample)
+            hit_rows = {int(row) for row, score in zip(best_rows.ravel(), best_scores.ravel()) if np.isfinite(score)}
+            records = self._get_rows(list(hit_rows), generation)
+            if records is not None:
+                break
+            # A rebuild renumbered the rows since this view was mapped; search the new one
+            logger.debug("Flat store was rebuilt during a search, searching again")
+            wait = True
+        return [
+            [
+                {**records[int(row)], "score": float(score)}
+                for row, score in zip(row_hits, score_hits)
+                if np.isfinite(score) and int(row) in records
+            ]
+            for row_hits, score_hits in zip(best_rows, best_scores)
+        ]
+
+    def _search_view(self, view: np.ndarray, codes: Optional[np.ndarray], scales: Optional[np.ndarray],
+                     dead_rows: np.ndarray, queries: np.ndarray, k: int,
+                     oversample: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Best scores and rows per query in one mapped view."""
+        if codes is None:
+            best_scores, best_rows = self._scan(
+                view.shape[0], lambda start, end: queries @ np.asarray(view[start:end], dtype=np.float32).T,
+                k, dead_rows
+            )
+        else:
+            if scales is not None:
+                # int8: dot product with the dequantized rows
+                score_block = lambda start, end: (queries @ codes[start:end].astype(np.float32).T) * scales[start:end]
+            else:
+                # Binary: q . sign(v) = 2 q . bits(v) - sum(q), so ranking by q . bits(v) is equivalent
+                dimension = view.shape[1]
+                score_block = lambda start, end: queries @ np.unpackbits(codes[start:end], axis=1, count=dimension).astype(np.float32).T
+            candidate_k = max(k, int(np.ceil(k * (oversample or self.oversample))))
+            first_scores, candidates = self._scan(view.shape[0], score_block, candidate_k, dead_rows)
+            best_scores, best_rows = self._rescore(view, queries, first_scores, candidates, k)
+        return best_scores, best_rows
+
+    def _scan(self, count: int, score_block: Callable[[int, int], np.ndarray], k: int,
+              dead_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Score rows block by block, keeping the running top k per query; dead rows score -inf."""
+        best_scores = best_rows = None
+        for start in range(0, count, self.scan_rows):
+            end = min(start + self.scan_rows, count)
+            scores = score_block(start, end)
+            lo, hi = np.searchsorted(dead_rows, [start, end])
+            if hi > lo:
+                scores[:, dead_rows[lo:hi] - start] = -np.inf
+            block_scores, block_rows = top_k(scores, k)
+            if best_scores is None:
+                best_scores, best_rows = block_scores, block_rows + start
+                continue
+            best_scores, merged = top_k(np.concatenate([best_scores, block_scores], axis=1), k)
+            best_rows = np.take_along_axis(np.concatenate([best_rows, block_rows + start], axis=1), merged, axis=1)
+        return best_scores, best_rows
+
+    @staticmethod
+    def _rescore(view: np.ndarray, queries: np.ndarray, first_scores: np.ndarray,
+                 candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-rank first-pass candidates by their exact cosine similarity."""
+        # Read each candidate row once, in file order
+        unique_rows, inverse = np.unique(candidates, return_inverse=True)
+        vectors = np.asarray(view[unique_rows], dtype=np.float32)
+        exact = np.einsum("qcd,qd->qc", vectors[inverse.reshape(candidates.shape)], queries)
+        exact[~np.isfinite(first_scores)] = -np.inf
+        best_scores, order = top_k(exact, k)
+        return best_scores, np.take_along_axis(candidates, order, axis=1)
+
+    def _generation_locked(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def _get_rows(self, rows: List[int], generation: int) -> Optional[Dict[int, Dict[str, Any]]]:
+        """
+        Look up the live records of rows numbered as in the given generation.
+
+        Returns:
+            Records by row, or None if the sidecar has been rebuilt since
+        """
+        records: Dict[int, Dict[str, Any]] = {}
+        with self._lock:
+            # A rebuild swaps rows and generation in one transaction, so equal
+            # generations before and after mean every row read belongs to it
+            if self._generation_locked() != generation:
+                return None
+            for start in range(0, len(rows), self.LOOKUP_BATCH_SIZE):
+                batch = rows[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                for row, row_id, document, metadata in self._conn.execute(
+                    f"SELECT row, id, document, metadata FROM rows WHERE live = 1 AND row IN ({placeholders})", batch
+                ):
+                    records[row] = {
+                        "id": row_id,
+                        "document": document,
+                        "metadata": json.loads(metadata) if metadata else {},
+                    }
+            if self._generation_locked() != generation:
+                return None
+        return records
+
+    def stats(self) -> Dict[str, Any]:
+        """Return row counts and file size."""
+        header = self._read_header()
+        return {
+            "rows": header["count"],
+            "live_rows": self.live_count(),
+            "dtype": header["dtype"],
+            "dimension": header["dimension"],
+            "quantization": header.get("quantization"),
+            "bytes": os.path.getsize(self._vectors_path),
+            "code_bytes": os.path.getsize(self._codes_path) + os.path.getsize(self._scales_path),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._view = self._codes = self._scales = None
+            self._conn.close()
@@ -9,11 +9,24 @@ from langchain_core.output_parsers import StrOutputParser
 import asyncio
 import json
 import re
+from functools import lru_cache
 from bs4 import BeautifulSoup
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 
 from config import get_settings
+from services.context_packer import ContextPacker
+from utils.cache import AsyncTTLCache
+from utils.misc import gather_with_concurrency
+
+@lru_cache()
+def get_scrape_cache() -> AsyncTTLCache:
+    """Get the process-wide cache of cleaned supplier page content keyed by part number."""
+    settings = get_settings()
+    return AsyncTTLCache(
+        max_entries=settings.SCRAPE_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.SCRAPE_CACHE_TTL
+    )
 
 class LLMInterface:
     """Service for handling LLM interactions and web scraping."""
@@ -22,6 +35,8 @@ class LLMInterface:
         """Initialize the LLM interface with configuration."""
         self.settings = get_settings()
         self.llm = self._initialize_llm()
+        self.scrape_cache = get_scrape_cache()
+        self.context_packer = ContextPacker()
         
         # Website configurations for scraping
         self.website_configs = [
@@ -88,26 +103,57 @@ class LLMInterface:
             logger.error(f"Failed to initialize Groq LLM: {e}")
             raise ConnectionError(f"Could not initialize Groq LLM: {e}")
 
+    @staticmethod
+    def format_chunk_header(i: int, doc: Document) -> str:
+        """Header format_docs puts before the i-th (zero-based) document, including the separator before it."""
+        source = doc.metadata.get('source', 'Unknown')
+        page = doc.metadata.get('page', 'N/A')
+        start_index = doc.metadata.get('start_index', None)
+        chunk_info = f"Chunk {i+1}" + (f" (starts at char {start_index})" if start_index is not None else "")
+        return ("\n\n---\n\n" if i else "") + f"{chunk_info} from '{source}' (Page {page}):\n"
+
     @staticmethod
     def format_docs(docs: List[Document]) -> str:
         """Format retrieved documents into a string for the prompt."""
-        context_parts = []
-        for i, doc in enumerate(docs):
-            source = doc.metadata.get('source', 'Unknown')
-            page = doc.metadata.get('page', 'N/A')
-            start_index = doc.metadata.get('start_index', None)
-            chunk_info = f"Chunk {i+1}" + (f" (starts at char {start_index})" if start_index is not None else "")
-            context_parts.append(
-                f"{chunk_info} from '{source}' (Page {page}):\n{doc.page_content}"
-            )
-        return "\n\n---\n\n".join(context_parts)
+        return "".join(LLMInterface.format_chunk_header(i, doc) + doc.page_content for i, doc in enumerate(docs))
+
+    def get_context_budget(self, batch: bool = False) -> int:
+        """Token budget for PDF context in a single-attribute or batch prompt for the configured model."""
+        overrides = self.settings.CONTEXT_TOKEN_BUDGETS.get(self.settings.LLM_MODEL_NAME, {})
+        if batch:
+            return overrides.get("batch", self.settings.BATCH_CONTEXT_TOKEN_BUDGET)
+        return overrides.get("single", self.settings.CONTEXT_TOKEN_BUDGET)
+
+    def pack_context(self, docs: List[Document], batch: bool = False) -> str:
+        """Format retrieved documents for the prompt, packed into the model's token budget."""
+        if not self.settings.CONTEXT_PACKING_ENABLED:
+            return self.format_docs(docs)
+        result = self.context_packer.pack(docs, self.get_context_budget(batch), chunk_header=self.format_chunk_header)
+        saved = result.tokens_before - result.tokens_after
+        logger.info(
+            f"Packed {len(docs)} chunks into {len(result.documents)}: {result.tokens_before} -> "
+            f"{result.tokens_after} tokens ({saved} saved)"
+        )
+        return self.format_docs(result.documents)
 
-    def create_pdf_extraction_chain(self, retriever: VectorStoreRetriever) -> Optional[Any]:
-        """Create a RAG chain for PDF extraction."""
-        if retriever is None or self.llm is None:
-            logger.error("Retriever or LLM is not initialized for PDF extraction chain.")
+    def create_pdf_extraction_chain(self, retriever: Optional[VectorStoreRetriever]) -> Optional[Any]:
+        """
+        Create a RAG chain for PDF extraction.
+        
+        The chain uses the 'context_docs' input when given (hits retrieved
+        ahead of time) and otherwise queries the retriever.
+        """
+        if self.llm is None:
+            logger.error("LLM is not initialized for PDF extraction chain.")
             return None
 
+        def get_context_docs(x: Dict[str, Any]) -> List[Document]:
+            if x.get('context_docs') is not None:
+                return x['context_docs']
+            if retriever is None:
+                raise ValueError("No retriever or precomputed context for PDF extraction.")
+            return retriever.invoke(self.build_retrieval_query(x['attribute_key'], x.get('part_number')))
+
         template = """
 You are an expert data extractor. Your goal is to extract a specific piece of information based on the Extraction Instructions provided below, using ONLY the Document Context from PDFs.
 
@@ -137,7 +183,7 @@ Output:
 
         pdf_chain = (
             RunnableParallel(
-                context=RunnablePassthrough() | (lambda x: retriever.invoke(f"Extract information about {x['attribute_key']} for part number {x.get('part_number', 'N/A')}")) | self.format_docs,
+                context=RunnablePassthrough() | get_context_docs | self.pack_context,
                 extraction_instructions=RunnablePassthrough(),
                 attribute_key=RunnablePassthrough(),
                 part_number=RunnablePassthrough()
@@ -204,11 +250,60 @@ Output:
         logger.info("Web Data Extraction chain created successfully.")
         return web_chain
 
+    def create_batch_extraction_chain(self, context_label: str) -> Optional[Any]:
+        """
+        Create a chain that extracts several attributes from one shared context.
+        
+        Args:
+            context_label: Human readable name of the context, e.g. "Cleaned Scraped Website Data"
+        """
+        if self.llm is None:
+            logger.error("LLM is not initialized for batch extraction chain.")
+            return None
+
+        template = """
+You are an expert data extractor. Your goal is to extract several specific pieces of information. For EACH attribute listed under 'Attributes to Extract', apply that attribute's Extraction Instructions to the '""" + context_label + """' provided below. Use ONLY the provided context.
+
+Part Number Information (if provided by user):
+{part_number}
+
+--- """ + context_label + """ ---
+{context}
+--- End """ + context_label + """ ---
+
+Attributes to Extract:
+{attribute_instructions}
+
+---
+IMPORTANT: Respond with ONLY a single, valid JSON object.
+- The JSON object MUST contain exactly these keys: {attribute_keys}
+- Each value MUST be the result obtained by applying that attribute's Extraction Instructions to the context above, given as a JSON string.
+- If an attribute cannot be determined from the context, its value MUST be "NOT FOUND".
+- Do NOT include any explanations, reasoning, or any text outside of the single JSON object in your response.
+
+Output:
+"""
+        prompt = PromptTemplate.from_template(template)
+        batch_chain = prompt | self.llm | StrOutputParser()
+        logger.info(f"Batch extraction chain created successfully for {context_label}.")
+        return batch_chain
+
+    @staticmethod
+    def format_attribute_instructions(attributes: Dict[str, str]) -> str:
+        """Format per-attribute extraction instructions into one prompt section."""
+        sections = []
+        for i, (attribute_key, instructions) in enumerate(attributes.items()):
+            sections.append(
+                f"### Attribute {i+1}: \"{attribute_key}\"\nExtraction Instructions:\n{instructions.strip()}"
+            )
+        return "\n\n".join(sections)
+
     async def extract_attribute(self, 
                               attribute_key: str, 
                               extraction_instructions: str, 
                               part_number: Optional[str] = None,
-                              retriever: Optional[VectorStoreRetriever] = None) -> Tuple[str, str, float]:
+                              retriever: Optional[VectorStoreRetriever] = None,
+                              context_docs: Optional[List[Document]] = None) -> Tuple[str, str, float]:
         """
         Extract attribute using two-stage approach (web first, then PDF fallback).
         
@@ -217,6 +312,7 @@ Output:
             extraction_instructions: Instructions for extraction
             part_number: Optional part number for web scraping
             retriever: Optional retriever for PDF fallback
+            context_docs: Optional PDF hits retrieved ahead of time, used instead of the retriever
             
         Returns:
             Tuple of (extracted_value, source, latency)
@@ -228,50 +324,20 @@ Output:
             try:
                 web_data = await self.scrape_website_table_html(part_number)
                 if web_data:
-                    web_chain = self.create_web_extraction_chain()
-                    if web_chain:
-                        web_result = await self.invoke_chain_and_process(
-                            web_chain,
-                            {
-                                'cleaned_web_data': web_data,
-                                'extraction_instructions': extraction_instructions,
-                                'attribute_key': attribute_key
-                            },
-                            attribute_key
-                        )
-                        
-                        try:
-                            result_dict = json.loads(web_result)
-                            if attribute_key in result_dict and result_dict[attribute_key] != "NOT FOUND":
-                                latency = asyncio.get_event_loop().time() - start_time
-                                return result_dict[attribute_key], "web", latency
-                        except json.JSONDecodeError:
-                            logger.error(f"Failed to parse web extraction result for {attribute_key}")
+                    value = await self._extract_from_web(attribute_key, extraction_instructions, web_data)
+                    if value is not None and value != "NOT FOUND":
+                        latency = asyncio.get_event_loop().time() - start_time
+                        return value, "web", latency
             except Exception as e:
                 logger.error(f"Web extraction failed for {attribute_key}: {e}")
         
         # Stage 2: PDF fallback
-        if retriever:
+        if retriever or context_docs is not None:
             try:
-                pdf_chain = self.create_pdf_extraction_chain(retriever)
-                if pdf_chain:
-                    pdf_result = await self.invoke_chain_and_process(
-                        pdf_chain,
-                        {
-                            'extraction_instructions': extraction_instructions,
-                            'attribute_key': attribute_key,
-                            'part_number': part_number
-                        },
-                        attribute_key
-                    )
-                    
-                    try:
-                        result_dict = json.loads(pdf_result)
-                        if attribute_key in result_dict:
-                            latency = asyncio.get_event_loop().time() - start_time
-                            return result_dict[attribute_key], "pdf", latency
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to parse PDF extraction result for {attribute_key}")
+                value = await self._extract_from_pdf(attribute_key, extraction_instructions, part_number, retriever, context_docs)
+                if value is not None:
+                    latency = asyncio.get_event_loop().time() - start_time
+                    return value, "pdf", latency
             except Exception as e:
                 logger.error(f"PDF extraction failed for {attribute_key}: {e}")
         
@@ -279,6 +345,226 @@ Output:
         latency = asyncio.get_event_loop().time() - start_time
         return "NOT FOUND", "none", latency
 
+    async def extract_attributes(self,
+                                 attributes: Dict[str, str],
+                                 part_number: Optional[str] = None,
+                                 retriever: Optional[VectorStoreRetriever] = None,
+                                 attribute_contexts: Optional[Dict[str, List[Document]]] = None) -> Dict[str, Tuple[str, str, float]]:
+        """
+        Extract several attributes with one LLM call per stage over a shared context.
+        
+        Follows the same web-first, PDF-fallback order as extract_attribute. Each
+        stage sends its context once with all pending instructions; keys that come
+        back missing or malformed are retried with a single-attribute call for that
+        stage only.
+        
+        Args:
+            attributes: Mapping of attribute key to extraction instructions
+            part_number: Optional part number for web scraping
+            retriever: Optional retriever for PDF fallback
+            attribute_contexts: Optional PDF hits per attribute retrieved ahead of time
+            
+        Returns:
+            Mapping of attribute key to (extracted_value, source, latency)
+        """
+        start_time = asyncio.get_event_loop().time()
+        results: Dict[str, Tuple[str, str, float]] = {}
+        
+        # Stage 1: Web extraction for all attributes at once
+        if part_number and attributes:
+            try:
+                web_data = await self.scrape_website_table_html(part_number)
+                if web_data:
+                    web_values = await self._extract_batch_from_web(attributes, web_data)
+                    latency = asyncio.get_event_loop().time() - start_time
+                    for attribute_key, value in web_values.items():
+                        if value is not None and value != "NOT FOUND":
+                            results[attribute_key] = (value, "web", latency)
+            except Exception as e:
+                logger.error(f"Batch web extraction failed: {e}")
+        
+        # Stage 2: PDF fallback for whatever the web did not answer
+        remaining = {k: v for k, v in attributes.items() if k not in results}
+        if (retriever or attribute_contexts is not None) and remaining:
+            try:
+                pdf_values = await self._extract_batch_from_pdf(remaining, part_number, retriever, attribute_contexts)
+                latency = asyncio.get_event_loop().time() - start_time
+                for attribute_key, value in pdf_values.items():
+                    if value is not None:
+                        results[attribute_key] = (value, "pdf", latency)
+            except Exception as e:
+                logger.error(f"Batch PDF extraction failed: {e}")
+        
+        latency = asyncio.get_event_loop().time() - start_time
+        return {
+            attribute_key: results.get(attribute_key, ("NOT FOUND", "none", latency))
+            for attribute_key in attributes
+        }
+
+    async def _extract_from_web(self, attribute_key: str, extraction_instructions: str, web_data: str) -> Optional[str]:
+        """Run the single-attribute web chain; returns None if no usable value came back."""
+        web_chain = self.create_web_extraction_chain()
+        if not web_chain:
+            return None
+        web_result = await self.invoke_chain_and_process(
+            web_chain,
+            {
+                'cleaned_web_data': web_data,
+                'extraction_instructions': extraction_instructions,
+                'attribute_key': attribute_key
+            },
+            attribute_key
+        )
+        try:
+            return self._coerce_value(json.loads(web_result).get(attribute_key))
+        except (json.JSONDecodeError, AttributeError):
+            logger.error(f"Failed to parse web extraction result for {attribute_key}")
+            return None
+
+    async def _extract_from_pdf(self, attribute_key: str, extraction_instructions: str,
+                                part_number: Optional[str], retriever: Optional[VectorStoreRetriever],
+                                context_docs: Optional[List[Document]] = None) -> Optional[str]:
+        """Run the single-attribute PDF chain; returns None if no usable value came back."""
+        pdf_chain = self.create_pdf_extraction_chain(retriever)
+        if not pdf_chain:
+            return None
+        pdf_result = await self.invoke_chain_and_process(
+            pdf_chain,
+            {
+                'extraction_instructions': extraction_instructions,
+                'attribute_key': attribute_key,
+                'part_number': part_number,
+                'context_docs': context_docs
+            },
+            attribute_key
+        )
+        try:
+            return self._coerce_value(json.loads(pdf_result).get(attribute_key))
+        except (json.JSONDecodeError, AttributeError):
+            logger.error(f"Failed to parse PDF extraction result for {attribute_key}")
+            return None
+
+    async def _extract_batch_from_web(self, attributes: Dict[str, str], web_data: str) -> Dict[str, Optional[str]]:
+        """Extract all attributes from scraped web data, retrying bad keys one by one."""
+        values = await self._invoke_batch_chain(
+            "Cleaned Scraped Website Data", web_data, attributes, part_number=None
+        )
+        return await self._fill_missing_values(
+            values, attributes,
+            lambda key: self._extract_from_web(key, attributes[key], web_data)
+        )
+
+    async def _extract_batch_from_pdf(self, attributes: Dict[str, str], part_number: Optional[str],
+                                      retriever: Optional[VectorStoreRetriever],
+                                      attribute_contexts: Optional[Dict[str, List[Document]]] = None) -> Dict[str, Optional[str]]:
+        """Extract all attributes from the union of their retrieved chunks, retrying bad keys one by one."""
+        if attribute_contexts is not None:
+            ranked_hits = [attribute_contexts.get(key, []) for key in attributes]
+        else:
+            queries = [self.build_retrieval_query(key, part_number) for key in attributes]
+            ranked_hits = await asyncio.gather(*(retriever.ainvoke(query) for query in queries))
+        docs = self._merge_ranked_documents(ranked_hits, self.settings.BATCH_EXTRACTION_MAX_CONTEXT_CHUNKS)
+        values = await self._invoke_batch_chain(
+            "Document Context (from PDFs)", self.pack_context(docs, batch=True), attributes, part_number=part_number
+        )
+        return await self._fill_missing_values(
+            values, attributes,
+            lambda key: self._extract_from_pdf(
+                key, attributes[key], part_number, retriever,
+                attribute_contexts.get(key) if attribute_contexts is not None else None
+            )
+        )
+
+    async def _invoke_batch_chain(self, context_label: str, context: str, attributes: Dict[str, str],
+                                  part_number: Optional[str]) -> Dict[str, Optional[str]]:
+        """Invoke the batch chain once and parse one value per requested key."""
+        batch_chain = self.create_batch_extraction_chain(context_label)
+        if not batch_chain:
+            return {key: None for key in attributes}
+        try:
+            response = await batch_chain.ainvoke({
+                'context': context,
+                'part_number': part_number or "Not Provided",
+                'attribute_instructions': self.format_attribute_instructions(attributes),
+                'attribute_keys': json.dumps(list(attributes), ensure_ascii=False)
+            })
+            logger.info(f"Batch chain invoked successfully for {len(attributes)} attributes. Response length: {len(response) if response else 0}")
+        except Exception as e:
+            logger.error(f"Error during batch chain invocation: {e}")
+            return {key: None for key in attributes}
+        return self._parse_batch_response(response, list(attributes))
+
+    async def _fill_missing_values(self, values: Dict[str, Optional[str]], attributes: Dict[str, str],
+                                   extract_one: Any) -> Dict[str, Optional[str]]:
+        """Retry keys without a usable batch value through single-attribute extraction."""
+        missing = [key for key in attributes if values.get(key) is None]
+        if missing:
+            logger.warning(f"Batch extraction missing or malformed for {len(missing)} attributes, falling back: {missing}")
+            retried = await gather_with_concurrency(
+                self.settings.MAX_PARALLEL_ATTRIBUTES,
+                [extract_one(key) for key in missing],
+                return_exceptions=True
+            )
+            for key, value in zip(missing, retried):
+                if isinstance(value, BaseException):
+                    logger.error(f"Fallback extraction failed for {key}: {value}")
+                    continue
+                values[key] = value
+        return values
+
+    def _parse_batch_response(self, response: Optional[str], attribute_keys: List[str]) -> Dict[str, Optional[str]]:
+        """Parse a multi-key JSON response; keys that are missing or not scalar map to None."""
+        if not response:
+            return {key: None for key in attribute_keys}
+        cleaned_response = self._strip_response_wrappers(response)
+        first_brace = cleaned_response.find('{')
+        last_brace = cleaned_response.rfind('}')
+        try:
+            if first_brace == -1 or last_brace <= first_brace:
+                raise json.JSONDecodeError("No JSON object found", cleaned_response, 0)
+            result_dict = json.loads(cleaned_response[first_brace:last_brace + 1])
+            if not isinstance(result_dict, dict):
+                raise json.JSONDecodeError("Response is not a JSON object", cleaned_response, 0)
+        except json.JSONDecodeError:
+            logger.error("Invalid JSON in batch extraction response")
+            return {key: None for key in attribute_keys}
+        return {key: self._coerce_value(result_dict.get(key)) for key in attribute_keys}
+
+    @staticmethod
+    def _coerce_value(value: Any) -> Optional[str]:
+        """Return an extracted value as a string, or None if it is missing or malformed."""
+        if isinstance(value, bool) or value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return str(value)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+        return None
+
+    @staticmethod
+    def build_retrieval_query(attribute_key: str, part_number: Optional[str]) -> str:
+        """Build the retrieval query used to find PDF context for one attribute."""
+        return f"Extract information about {attribute_key} for part number {part_number or 'N/A'}"
+
+    @staticmethod
+    def _merge_ranked_documents(ranked_hits: List[List[Document]], max_docs: int) -> List[Document]:
+        """Interleave per-query hits rank by rank, dropping duplicates, up to max_docs."""
+        merged: List[Document] = []
+        seen = set()
+        for rank in range(max((len(hits) for hits in ranked_hits), default=0)):
+            for hits in ranked_hits:
+                if rank >= len(hits):
+                    continue
+                doc = hits[rank]
+                key = (doc.metadata.get('source'), doc.metadata.get('page'), doc.page_content)
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(doc)
+                if len(merged) >= max_docs:
+                    return merged
+        return merged
+
     async def invoke_chain_and_process(self, chain: Any, input_data: Dict[str, Any], attribute_key: str) -> str:
         """Invoke chain, handle errors, and clean response."""
         try:
@@ -298,6 +584,28 @@ Output:
 
     def _clean_chain_response(self, response: str, attribute_key: str) -> str:
         """Clean and validate chain response."""
+        cleaned_response = self._strip_response_wrappers(response)
+
+        # Extract JSON object
+        try:
+            first_brace = cleaned_response.find('{')
+            last_brace = cleaned_response.rfind('}')
+            if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
+                potential_json = cleaned_response[first_brace:last_brace + 1]
+                json.loads(potential_json)  # Validate JSON
+                cleaned_response = potential_json
+            else:
+                logger.warning(f"No valid JSON object found in response for '{attribute_key}'")
+                return json.dumps({attribute_key: "NOT FOUND"})
+        except json.JSONDecodeError:
+            logger.error(f"Invalid JSON in response for '{attribute_key}'")
+            return json.dumps({attribute_key: "NOT FOUND"})
+
+        return cleaned_response
+
+    @staticmethod
+    def _strip_response_wrappers(response: str) -> str:
+        """Remove <think> reasoning and ```json fences around an LLM response."""
         cleaned_response = response
 
         # Remove <think> tags
@@ -315,28 +623,29 @@ Output:
                 cleaned_response = cleaned_response[:-3]
             cleaned_response = cleaned_response.strip()
 
-        # Extract JSON object
-        try:
-            first_brace = cleaned_response.find('{')
-            last_brace = cleaned_response.rfind('}')
-            if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
-                potential_json = cleaned_response[first_brace:last_brace + 1]
-                json.loads(potential_json)  # Validate JSON
-                cleaned_response = potential_json
-            else:
-                logger.warning(f"No valid JSON object found in response for '{attribute_key}'")
-                return json.dumps({attribute_key: "NOT FOUND"})
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in response for '{attribute_key}'")
-            return json.dumps({attribute_key: "NOT FOUND"})
-
         return cleaned_response
 
     async def scrape_website_table_html(self, part_number: str) -> Optional[str]:
-        """Scrape HTML tables from supplier websites."""
+        """
+        Scrape HTML tables from supplier websites, reusing cached content.
+        
+        All attributes of a request, and requests within SCRAPE_CACHE_TTL, share
+        one crawl per part number. Concurrent callers for the same part wait on
+        the crawl already in flight. Parts with no supplier page are cached for
+        the shorter SCRAPE_CACHE_NEGATIVE_TTL.
+        """
         if not part_number:
             return None
 
+        return await self.scrape_cache.get_or_load(
+            part_number,
+            lambda: self._scrape_website_table_html_uncached(part_number),
+            ttl_for=lambda content: None if content else self.settings.SCRAPE_CACHE_NEGATIVE_TTL
+        )
+
+    async def _scrape_website_table_html_uncached(self, part_number: str) -> Optional[str]:
+        """Scrape HTML tables from supplier websites."""
+        logger.info(f"Scraping supplier websites for part {part_number}")
         for config in self.website_configs:
             if config["part_number_pattern"] and not re.match(config["part_number_pattern"], part_number):
                 continue
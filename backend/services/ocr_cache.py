@@ -0,0 +1,179 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from loguru import logger
+
+class OCRCache:
+    """Disk-backed cache of Vision Markdown keyed by rendered page content.
+
+    Entries live as one UTF-8 file per key under `cache_dir`, sharded by the
+    first two hex characters of the key. A file's mtime is its last use, which
+    drives both age-based expiry and least-recently-used size eviction.
+    """
+
+    # Evict down to this fraction of max_bytes so eviction is not run on every write
+    LOW_WATERMARK = 0.9
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_age_seconds: int):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding cached Markdown files
+            max_bytes: Total size above which least recently used entries are evicted
+            max_age_seconds: Entries unused for longer than this are treated as misses and removed
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+        logger.info(f"OCR cache at {self.cache_dir} holds {self._total_bytes} bytes")
+
+    @staticmethod
+    def make_key(page_payloads: Iterable[str], model_name: str, prompt_version: str) -> str:
+        """
+        Build a cache key from the rendered page payload(s), model and prompt version.
+
+        Args:
+            page_payloads: Encoded image payload(s) sent to the Vision model for the page
+            model_name: Vision model name
+            prompt_version: Version of the Markdown extraction prompt
+
+        Returns:
+            SHA-256 hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{model_name}\0{prompt_version}\0".encode())
+        for payload in page_payloads:
+            digest.update(payload.encode() if isinstance(payload, str) else payload)
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.md")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached Markdown for key, or None on a miss or expired entry."""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.max_age_seconds:
+                self._remove(path, stat.st_size)
+                with self._lock:
+                    self.misses += 1
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                markdown = f.read()
+            os.utime(path)  # Record use for LRU eviction
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read OCR cache entry {key}: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return markdown
+
+    def put(self, key: str, markdown: str) -> None:
+        """Store Markdown for key, evicting old entries if the cache is over budget."""
+        path = self._path(key)
+        data = markdown.encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self.writes += 1
+            self._total_bytes += len(data) - previous_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then least recently used ones until under budget.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total_bytes = sum(size for _, size, _ in entries)
+        target_bytes = int(self.max_bytes * self.LOW_WATERMARK)
+        removed = 0
+
+        for path, size, mtime in entries:
+            expired = now - mtime > self.max_age_seconds
+            if not expired and total_bytes <= target_bytes:
+                break
+            if self._remove(path, 0):
+                total_bytes -= size
+                removed += 1
+
+        with self._lock:
+            self._total_bytes = total_bytes
+            self.evictions += removed
+        if removed:
+            logger.info(f"Evicted {removed} OCR cache entries, {total_bytes} bytes remain")
+        return removed
+
+    def _remove(self, path: str, size: int) -> bool:
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        if size:
+            with self._lock:
+                self._total_bytes -= size
+                self.evictions += 1
+        return True
+
+    def _scan(self) -> List[Tuple[str, int, float]]:
+        """List (path, size, mtime) for every cached entry."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".md"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,238 @@
+"""
+ONNX Runtime embedding backend.
+Exports the configured sentence-transformers model to ONNX (optionally with
+int8 dynamic quantization), checks its vectors against the torch model, and
+serves embeddings from an ONNX Runtime CPU session.
+
+Requires the optional onnxruntime package; exporting also needs torch and
+sentence-transformers, which the default backend already uses.
+"""
+
+import os
+import json
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from loguru import logger
+from langchain_core.embeddings import Embeddings
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+META_FILE = "onnx_config.json"
+
+# Short and long (truncated) datasheet-style texts used to compare backends
+PARITY_SAMPLE = [
+    "Contact plating: gold over nickel",
+    "Operating temperature range -40 °C to +125 °C",
+    "Number of cavities: 12, pitch 2.54 mm",
+    "Housing material PA66 GF30, color black, UL94 V-0",
+    "Extract information about Wire Seal for part number 1-1418390-1",
+    "Sealed connector with primary and secondary locking, mating cycles 10. " * 40,
+    "| Parameter | Value |\n| --- | --- |\n| Rated current | 3 A |\n| Rated voltage | 48 V |",
+    "The terminal position assurance (TPA) is delivered pre-assembled in the housing.",
+]
+
+def onnx_model_dir(base_dir: str, model_name: str) -> str:
+    """Directory holding the exported ONNX files for a model."""
+    return os.path.join(base_dir, model_name.replace("/", "__"))
+
+def cosine_agreement(reference: Sequence[Sequence[float]], candidate: Sequence[Sequence[float]]) -> Dict[str, float]:
+    """
+    Compare two sets of embeddings row by row.
+
+    Returns:
+        Dictionary with the minimum and mean cosine similarity between rows
+    """
+    a = np.asarray(reference, dtype=np.float32)
+    b = np.asarray(candidate, dtype=np.float32)
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    cosines = np.sum(a * b, axis=1)
+    return {"min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean())}
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> Dict[str, Any]:
+    """
+    Export a sentence-transformers model to ONNX and record its parity with torch.
+
+    Writes the fp32 model, the int8 model (if quantize), the tokenizer and an
+    onnx_config.json with the pooling mode, max sequence length and the cosine
+    agreement of each exported model with the torch backend on PARITY_SAMPLE.
+
+    Args:
+        model_name: Hugging Face model name
+        output_dir: Directory to write the files to
+        quantize: Also write an int8 dynamically quantized model
+
+    Returns:
+        The written onnx_config.json contents
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    pooling = st_model[1]
+    pooling_mode = "cls" if getattr(pooling, "pooling_mode_cls_token", False) else "mean"
+
+    encoded = tokenizer(["example sentence"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in encoded]
+
+    class TokenEmbeddings(torch.nn.Module):
+        """Expose only the last hidden state so the export has a single tensor output."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(transformer),
+            tuple(encoded[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    tokenizer.save_pretrained(output_dir)
+    logger.info(f"Exported {model_name} to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_FILE), weight_type=QuantType.QInt8)
+        logger.info(f"Wrote int8 quantized model to {os.path.join(output_dir, INT8_FILE)}")
+
+    meta: Dict[str, Any] = {
+        "model_name": model_name,
+        "pooling": pooling_mode,
+        "max_seq_length": st_model.max_seq_length,
+        "input_names": input_names,
+        "parity": {},
+    }
+    with open(os.path.join(output_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Compare unnormalized vectors so normalization cannot hide a difference in direction
+    reference = st_model.encode(PARITY_SAMPLE, normalize_embeddings=False)
+    for quantized in ([False, True] if quantize else [False]):
+        candidate = OnnxEmbeddings(output_dir, normalize=False, quantized=quantized)
+        agreement = cosine_agreement(reference, candidate.embed_documents(PARITY_SAMPLE))
+        meta["parity"][INT8_FILE if quantized else FP32_FILE] = agreement
+        logger.info(f"Parity of {'int8' if quantized else 'fp32'} ONNX model with torch: {agreement}")
+
+    with open(os.path.join(output_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def load_onnx_embeddings(
+    model_name: str,
+    base_dir: str,
+    normalize: bool,
+    quantized: bool = True,
+    min_cosine: float = 0.99,
+    batch_size: int = 32,
+    num_threads: Optional[int] = None
+) -> "OnnxEmbeddings":
+    """
+    Load the ONNX backend for a model, exporting it on first use.
+
+    Raises:
+        ValueError: If the exported model's recorded parity with torch is below min_cosine
+    """
+    model_dir = onnx_model_dir(base_dir, model_name)
+    model_file = INT8_FILE if quantized else FP32_FILE
+    meta_path = os.path.join(model_dir, META_FILE)
+
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(os.path.join(model_dir, model_file)):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    if meta is None or model_file not in meta.get("parity", {}):
+        logger.info(f"No ONNX export of {model_name} found in {model_dir}, exporting it")
+        meta = export_onnx_model(model_name, model_dir, quantize=quantized)
+
+    parity = meta["parity"][model_file]
+    if parity["min_cosine"] < min_cosine:
+        raise ValueError(
+            f"ONNX model {model_file} disagrees with torch: min cosine {parity['min_cosine']:.4f} < {min_cosine}"
+        )
+    return OnnxEmbeddings(model_dir, normalize=normalize, quantized=quantized,
+                          batch_size=batch_size, num_threads=num_threads)
+
+class OnnxEmbeddings(Embeddings):
+    """Embeddings served from an exported ONNX model on the CPU.
+
+    Tokenization, pooling and truncation follow the sentence-transformers
+    model the files were exported from (see onnx_config.json). Texts are
+    embedded in length-sorted batches to keep padding small.
+    """
+
+    def __init__(self, model_dir: str, normalize: bool = True, quantized: bool = True,
+                 batch_size: int = 32, num_threads: Optional[int] = None):
+        """
+        Initialize the ONNX Runtime session and tokenizer.
+
+        Args:
+            model_dir: Directory written by export_onnx_model
+            normalize: L2-normalize the output vectors
+            quantized: Load the int8 model instead of the fp32 one
+            batch_size: Texts per forward pass
+            num_threads: Intra-op threads for ONNX Runtime (None = its default)
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, META_FILE)) as f:
+            meta = json.load(f)
+        self.pooling = meta["pooling"]
+        self.max_seq_length = meta["max_seq_length"]
+        self.input_names = meta["input_names"]
+        self.normalize = normalize
+        self.batch_size = batch_size
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        model_path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        logger.info(f"Loaded ONNX embedding model {model_path}")
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = feeds["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            pooled = self._embed_batch([texts[i] for i in indices])
+            for i, vector in zip(indices, pooled.tolist()):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
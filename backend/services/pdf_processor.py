@@ -3,17 +3,50 @@ import re
 import base64
 import io
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, BinaryIO, Optional, Dict, Any, Tuple
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, BinaryIO, Optional, Dict, Any, Tuple, Callable
 from fastapi import UploadFile
 from loguru import logger
 from PIL import Image
 import fitz  # PyMuPDF
 from mistralai import Mistral
 from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from config import get_settings
+from services.chunking import ChunkSplitter
+from services.ocr_cache import OCRCache
+from services.rasterizer import encode_image, get_raster_profile, rasterize_pdf_page
+from services.text_layer import TextLayerThresholds, read_text_layer
+from utils.misc import gather_with_concurrency
+
+# Values of the 'extraction_method' chunk metadata
+EXTRACTION_METHOD_TEXT_LAYER = "text_layer"
+EXTRACTION_METHOD_VISION = "vision"
+
+# Bump whenever MARKDOWN_PROMPT or TILED_PAGE_NOTE changes so cached Vision output is not reused
+MARKDOWN_PROMPT_VERSION = "1"
+
+MARKDOWN_PROMPT = """
+You are an expert document analysis assistant. Extract ALL text content from the image and format it as clean, well-structured GitHub Flavored Markdown.
+
+Follow these formatting instructions:
+1. Use appropriate Markdown heading levels based on visual hierarchy
+2. Format tables using GitHub Flavored Markdown table syntax
+3. Format key-value pairs using bold for keys: `**Key:** Value`
+4. Represent checkboxes as `[x]` or `[ ]`
+5. Preserve bulleted/numbered lists using standard Markdown syntax
+6. Maintain paragraph structure and line breaks
+7. Extract text labels from diagrams/images
+8. Ensure all visible text is captured accurately
+
+Output only the generated Markdown content.
+"""
+
+TILED_PAGE_NOTE = """
+The page is provided as {tile_count} overlapping horizontal strips, in order from top to bottom. Treat them as one page: output a single Markdown document and do not repeat lines that appear in the overlap between strips.
+"""
 
 class PDFProcessor:
     """Service for processing PDF documents using Mistral Vision for text extraction."""
@@ -23,17 +56,83 @@ class PDFProcessor:
         self.settings = get_settings()
         self.temp_dir = "temp_pdf"
         self.thread_pool = ThreadPoolExecutor(max_workers=2)
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.settings.CHUNK_SIZE,
-            chunk_overlap=self.settings.CHUNK_OVERLAP,
-            length_function=len,
-            is_separator_regex=False
-        )
+        self.text_splitter = ChunkSplitter(self.settings)
         self.client = self._initialize_mistral_client()
+        # Caps Vision calls in flight across every document handled by this processor
+        self._ocr_semaphore: Optional[asyncio.Semaphore] = None
+        self.ocr_cache = self._initialize_ocr_cache()
+        self.raster_profile = get_raster_profile()
+        logger.info(f"Using raster profile: {self.raster_profile}")
+        self.process_pool = self._initialize_process_pool()
+        self.text_layer_thresholds = TextLayerThresholds.from_settings()
         
         # Create temp directory if it doesn't exist
         os.makedirs(self.temp_dir, exist_ok=True)
 
+    def close(self) -> None:
+        """Release the worker threads and processes held by this processor."""
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+        logger.info("PDF processor worker pools shut down")
+
+    def _initialize_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Create the process pool used for page rasterization and text layer reads, unless disabled."""
+        workers = self.settings.RASTER_PROCESS_WORKERS
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 0:
+            logger.info("Page rasterization and text layer reads run in threads (RASTER_PROCESS_WORKERS=0)")
+            return None
+        logger.info(f"Page process pool started with {workers} workers")
+        # Spawn so workers do not inherit the parent's torch threads, locks and open handles
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def _run_off_loop(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run CPU-bound page work off the event loop.
+        
+        func must be a top-level function of picklable arguments. It runs in
+        the process pool, or in a thread without a pool or if the pool has died.
+        """
+        pool = self.process_pool
+        if pool is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(pool, func, *args)
+            except BrokenProcessPool as e:
+                logger.error(f"Page process pool is broken, running {func.__name__} in a thread: {e}")
+                # Concurrent pages all see the same broken pool; only the first replaces it
+                if self.process_pool is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.process_pool = self._initialize_process_pool()
+        return await asyncio.to_thread(func, *args)
+
+    async def _rasterize(self, file_path: str, page_num: int) -> List[Tuple[str, str]]:
+        """Render and encode a page off the event loop, fed the file path and page index."""
+        return await self._run_off_loop(rasterize_pdf_page, file_path, page_num, self.raster_profile)
+
+    def _initialize_ocr_cache(self) -> Optional[OCRCache]:
+        """Initialize the on-disk Vision Markdown cache if enabled."""
+        if not self.settings.OCR_CACHE_ENABLED:
+            return None
+        try:
+            return OCRCache(
+                cache_dir=self.settings.OCR_CACHE_DIR,
+                max_bytes=self.settings.OCR_CACHE_MAX_BYTES,
+                max_age_seconds=self.settings.OCR_CACHE_MAX_AGE_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"OCR cache disabled, could not initialize it: {e}")
+            return None
+
+    def _get_ocr_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the serving event loop; the processor
+        # itself may be built in a worker thread during startup
+        if self._ocr_semaphore is None:
+            self._ocr_semaphore = asyncio.Semaphore(max(1, self.settings.OCR_MAX_CONCURRENT_PAGES))
+        return self._ocr_semaphore
+
     def _initialize_mistral_client(self) -> Mistral:
         """Initialize the Mistral client with API key."""
         try:
@@ -45,33 +144,19 @@ class PDFProcessor:
             raise ConnectionError(f"Could not initialize Mistral client: {e}")
 
     @staticmethod
-    def encode_pil_image(pil_image: Image.Image, format: str = "PNG") -> Tuple[str, str]:
+    def encode_pil_image(pil_image: Image.Image, format: str = "PNG", quality: int = 85) -> Tuple[str, str]:
         """
         Encode PIL Image to Base64 string.
         
         Args:
             pil_image: PIL Image object to encode
-            format: Output format (PNG or JPEG)
+            format: Output format (PNG, JPEG or WEBP)
+            quality: Lossy quality for JPEG/WEBP
             
         Returns:
             Tuple of (base64 string, format)
         """
-        buffered = io.BytesIO()
-        
-        # Ensure image is in RGB mode
-        if pil_image.mode == 'RGBA':
-            pil_image = pil_image.convert('RGB')
-        elif pil_image.mode != 'RGB':
-            pil_image = pil_image.convert('RGB')
-
-        save_format = format.upper()
-        if save_format not in ["PNG", "JPEG"]:
-            logger.warning(f"Unsupported format '{format}', defaulting to PNG.")
-            save_format = "PNG"
-
-        pil_image.save(buffered, format=save_format)
-        img_byte = buffered.getvalue()
-        return base64.b64encode(img_byte).decode('utf-8'), save_format.lower()
+        return encode_image(pil_image, format, quality)
 
     async def process_pdf(self, file_path: str) -> List[Document]:
         """
@@ -97,8 +182,28 @@ class PDFProcessor:
         Returns:
             List of Document objects containing extracted text
         """
-        all_docs = []
-        total_pages_processed = 0
+        pages = await self.extract_pages(file_path, file_basename)
+        return self.split_pages(pages, file_basename)
+
+    async def extract_pages(self, file_path: str, file_basename: str) -> List[Tuple[int, str, str]]:
+        """
+        Extract the Markdown content of every page of a PDF.
+        
+        Pages with a good embedded text layer are read directly with PyMuPDF;
+        the rest are sent to Mistral Vision concurrently, at most
+        OCR_MAX_CONCURRENT_PAGES_PER_DOC for this document and
+        OCR_MAX_CONCURRENT_PAGES across all documents, and reassembled in
+        page order.
+        
+        Args:
+            file_path: Path to the PDF file
+            file_basename: Base name of the file
+            
+        Returns:
+            List of (1-based page number, Markdown content, extraction method)
+            for the pages that yielded content
+        """
+        pages: List[Tuple[int, str, str]] = []
         pdf_document = None
         
         try:
@@ -107,83 +212,22 @@ class PDFProcessor:
             total_pages = len(pdf_document)
             logger.info(f"Successfully opened PDF with {total_pages} pages")
             
-            markdown_prompt = """
-You are an expert document analysis assistant. Extract ALL text content from the image and format it as clean, well-structured GitHub Flavored Markdown.
-
-Follow these formatting instructions:
-1. Use appropriate Markdown heading levels based on visual hierarchy
-2. Format tables using GitHub Flavored Markdown table syntax
-3. Format key-value pairs using bold for keys: `**Key:** Value`
-4. Represent checkboxes as `[x]` or `[ ]`
-5. Preserve bulleted/numbered lists using standard Markdown syntax
-6. Maintain paragraph structure and line breaks
-7. Extract text labels from diagrams/images
-8. Ensure all visible text is captured accurately
-
-Output only the generated Markdown content.
-"""
+            page_results = await gather_with_concurrency(
+                self.settings.OCR_MAX_CONCURRENT_PAGES_PER_DOC,
+                [
+                    self._process_page(file_path, page_num, total_pages, file_basename)
+                    for page_num in range(total_pages)
+                ]
+            )
             
-            for page_num in range(total_pages):
-                logger.info(f"\n{'='*50}")
-                logger.info(f"Processing page {page_num + 1}/{total_pages} of {file_basename}")
-                logger.info(f"{'='*50}\n")
-                
-                try:
-                    page = pdf_document[page_num]
-                    pix = page.get_pixmap(matrix=fitz.Matrix(300/72, 300/72))
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    
-                    base64_image, image_format = self.encode_pil_image(img)
-                    
-                    messages = [
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": markdown_prompt},
-                                {
-                                    "type": "image_url",
-                                    "image_url": f"data:image/{image_format};base64,{base64_image}"
-                                }
-                            ]
-                        }
-                    ]
-                    
-                    logger.info("Sending page to Mistral Vision API...")
-                    chat_response = self.client.chat.complete(
-                        model=self.settings.VISION_MODEL_NAME,
-                        messages=messages
-                    )
-                    
-                    page_content = chat_response.choices[0].message.content
-                    
-                    if page_content:
-                        logger.info("\nExtracted Content:")
-                        logger.info("-" * 40)
-                        logger.info(page_content)
-                        logger.info("-" * 40)
-                        
-                        chunks = self.text_splitter.split_text(page_content)
-                        logger.info(f"\nSplit content into {len(chunks)} chunks")
-                        
-                        for j, chunk in enumerate(chunks):
-                            chunk_doc = Document(
-                                page_content=chunk,
-                                metadata={
-                                    'source': file_basename,
-                                    'page': page_num + 1,
-                                    'chunk': j + 1,
-                                    'total_chunks': len(chunks)
-                                }
-                            )
-                            all_docs.append(chunk_doc)
-                        
-                        logger.success(f"Successfully processed page {page_num + 1} from {file_basename}")
-                        total_pages_processed += 1
-                    else:
-                        logger.warning(f"No content extracted from page {page_num + 1} of {file_basename}")
-                        
-                except Exception as e:
-                    logger.error(f"Error processing page {page_num + 1} with Mistral Vision: {e}")
+            method_counts: Dict[str, int] = {}
+            for page_num, (page_content, extraction_method) in enumerate(page_results):
+                if not page_content:
+                    logger.warning(f"No content extracted from page {page_num + 1} of {file_basename}")
+                    continue
+                pages.append((page_num + 1, page_content, extraction_method))
+                method_counts[extraction_method] = method_counts.get(extraction_method, 0) + 1
+            logger.info(f"Pages by extraction method for {file_basename}: {method_counts}")
                     
         except Exception as e:
             logger.error(f"Error processing {file_basename}: {e}", exc_info=True)
@@ -195,15 +239,140 @@ Output only the generated Markdown content.
                 except Exception as e:
                     logger.warning(f"Error closing PDF document {file_basename}: {e}")
         
+        if self.ocr_cache is not None:
+            logger.info(f"OCR cache stats: {self.ocr_cache.stats()}")
+        return pages
+
+    def split_pages(self, pages: List[Tuple[int, str, str]], file_basename: str) -> List[Document]:
+        """
+        Split extracted pages into chunk Documents.
+        
+        Args:
+            pages: (page number, Markdown content, extraction method) as returned by extract_pages
+            file_basename: Base name of the file, recorded as the chunks' source
+            
+        Returns:
+            List of Document objects containing extracted text
+        """
+        all_docs = []
+        for page_number, page_content, extraction_method in pages:
+            chunks = self.text_splitter.split_text(page_content)
+            logger.info(f"Split page {page_number} content into {len(chunks)} chunks")
+            
+            for j, (chunk, parent) in enumerate(chunks):
+                chunk_doc = Document(
+                    page_content=chunk,
+                    metadata={
+                        'source': file_basename,
+                        'page': page_number,
+                        'chunk': j + 1,
+                        'total_chunks': len(chunks),
+                        'extraction_method': extraction_method,
+                        **ChunkSplitter.parent_metadata(parent)
+                    }
+                )
+                all_docs.append(chunk_doc)
+        
         if not all_docs:
             logger.error(f"No text could be extracted from {file_basename}")
         else:
             logger.info(f"\nProcessing Summary for {file_basename}:")
-            logger.info(f"Total pages processed: {total_pages_processed}")
+            logger.info(f"Total pages processed: {len(pages)}")
             logger.info(f"Total chunks created: {len(all_docs)}")
         
         return all_docs
 
+    async def _process_page(self, file_path: str, page_num: int,
+                            total_pages: int, file_basename: str) -> Tuple[Optional[str], str]:
+        """
+        Extract one page's Markdown from its text layer, or with Mistral Vision.
+        
+        Both paths run their PyMuPDF work off the event loop, in the process
+        pool if there is one.
+        
+        Args:
+            file_path: Path to the PDF file
+            page_num: Zero-based page index
+            total_pages: Number of pages in the document (for logging)
+            file_basename: Base name of the file (for logging)
+            
+        Returns:
+            Tuple of (Markdown or None if the page failed or was empty, extraction method)
+        """
+        if self.settings.PDF_TEXT_LAYER_ENABLED:
+            try:
+                quality, markdown = await self._run_off_loop(
+                    read_text_layer, file_path, page_num, self.text_layer_thresholds
+                )
+                if markdown is not None:
+                    logger.info(f"Using text layer for page {page_num + 1}/{total_pages} of {file_basename}: {quality}")
+                    return markdown, EXTRACTION_METHOD_TEXT_LAYER
+                logger.debug(f"Text layer not usable for page {page_num + 1} of {file_basename}: {quality}")
+            except Exception as e:
+                logger.warning(f"Text layer check failed for page {page_num + 1} of {file_basename}, using Vision: {e}")
+        
+        return await self._ocr_page(file_path, page_num, total_pages, file_basename), EXTRACTION_METHOD_VISION
+
+    async def _ocr_page(self, file_path: str, page_num: int,
+                        total_pages: int, file_basename: str) -> Optional[str]:
+        """
+        Render one page and extract its Markdown with Mistral Vision.
+        
+        Args:
+            file_path: Path to the PDF file
+            page_num: Zero-based page index
+            total_pages: Number of pages in the document (for logging)
+            file_basename: Base name of the file (for logging)
+            
+        Returns:
+            Extracted Markdown, or None if the page failed or was empty
+        """
+        try:
+            payloads = await self._rasterize(file_path, page_num)
+            
+            cache_key = None
+            if self.ocr_cache is not None:
+                cache_key = OCRCache.make_key(
+                    [payload for payload, _ in payloads], self.settings.VISION_MODEL_NAME, MARKDOWN_PROMPT_VERSION
+                )
+                cached_content = self.ocr_cache.get(cache_key)
+                if cached_content is not None:
+                    logger.info(f"OCR cache hit for page {page_num + 1}/{total_pages} of {file_basename}")
+                    return cached_content
+            
+            prompt = MARKDOWN_PROMPT if len(payloads) == 1 else MARKDOWN_PROMPT + TILED_PAGE_NOTE.format(tile_count=len(payloads))
+            messages = [
+                {
+                    "role": "user",
+                    "content": [{"type": "text", "text": prompt}] + [
+                        {
+                            "type": "image_url",
+                            "image_url": f"data:image/{image_format};base64,{base64_image}"
+                        }
+                        for base64_image, image_format in payloads
+                    ]
+                }
+            ]
+            
+            async with self._get_ocr_semaphore():
+                logger.info(f"Sending page {page_num + 1}/{total_pages} of {file_basename} to Mistral Vision API...")
+                chat_response = await self.client.chat.complete_async(
+                    model=self.settings.VISION_MODEL_NAME,
+                    messages=messages
+                )
+            
+            page_content = chat_response.choices[0].message.content
+            if page_content and cache_key is not None:
+                self.ocr_cache.put(cache_key, page_content)
+            if page_content:
+                logger.debug(f"Extracted content for page {page_num + 1}:\n{page_content}")
+                logger.success(f"Successfully processed page {page_num + 1} from {file_basename}")
+            return page_content
+            
+        except Exception as e:
+            logger.error(f"Error processing page {page_num + 1} of {file_basename} with Mistral Vision: {e}")
+            return None
+
     async def process_uploaded_pdfs(self, uploaded_files: List[BinaryIO]) -> List[Document]:
         """
         Process multiple uploaded PDFs in parallel.
@@ -227,25 +396,15 @@ Output only the generated Markdown content.
                 with open(file_path, "wb") as f:
                     f.write(uploaded_file.getvalue())
             
-            # Process PDFs in parallel
-            with ThreadPoolExecutor(max_workers=min(len(saved_file_paths), 4)) as executor:
-                loop = asyncio.get_event_loop()
-                tasks = []
-                for file_path in saved_file_paths:
-                    file_basename = os.path.basename(file_path)
-                    task = loop.run_in_executor(
-                        executor,
-                        lambda p, b: asyncio.run(self.process_single_pdf(p, b)),
-                        file_path,
-                        file_basename
-                    )
-                    tasks.append(task)
-                
-                results = await asyncio.gather(*tasks)
-                
-                for docs in results:
-                    if docs:
-                        all_docs.extend(docs)
+            # Process PDFs concurrently; page-level Vision calls share the global OCR limit
+            results = await asyncio.gather(*[
+                self.process_single_pdf(file_path, os.path.basename(file_path))
+                for file_path in saved_file_paths
+            ])
+            
+            for docs in results:
+                if docs:
+                    all_docs.extend(docs)
                 
         finally:
             # Clean up temporary files
@@ -0,0 +1,157 @@
+"""
+Page rasterization for Vision OCR.
+Renders PDF pages according to a named profile (DPI, color mode, image format,
+quality, tiling) and encodes them as Base64 payloads for the Vision API.
+"""
+
+import io
+import base64
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+from PIL import Image
+import fitz  # PyMuPDF
+
+from config import get_settings
+
+SUPPORTED_FORMATS = ("PNG", "JPEG", "WEBP")
+
+@dataclass(frozen=True)
+class RasterProfile:
+    """How a page is turned into image payload(s) for the Vision model."""
+    name: str
+    dpi: int = 300
+    grayscale: bool = False
+    image_format: str = "PNG"
+    quality: int = 85  # JPEG/WEBP only
+    tile_max_height: Optional[int] = None  # Split taller renders into horizontal tiles
+    tile_overlap: int = 64  # Pixels shared by neighbouring tiles
+
+    @classmethod
+    def from_dict(cls, name: str, values: Dict[str, Any]) -> "RasterProfile":
+        """Build a profile from a settings dictionary, ignoring unknown keys."""
+        known = {k: v for k, v in values.items() if k in cls.__dataclass_fields__ and k != "name"}
+        unknown = set(values) - set(known)
+        if unknown:
+            logger.warning(f"Ignoring unknown keys in raster profile '{name}': {sorted(unknown)}")
+        profile = cls(name=name, **known)
+        if profile.image_format.upper() not in SUPPORTED_FORMATS:
+            logger.warning(f"Unsupported format '{profile.image_format}' in raster profile '{name}', defaulting to PNG.")
+            profile = cls(**{**asdict(profile), "image_format": "PNG"})
+        return profile
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def get_raster_profile(name: Optional[str] = None) -> RasterProfile:
+    """
+    Get a configured raster profile by name.
+
+    Args:
+        name: Profile name; defaults to Settings.RASTER_PROFILE
+
+    Returns:
+        RasterProfile
+
+    Raises:
+        KeyError: If the profile is not defined in Settings.RASTER_PROFILES
+    """
+    settings = get_settings()
+    name = name or settings.RASTER_PROFILE
+    if name not in settings.RASTER_PROFILES:
+        raise KeyError(f"Raster profile '{name}' not found. Available profiles: {sorted(settings.RASTER_PROFILES)}")
+    return RasterProfile.from_dict(name, settings.RASTER_PROFILES[name])
+
+def render_page_image(page: fitz.Page, profile: RasterProfile) -> Image.Image:
+    """Render a page to a PIL image at the profile's DPI and color mode."""
+    zoom = profile.dpi / 72
+    if profile.grayscale:
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+        return Image.frombytes("L", [pix.width, pix.height], pix.samples)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+def split_into_tiles(image: Image.Image, profile: RasterProfile) -> List[Image.Image]:
+    """Split an image into overlapping horizontal tiles no taller than tile_max_height."""
+    max_height = profile.tile_max_height
+    if not max_height or image.height <= max_height:
+        return [image]
+
+    overlap = min(max(profile.tile_overlap, 0), max_height // 2)
+    step = max_height - overlap
+    tiles = []
+    top = 0
+    while True:
+        bottom = min(top + max_height, image.height)
+        tiles.append(image.crop((0, top, image.width, bottom)))
+        if bottom >= image.height:
+            break
+        top += step
+    return tiles
+
+def encode_image(image: Image.Image, image_format: str = "PNG", quality: int = 85) -> Tuple[str, str]:
+    """
+    Encode a PIL image to a Base64 string.
+
+    Args:
+        image: PIL Image object to encode
+        image_format: Output format (PNG, JPEG or WEBP)
+        quality: Lossy quality for JPEG/WEBP
+
+    Returns:
+        Tuple of (base64 string, format)
+    """
+    save_format = image_format.upper()
+    if save_format not in SUPPORTED_FORMATS:
+        logger.warning(f"Unsupported format '{image_format}', defaulting to PNG.")
+        save_format = "PNG"
+
+    # Grayscale is kept for PNG/JPEG; everything else is saved as RGB
+    if image.mode != "RGB" and not (image.mode == "L" and save_format in ("PNG", "JPEG")):
+        image = image.convert("RGB")
+
+    save_kwargs: Dict[str, Any] = {}
+    if save_format == "JPEG":
+        save_kwargs = {"quality": quality, "optimize": True}
+    elif save_format == "WEBP":
+        save_kwargs = {"quality": quality, "method": 4}
+
+    buffered = io.BytesIO()
+    image.save(buffered, format=save_format, **save_kwargs)
+    return base64.b64encode(buffered.getvalue()).decode('utf-8'), save_format.lower()
+
+def rasterize_page(page: fitz.Page, profile: RasterProfile) -> List[Tuple[str, str]]:
+    """
+    Render and encode a page according to a profile.
+
+    Args:
+        page: PyMuPDF page
+        profile: Raster profile to apply
+
+    Returns:
+        List of (base64 string, format), one per tile, top to bottom
+    """
+    image = render_page_image(page, profile)
+    return [
+        encode_image(tile, profile.image_format, profile.quality)
+        for tile in split_into_tiles(image, profile)
+    ]
+
+def rasterize_pdf_page(file_path: str, page_num: int, profile: RasterProfile) -> List[Tuple[str, str]]:
+    """
+    Open a PDF, render and encode one page, and close it again.
+
+    Top-level and argument-only so it can run in a worker process; the
+    document is not kept open between calls so temporary uploads can be
+    removed (and replaced) freely by the parent.
+
+    Args:
+        file_path: Path to the PDF file
+        page_num: Zero-based page index
+        profile: Raster profile to apply
+
+    Returns:
+        List of (base64 string, format), one per tile, top to bottom
+    """
+    with fitz.open(file_path) as pdf_document:
+        return rasterize_page(pdf_document[page_num], profile)
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Optional
+from loguru import logger
+
+from services.llm_interface import LLMInterface
+from services.pdf_processor import PDFProcessor
+from services.vector_store import VectorStore
+from services.web_scraper import WebScraper
+
+class ServiceRegistry:
+    """App-lifetime holder for the services shared by all requests.
+
+    Each service is built once, on first use or during startup, and reused by
+    every request until shutdown. Construction is guarded by a lock so that
+    concurrent first requests do not build duplicate instances.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._services: Dict[str, Any] = {}
+        self._factories: Dict[str, Callable[[], Any]] = {
+            "llm": LLMInterface,
+            "pdf": PDFProcessor,
+            "vector_store": VectorStore,
+            "web_scraper": WebScraper,
+        }
+
+    def _get(self, name: str) -> Any:
+        """Return the named service, building it on first access."""
+        service = self._services.get(name)
+        if service is not None:
+            return service
+        with self._lock:
+            service = self._services.get(name)
+            if service is None:
+                logger.info(f"Initializing shared service: {name}")
+                service = self._factories[name]()
+                self._services[name] = service
+            return service
+
+    @property
+    def llm(self) -> LLMInterface:
+        return self._get("llm")
+
+    @property
+    def pdf(self) -> PDFProcessor:
+        return self._get("pdf")
+
+    @property
+    def vector_store(self) -> VectorStore:
+        return self._get("vector_store")
+
+    @property
+    def web_scraper(self) -> WebScraper:
+        return self._get("web_scraper")
+
+    def warm_up(self) -> None:
+        """Build all services eagerly, logging failures instead of raising.
+
+        A service that fails here (e.g. a missing API key) is retried on first
+        use, where the error surfaces to the request.
+        """
+        for name in self._factories:
+            try:
+                self._get(name)
+            except Exception as e:
+                logger.error(f"Failed to initialize shared service '{name}': {e}")
+
+    async def startup(self) -> None:
+        """Warm up services without blocking the event loop on model loading."""
+        await asyncio.to_thread(self.warm_up)
+        logger.info(f"Service registry ready: {sorted(self._services)}")
+
+    async def shutdown(self) -> None:
+        """Release resources held by the services."""
+        pdf_service: Optional[PDFProcessor] = self._services.get("pdf")
+        if pdf_service is not None:
+            pdf_service.close()
+
+        vector_store: Optional[VectorStore] = self._services.get("vector_store")
+        if vector_store is not None:
+            vector_store.close()
+
+        web_scraper: Optional[WebScraper] = self._services.get("web_scraper")
+        if web_scraper is not None:
+            await web_scraper.cleanup()
+
+        self._services.clear()
+        logger.info("Service registry shut down")
@@ -0,0 +1,314 @@
+"""
+Deterministic extraction of attributes from datasheet Markdown.
+Collects key/value fields from `**Key:** Value` pairs and GitHub Flavored
+Markdown tables at ingest time. At extraction time a rule per attribute
+(key synonyms, value parser with unit normalization) answers attributes whose
+value appears literally under a known key. Attributes without exactly one
+unambiguous value are left to the LLM.
+"""
+
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from loguru import logger
+
+class Field(NamedTuple):
+    """One key/value pair found in a page's Markdown."""
+    key: str
+    value: str
+    page: int
+
+class AttributeRule(NamedTuple):
+    """How to recognize and normalize one attribute.
+
+    keys are normalized key texts (see split_key). parse receives the value,
+    the unit named in the key (e.g. "mm" from "Height [mm]") and the key's
+    min/max qualifier, and returns the normalized value or None.
+    """
+    keys: FrozenSet[str]
+    parse: Callable[[str, Optional[str], Optional[str]], Optional[str]]
+
+# `**Key:** Value` and `**Key**: Value`, possibly several on one line
+BOLD_PAIR = re.compile(
+    r"\*\*(?P<key>[^*\n]+?)(?::\*\*|\*\*\s*:)\s*(?P<value>.*?)"
+    r"(?=\s*\*\*[^*\n]+?(?::\*\*|\*\*\s*:)|$)"
+)
+TABLE_SEPARATOR_CELL = re.compile(r"^:?-{3,}:?$")
+CELL_SPLIT = re.compile(r"(?<!\\)\|")
+BRACKETED = re.compile(r"[\[(]([^\])]*)[\])]")
+NUMBER = r"[-+−]?\d+(?:[.,]\d+)?"
+TOLERANCE = re.compile(r"(?:±|\+/-)\s*\d+(?:[.,]\d+)?")
+
+# Table column headers under which the cells are the row's value rather than a qualifier
+VALUE_HEADERS = frozenset({"", "value", "values", "data", "specification", "specifications", "rating", "details", "description"})
+UNIT_HEADERS = frozenset({"unit", "units", "uom", "unit of measure"})
+QUALIFIERS = {"max": "max", "maximum": "max", "min": "min", "minimum": "min"}
+
+def clean_text(text: str) -> str:
+    """Strip inline Markdown and collapse whitespace."""
+    text = re.sub(r"<br\s*/?>", " ", text, flags=re.IGNORECASE)
+    text = text.replace("\\|", "|").replace("**", "").replace("__", "").replace("`", "")
+    return " ".join(text.split()).strip(" *_")
+
+def _split_row(line: str) -> List[str]:
+    return [clean_text(cell) for cell in CELL_SPLIT.split(line.strip().strip("|"))]
+
+def _table_fields(rows: List[List[str]], has_header: bool, page: int) -> List[Field]:
+    """Key/value pairs of one table: per row, and per column for single-row tables."""
+    fields: List[Field] = []
+    header = rows[0] if has_header else None
+    two_column = max(len(row) for row in rows) <= 2
+    if two_column:
+        # Two-column tables are key/value lists, often with the first pair in the header row
+        fields.extend(
+            Field(row[0], row[1], page) for row in rows
+            if len(row) == 2 and row[0] and row[1]
+            and row[0].lower() not in VALUE_HEADERS and row[1].lower() not in VALUE_HEADERS
+        )
+    else:
+        unit_column = next(
+            (j for j, cell in enumerate(header or []) if cell.lower() in UNIT_HEADERS), None
+        )
+        for row in (rows[1:] if has_header else rows):
+            if len(row) < 2 or not row[0]:
+                continue
+            unit = f" {row[unit_column]}" if unit_column is not None and unit_column < len(row) and row[unit_column] else ""
+            for j in range(1, len(row)):
+                if j == unit_column or not row[j]:
+                    continue
+                qualifier = header[j] if header and j < len(header) and header[j].lower() not in VALUE_HEADERS else ""
+                fields.append(Field(f"{row[0]} {qualifier}".strip(), f"{row[j]}{unit}", page))
+    if header and len(rows) == 2 and (not two_column or not fields):
+        # Horizontal table: the header names the values in the single row. A
+        # two-column table is only read this way if it holds no key/value rows,
+        # otherwise "| Colour | Black |" over "| Material | PA66 |" would pair
+        # Colour with Material.
+        fields.extend(
+            Field(key, value, page)
+            for key, value in zip(header, rows[1])
+            if key and value and key.lower() not in VALUE_HEADERS | UNIT_HEADERS
+        )
+    return fields
+
+def parse_fields(markdown: str, page: int) -> List[Field]:
+    """
+    Collect key/value fields from one page of Markdown.
+
+    Args:
+        markdown: Page content as produced by the text layer or Vision
+        page: 1-based page number
+
+    Returns:
+        Fields in reading order
+    """
+    fields: List[Field] = []
+    table: List[List[str]] = []
+    has_header = False
+
+    def flush_table() -> None:
+        nonlocal table, has_header
+        if table:
+            fields.extend(_table_fields(table, has_header, page))
+        table, has_header = [], False
+
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            cells = _split_row(stripped)
+            if cells and all(TABLE_SEPARATOR_CELL.match(cell.replace(" ", "")) for cell in cells):
+                has_header = len(table) == 1
+                continue
+            table.append(cells)
+            continue
+        flush_table()
+        for match in BOLD_PAIR.finditer(stripped):
+            key, value = clean_text(match.group("key")), clean_text(match.group("value"))
+            if key and value:
+                fields.append(Field(key, value, page))
+    flush_table()
+    return fields
+
+def parse_pages(pages: Iterable[Tuple[int, str, str]]) -> List[Field]:
+    """Collect fields from (page number, Markdown, extraction method) tuples as returned by PDFProcessor.extract_pages."""
+    return [field for page, content, _ in pages for field in parse_fields(content, page)]
+
+def split_key(key: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Normalize a field key for matching.
+
+    Returns:
+        Tuple of (normalized key, unit named in brackets, "min"/"max" qualifier)
+    """
+    unit = None
+    for bracketed in BRACKETED.findall(key):
+        if _normalize_unit(bracketed):
+            unit = bracketed
+    text = BRACKETED.sub(" ", key.lower())
+    words = re.sub(r"[^a-z0-9]+", " ", text.replace("no.", "no ")).split()
+    qualifier = next((QUALIFIERS[word] for word in words if word in QUALIFIERS), None)
+    return " ".join(word for word in words if word not in QUALIFIERS), unit, qualifier
+
+def format_number(value: float) -> str:
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+def _to_float(text: str) -> float:
+    return float(text.replace("−", "-").replace(",", "."))
+
+# Unit spellings mapped to canonical units
+UNIT_ALIASES: Dict[str, str] = {
+    "mm": "mm", "millimeter": "mm", "millimeters": "mm", "millimetre": "mm", "millimetres": "mm",
+    "cm": "cm", "in": "in", "inch": "in", "inches": "in", "\"": "in",
+    "°c": "C", "c": "C", "deg c": "C", "degc": "C", "℃": "C",
+    "°f": "F", "f": "F", "deg f": "F", "degf": "F", "℉": "F",
+}
+MM_PER_UNIT = {"mm": 1.0, "cm": 10.0, "in": 25.4}
+
+def _normalize_unit(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return None
+    return UNIT_ALIASES.get(" ".join(text.lower().replace("º", "°").split()))
+
+def _units_in(value: str) -> List[str]:
+    found = re.findall(r"(?<![a-z])(mm|cm|inch(?:es)?|in|°\s*[cf]|deg\s*[cf]|℃|℉)(?![a-z])", value.lower())
+    return [unit for unit in (_normalize_unit(text.replace(" ", "")) for text in found) if unit]
+
+def parse_length_mm(value: str, key_unit: Optional[str], qualifier: Optional[str]) -> Optional[str]:
+    """A single length (tolerances ignored), converted to millimetres; requires a unit."""
+    if qualifier:
+        return None
+    nominal = TOLERANCE.sub(" ", value)
+    numbers = re.findall(NUMBER, nominal)
+    units = set(_units_in(nominal)) or ({_normalize_unit(key_unit)} - {None})
+    if len(numbers) != 1 or len(units) != 1:
+        return None
+    unit = units.pop()
+    if unit not in MM_PER_UNIT:
+        return None
+    return format_number(_to_float(numbers[0]) * MM_PER_UNIT[unit])
+
+TEMPERATURE_RANGE = re.compile(
+    rf"(?P<low>{NUMBER})\s*(?:°?\s*[CF]\b)?\s*(?:to|\.\.\.?|…|–|—|-|/|bis)\s*(?P<high>{NUMBER})",
+    re.IGNORECASE
+)
+
+def _parse_temperature(value: str, key_unit: Optional[str], qualifier: Optional[str], bound: str) -> Optional[str]:
+    units = set(_units_in(value)) or ({_normalize_unit(key_unit)} - {None})
+    if len(units) != 1 or next(iter(units)) not in ("C", "F"):
+        return None
+    unit = units.pop()
+    match = TEMPERATURE_RANGE.search(value)
+    numbers = re.findall(NUMBER, value)
+    if match and len(numbers) == 2:
+        if qualifier:
+            return None
+        low, high = _to_float(match.group("low")), _to_float(match.group("high"))
+        if low > high:
+            return None
+        result = low if bound == "min" else high
+    elif len(numbers) == 1 and qualifier == bound:
+        result = _to_float(numbers[0])
+    else:
+        return None
+    if unit == "F":
+        result = (result - 32) * 5 / 9
+    return format_number(result)
+
+def parse_max_temperature(value: str, key_unit: Optional[str], qualifier: Optional[str]) -> Optional[str]:
+    """Upper end of a temperature range, or a max-qualified single value, in °C."""
+    return _parse_temperature(value, key_unit, qualifier, "max")
+
+def parse_min_temperature(value: str, key_unit: Optional[str], qualifier: Optional[str]) -> Optional[str]:
+    """Lower end of a temperature range, or a min-qualified single value, in °C."""
+    return _parse_temperature(value, key_unit, qualifier, "min")
+
+def parse_count(value: str, key_unit: Optional[str], qualifier: Optional[str]) -> Optional[str]:
+    """A single whole number, e.g. "12", "12-way", "2 rows"."""
+    if qualifier:
+        return None
+    match = re.fullmatch(r"(\d+)(?:\s*-?\s*(?:way|ways|pos|positions|pin|pins|pole|poles|rows?|cavities|cavity))?", value.strip(), re.IGNORECASE)
+    return str(int(match.group(1))) if match else None
+
+COLOURS = frozenset({
+    "black", "white", "grey", "gray", "red", "green", "blue", "yellow", "orange", "brown", "violet", "purple",
+    "pink", "beige", "ivory", "cream", "natural", "transparent", "translucent", "clear", "silver", "gold",
+    "turquoise", "tan",
+})
+COLOUR_MODIFIERS = frozenset({"light", "dark", "pale", "bright", "deep", "signal"})
+
+def parse_colour(value: str, key_unit: Optional[str], qualifier: Optional[str]) -> Optional[str]:
+    """A colour name of at most three words from COLOURS/COLOUR_MODIFIERS, capitalized.
+
+    Bracketed annotations such as "(RAL 9005)" are dropped. Anything else,
+    e.g. "see drawing" or "on request", is left to the LLM.
+    """
+    text = " ".join(BRACKETED.sub(" ", value).split()).rstrip(".")
+    words = re.split(r"[\s-]+", text.lower())
+    if (qualifier or len(words) > 3 or words[-1] not in COLOURS
+            or any(word not in COLOURS | COLOUR_MODIFIERS for word in words)):
+        return None
+    return text.capitalize()
+
+def _keys(*names: str) -> FrozenSet[str]:
+    return frozenset(names)
+
+TEMPERATURE_KEYS = _keys(
+    "working temperature", "working temperature range", "operating temperature", "operating temperature range",
+    "operating temp", "temperature range", "ambient temperature", "ambient temperature range",
+    "service temperature", "temperature range operating"
+)
+
+# Keyed by the attribute names used in routers/extract.py::PROMPTS
+ATTRIBUTE_RULES: Dict[str, AttributeRule] = {
+    "Height [MM]": AttributeRule(_keys("height", "overall height", "total height", "housing height"), parse_length_mm),
+    "Length [MM]": AttributeRule(_keys("length", "overall length", "total length", "housing length"), parse_length_mm),
+    "Width [MM]": AttributeRule(_keys("width", "overall width", "total width", "housing width"), parse_length_mm),
+    "Max. Working Temperature [°C]": AttributeRule(TEMPERATURE_KEYS, parse_max_temperature),
+    "Min. Working Temperature [°C]": AttributeRule(TEMPERATURE_KEYS, parse_min_temperature),
+    "Number of Cavities": AttributeRule(
+        _keys("number of cavities", "no of cavities", "cavities", "cavity count", "number of positions",
+              "no of positions", "positions", "number of ways", "ways", "number of poles", "poles"),
+        parse_count
+    ),
+    "Number of Rows": AttributeRule(_keys("number of rows", "no of rows", "rows", "row count"), parse_count),
+    "Colour": AttributeRule(_keys("colour", "color", "housing colour", "housing color"), parse_colour),
+}
+
+class StructuredExtractor:
+    """Answers attributes from a document's key/value fields without an LLM."""
+
+    def __init__(self, rules: Optional[Dict[str, AttributeRule]] = None):
+        self.rules = ATTRIBUTE_RULES if rules is None else rules
+
+    def extract(self, fields: Sequence[Field], attributes: Iterable[str]) -> Dict[str, str]:
+        """
+        Resolve the attributes whose value is unambiguous in the fields.
+
+        Every field whose key matches an attribute's synonyms is parsed; the
+        attribute is answered only if all of them that parse agree on one
+        value.
+
+        Args:
+            fields: Fields of one document
+            attributes: Attribute names to try
+
+        Returns:
+            Normalized value per resolved attribute
+        """
+        keyed = [(split_key(field.key), field) for field in fields]
+        resolved: Dict[str, str] = {}
+        for attribute in attributes:
+            rule = self.rules.get(attribute)
+            if rule is None:
+                continue
+            values = {
+                value
+                for (key, unit, qualifier), field in keyed
+                if key in rule.keys
+                for value in [rule.parse(field.value, unit, qualifier)]
+                if value is not None
+            }
+            if len(values) == 1:
+                resolved[attribute] = values.pop()
+            elif values:
+                logger.debug(f"Conflicting structured values for {attribute}: {sorted(values)}")
+        return resolved
@@ -0,0 +1,154 @@
+"""
+Embedded text layer extraction.
+Decides whether a PDF page's text layer can be trusted and, if so, turns it
+into Markdown with detected tables rendered as GitHub Flavored Markdown
+tables. Pages that fail the checks are left for Vision OCR.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import fitz  # PyMuPDF
+
+from config import get_settings
+
+@dataclass(frozen=True)
+class TextLayerThresholds:
+    """Limits a page's text layer has to meet to skip Vision."""
+    min_chars: int
+    min_glyph_ratio: float
+    max_image_coverage: float
+    max_drawings: int
+
+    @classmethod
+    def from_settings(cls) -> "TextLayerThresholds":
+        settings = get_settings()
+        return cls(
+            min_chars=settings.TEXT_LAYER_MIN_CHARS,
+            min_glyph_ratio=settings.TEXT_LAYER_MIN_GLYPH_RATIO,
+            max_image_coverage=settings.TEXT_LAYER_MAX_IMAGE_COVERAGE,
+            max_drawings=settings.TEXT_LAYER_MAX_DRAWINGS
+        )
+
+def assess_text_layer(page: fitz.Page, thresholds: TextLayerThresholds) -> Tuple[Dict[str, Any], List[Any]]:
+    """
+    Measure how trustworthy a page's embedded text layer is.
+
+    A page is usable when it has enough characters, nearly all of them map
+    to real glyphs (unmapped glyphs come out as U+FFFD), and it is not
+    dominated by raster images or dense vector graphics such as drawings.
+    The checks run cheapest first and stop at the first one that fails;
+    tables are only detected on usable pages, as the table finder is slow on
+    drawing-heavy pages.
+
+    Args:
+        page: PyMuPDF page
+        thresholds: Limits the page has to meet
+
+    Returns:
+        Tuple of (metrics with the 'usable' verdict, tables detected on usable pages)
+    """
+    text = page.get_text("text")
+    chars = [c for c in text if not c.isspace()]
+    char_count = len(chars)
+    glyph_ratio = (
+        sum(1 for c in chars if c != "\ufffd" and c.isprintable()) / char_count
+        if char_count else 0.0
+    )
+    quality: Dict[str, Any] = {"usable": False, "char_count": char_count, "glyph_ratio": round(glyph_ratio, 3)}
+    if char_count < thresholds.min_chars or glyph_ratio < thresholds.min_glyph_ratio:
+        return quality, []
+
+    page_rect = page.rect
+    page_area = abs(page_rect) or 1.0
+    image_area = 0.0
+    for image_info in page.get_image_info():
+        image_area += abs(fitz.Rect(image_info["bbox"]) & page_rect)
+    image_coverage = min(image_area / page_area, 1.0)
+    quality["image_coverage"] = round(image_coverage, 3)
+    if image_coverage > thresholds.max_image_coverage:
+        return quality, []
+
+    drawing_count = len(page.get_drawings())
+    quality["drawing_count"] = drawing_count
+    if drawing_count > thresholds.max_drawings:
+        return quality, []
+
+    try:
+        tables = list(page.find_tables().tables)
+    except AttributeError:
+        # PyMuPDF < 1.23 has no table finder
+        tables = []
+    quality.update(usable=True, table_count=len(tables))
+    return quality, tables
+
+def table_to_markdown(rows: List[List[Optional[str]]]) -> str:
+    """Format extracted table rows as a GitHub Flavored Markdown table."""
+    rows = [row for row in rows if any(cell for cell in row)]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+
+    def format_row(row: List[Optional[str]]) -> str:
+        cells = [
+            " ".join((cell or "").split()).replace("|", "\\|")
+            for cell in list(row) + [None] * (width - len(row))
+        ]
+        return "| " + " | ".join(cells) + " |"
+
+    lines = [format_row(rows[0]), "| " + " | ".join(["---"] * width) + " |"]
+    lines.extend(format_row(row) for row in rows[1:])
+    return "\n".join(lines)
+
+def extract_text_layer(page: fitz.Page, tables: List[Any]) -> str:
+    """
+    Build Markdown from a page's text layer, rendering detected tables as GFM tables.
+
+    Args:
+        page: PyMuPDF page
+        tables: Tables found on the page by PyMuPDF
+
+    Returns:
+        Page content as Markdown, in reading order
+    """
+    table_rects = [fitz.Rect(table.bbox) for table in tables]
+    parts: List[Tuple[float, float, str]] = []
+
+    for table, rect in zip(tables, table_rects):
+        table_markdown = table_to_markdown(table.extract())
+        if table_markdown:
+            parts.append((rect.y0, rect.x0, table_markdown))
+
+    for x0, y0, x1, y1, block_text, _, block_type in page.get_text("blocks"):
+        if block_type != 0 or not block_text.strip():
+            continue
+        block_rect = fitz.Rect(x0, y0, x1, y1)
+        if any(block_rect.intersects(rect) for rect in table_rects):
+            continue  # Already rendered as part of a table
+        parts.append((y0, x0, block_text.strip()))
+
+    parts.sort(key=lambda part: (part[0], part[1]))
+    return "\n\n".join(part[2] for part in parts)
+
+def read_text_layer(file_path: str, page_num: int,
+                    thresholds: TextLayerThresholds) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Open a PDF, assess one page's text layer and extract it if usable.
+
+    Top-level and argument-only so it can run in a worker process, like
+    rasterizer.rasterize_pdf_page; each call opens its own document, so
+    calls for pages of the same file can also run in parallel threads.
+
+    Args:
+        file_path: Path to the PDF file
+        page_num: Zero-based page index
+        thresholds: Limits the page has to meet
+
+    Returns:
+        Tuple of (metrics with the 'usable' verdict, Markdown or None if not usable)
+    """
+    with fitz.open(file_path) as pdf_document:
+        page = pdf_document[page_num]
+        quality, tables = assess_text_layer(page, thresholds)
+        if not quality["usable"]:
+            return quality, None
+        return quality, extract_text_layer(page, tables)
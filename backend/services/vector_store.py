@@ -1,40 +1,153 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Set, Iterable
 from loguru import logger
 import os
+import json
+import hashlib
+import asyncio
+import uuid
+import threading
+from collections import OrderedDict
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain.schema import Document
 from langchain.vectorstores.base import VectorStoreRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
 from chromadb import Client as ChromaClient
 
 from config import get_settings
+from services.chunking import CHUNKING_PARENT_CHILD, PARENT_CONTENT_KEY, PARENT_ID_KEY, chunking_signature
+from services.embedding_batcher import BatchingEmbeddings
+from services.embedding_cache import CachedEmbeddings, EmbeddingCache
+from services.document_registry import DocumentRegistry
+from services.onnx_embeddings import load_onnx_embeddings
+from services.bulk_embedding import ShardedEmbeddings
+from services.exact_index import ExactIndex
+from services.flat_store import FlatVectorStore
+from utils.misc import chunk_list, distance_to_similarity, select_by_score
 
 settings = get_settings()
 
+class DocumentRetriever(BaseRetriever):
+    """Scored retriever over the collection, or over one document's chunks if doc_id is set.
+
+    Returns parent passages where chunks have them, each with its similarity
+    in metadata["score"], cut off by the configured score threshold.
+    """
+
+    store: Any
+    doc_id: Optional[str] = None
+    k: int
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.store.retrieve_for_queries([query], doc_id=self.doc_id, k=self.k)[0]
+
 class VectorStore:
     """Service for managing vector embeddings and similarity search."""
     
     def __init__(self):
         """Initialize the vector store with configuration."""
+        # One instance serves all requests; serialize writes to the shared collection
+        self._write_lock = threading.RLock()
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        self.embedding_batcher: Optional[BatchingEmbeddings] = None
+        self.embedding_backend = settings.EMBEDDING_BACKEND
+        self.query_embedding_function = None
+        # Recently used single-document indexes, least recently used first
+        self._document_indexes: "OrderedDict[str, ExactIndex]" = OrderedDict()
+        # Documents known to exceed EXACT_INDEX_MAX_CHUNKS, so they are not fetched again
+        self._oversized_documents: Set[str] = set()
+        self._index_lock = threading.Lock()
         self.embedding_function = self._initialize_embeddings()
         self.vector_store = self._initialize_vector_store()
+        self.document_registry = DocumentRegistry(settings.DOCUMENT_REGISTRY_PATH)
+        self.flat_store = self._initialize_flat_store()
         
         # Ensure persistence directory exists if needed
         if settings.CHROMA_PERSIST_DIRECTORY:
             os.makedirs(settings.CHROMA_PERSIST_DIRECTORY, exist_ok=True)
 
     def _initialize_embeddings(self):
+        embeddings = None
+        if settings.EMBEDDING_BACKEND == "onnx":
+            embeddings = self._initialize_onnx_embeddings()
+        elif settings.EMBEDDING_BACKEND != "torch":
+            logger.warning(f"Unknown EMBEDDING_BACKEND '{settings.EMBEDDING_BACKEND}', using torch")
+        
+        if embeddings is None:
+            self.embedding_backend = "torch"
+            try:
+                embeddings = HuggingFaceEmbeddings(
+                    model_name=settings.EMBEDDING_MODEL_NAME,
+                    model_kwargs={'device': settings.EMBEDDING_DEVICE},
+                    encode_kwargs={
+                        'normalize_embeddings': settings.NORMALIZE_EMBEDDINGS,
+                        'batch_size': settings.EMBEDDING_BATCH_SIZE
+                    }
+                )
+                logger.info("Successfully initialized HuggingFace embeddings")
+            except Exception as e:
+                logger.error(f"Failed to initialize HuggingFace embeddings: {e}")
+                raise ConnectionError(f"Could not initialize embeddings: {e}")
+        # Queries are embedded in batches but kept out of the persistent cache,
+        # which would otherwise fill up with one-off query texts
+        self.query_embedding_function = self._wrap_with_batcher(embeddings)
+        return self._wrap_with_cache(self.query_embedding_function)
+
+    def _wrap_with_batcher(self, embeddings):
+        """Share forward passes between concurrent callers, if micro-batching is enabled."""
+        if not settings.EMBEDDING_MICRO_BATCHING_ENABLED:
+            return embeddings
+        self.embedding_batcher = BatchingEmbeddings(
+            embeddings,
+            max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+            max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS
+        )
+        return self.embedding_batcher
+
+    def _initialize_onnx_embeddings(self):
+        """Load the ONNX Runtime backend, or return None to fall back to torch."""
         try:
-            embeddings = HuggingFaceEmbeddings(
+            embeddings = load_onnx_embeddings(
                 model_name=settings.EMBEDDING_MODEL_NAME,
-                model_kwargs={'device': settings.EMBEDDING_DEVICE},
-                encode_kwargs={'normalize_embeddings': settings.NORMALIZE_EMBEDDINGS}
+                base_dir=settings.EMBEDDING_ONNX_DIR,
+                normalize=settings.NORMALIZE_EMBEDDINGS,
+                quantized=settings.EMBEDDING_ONNX_QUANTIZE,
+                min_cosine=settings.EMBEDDING_ONNX_MIN_COSINE,
+                batch_size=settings.EMBEDDING_BATCH_SIZE,
+                num_threads=settings.EMBEDDING_ONNX_THREADS
             )
-            logger.info("Successfully initialized HuggingFace embeddings")
+        except Exception as e:
+            logger.warning(f"ONNX embedding backend unavailable, falling back to torch: {e}")
+            return None
+        self.embedding_backend = "onnx-int8" if settings.EMBEDDING_ONNX_QUANTIZE else "onnx-fp32"
+        logger.info(f"Successfully initialized {self.embedding_backend} embeddings")
+        return embeddings
+
+    def _wrap_with_cache(self, embeddings):
+        """Serve previously embedded chunks from the persistent embedding cache, if enabled."""
+        if not settings.EMBEDDING_VECTOR_CACHE_ENABLED:
             return embeddings
+        try:
+            self.embedding_cache = EmbeddingCache(
+                path=settings.EMBEDDING_VECTOR_CACHE_PATH,
+                max_entries=settings.EMBEDDING_VECTOR_CACHE_MAX_ENTRIES
+            )
         except Exception as e:
-            logger.error(f"Failed to initialize HuggingFace embeddings: {e}")
-            raise ConnectionError(f"Could not initialize embeddings: {e}")
+            logger.warning(f"Embedding cache disabled, could not open it: {e}")
+            return embeddings
+        return CachedEmbeddings(
+            embeddings,
+            self.embedding_cache,
+            model_name=self._cache_model_name(),
+            normalize=settings.NORMALIZE_EMBEDDINGS
+        )
+
+    def _cache_model_name(self) -> str:
+        # Vectors from different backends are close but not identical, so cache them apart
+        if self.embedding_backend == "torch":
+            return settings.EMBEDDING_MODEL_NAME
+        return f"{settings.EMBEDDING_MODEL_NAME}|{self.embedding_backend}"
 
     def _initialize_vector_store(self):
         try:
@@ -49,19 +162,89 @@ class VectorStore:
             logger.error(f"Failed to initialize Chroma vector store: {e}")
             raise ConnectionError(f"Could not initialize vector store: {e}")
 
-    def create_retriever(self, documents: list[Document], **kwargs):
+    def _initialize_flat_store(self) -> Optional[FlatVectorStore]:
+        """Open the memory-mapped flat store, rebuilding it from Chroma if the two disagree."""
+        if not settings.FLAT_STORE_ENABLED:
+            return None
         try:
-            # Add documents to vector store
-            self.vector_store.add_documents(documents)
-            
-            # Create retriever with default parameters
-            retriever = self.vector_store.as_retriever(
-                search_type="similarity",
-                search_kwargs={
-                    "k": settings.RETRIEVER_K,
-                    "score_threshold": 0.8  # Default threshold
-                }
+            flat_store = FlatVectorStore(
+                settings.FLAT_STORE_DIR,
+                dtype=settings.FLAT_STORE_DTYPE,
+                scan_rows=settings.FLAT_STORE_SCAN_ROWS,
+                quantization=settings.FLAT_STORE_QUANTIZATION,
+                oversample=settings.FLAT_STORE_OVERSAMPLE
+            )
+        except Exception as e:
+            logger.warning(f"Flat vector store disabled, could not open it: {e}")
+            return None
+        self.flat_store = flat_store
+        collection_count = self.vector_store._collection.count()
+        if flat_store.live_count() != collection_count:
+            logger.warning(
+                f"Flat vector store has {flat_store.live_count()} rows but the collection has "
+                f"{collection_count} chunks, rebuilding it"
             )
+            # Other workers starting at the same time may have rebuilt it already
+            self.rebuild_flat_store(expected_rows=collection_count)
+        return flat_store
+
+    def rebuild_flat_store(self, expected_rows: Optional[int] = None) -> int:
+        """
+        Rewrite the flat store from the vectors stored in Chroma.
+        
+        Also compacts away rows left dead by deletes and re-indexing.
+
+        Args:
+            expected_rows: Skip the rebuild if the flat store holds this many live rows by the time it is locked
+        
+        Returns:
+            Number of rows written
+        """
+        if self.flat_store is None:
+            return 0
+        collection = self.vector_store._collection
+
+        def pages():
+            offset = 0
+            while True:
+                page = collection.get(
+                    limit=settings.RAG_UPSERT_BATCH_SIZE, offset=offset,
+                    include=["embeddings", "documents", "metadatas"]
+                )
+                if not page["ids"]:
+                    return
+                yield page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+                offset += len(page["ids"])
+
+        with self._write_lock:
+            written = self.flat_store.rebuild(pages(), expected_rows=expected_rows)
+        if written is None:
+            logger.info("Flat vector store already rebuilt by another process")
+            return 0
+        logger.info(f"Rebuilt flat vector store with {written} rows")
+        return written
+
+    def create_retriever(self, documents: list[Document], doc_id: Optional[str] = None,
+                         filename: Optional[str] = None,
+                         fields: Optional[Iterable[Tuple[str, str, Optional[int]]]] = None, **kwargs):
+        """
+        Add documents to the collection and return a retriever over them.
+        
+        With a doc_id (the PDF content hash) the chunks are tagged with it,
+        registered together with the document's key/value fields, and the
+        retriever only searches that document.
+        """
+        try:
+            if doc_id:
+                self.index_document(documents, doc_id, filename, fields=fields)
+                return self.get_document_retriever(doc_id)
+            
+            # Add documents to vector store; without a doc_id there is nowhere to keep parent passages
+            self._detach_parents(documents)
+            self._add_documents(documents)
+            
+            # Scored retriever over the whole collection, cut off at RETRIEVER_SCORE_THRESHOLD
+            retriever = DocumentRetriever(store=self, k=settings.RETRIEVER_K)
             
             logger.info(f"Successfully created retriever with {len(documents)} documents")
             return retriever
@@ -69,6 +252,421 @@ class VectorStore:
             logger.error(f"Failed to create retriever: {e}")
             raise ConnectionError(f"Could not create retriever: {e}")
 
+    def index_document(self, documents: List[Document], doc_id: str, filename: Optional[str] = None,
+                       fields: Optional[Iterable[Tuple[str, str, Optional[int]]]] = None) -> int:
+        """
+        Store a document's chunks tagged with its doc_id and register it.
+        
+        Chunk IDs are derived from the doc_id and chunk position, so indexing
+        the same document twice overwrites rather than duplicates.
+        
+        Returns:
+            Number of chunks stored
+        """
+        passages = self._detach_parents(documents)
+        for document in documents:
+            document.metadata["doc_id"] = doc_id
+        ids = [f"{doc_id}:{i}" for i in range(len(documents))]
+        texts = [document.page_content for document in documents]
+        # Embed once and hand the same vectors to Chroma and the in-memory index
+        vectors = self.embedding_function.embed_documents(texts)
+        collection = self.vector_store._collection
+        with self._write_lock:
+            # Drop chunks from an earlier, possibly partial, indexing of the same bytes
+            if self.flat_store is not None:
+                stale = collection.get(where={"doc_id": doc_id}, include=[])["ids"]
+                self.flat_store.delete(stale)
+            collection.delete(where={"doc_id": doc_id})
+            self._add_to_collection(ids, texts, vectors, [document.metadata for document in documents])
+            self.document_registry.register(
+                doc_id, filename, len(documents), chunking=chunking_signature(settings), passages=passages,
+                fields=fields
+            )
+        self._forget_document_indexes([doc_id])
+        if settings.EXACT_INDEX_ENABLED:
+            self._cache_document_index(doc_id, ExactIndex(vectors, documents, ids))
+        logger.info(f"Indexed document {doc_id[:12]} ({filename}) with {len(documents)} chunks and {len(passages)} parent passages")
+        return len(documents)
+
+    @staticmethod
+    def _detach_parents(documents: List[Document]) -> Dict[str, str]:
+        """Move parent passage texts out of chunk metadata, returning them by parent_id."""
+        passages: Dict[str, str] = {}
+        for document in documents:
+            content = document.metadata.pop(PARENT_CONTENT_KEY, None)
+            parent_id = document.metadata.get(PARENT_ID_KEY)
+            if content is not None and parent_id:
+                passages[parent_id] = content
+        return passages
+
+    def _add_documents(self, documents: List[Document]) -> List[str]:
+        """Embed documents and store them under new random IDs."""
+        texts = [document.page_content for document in documents]
+        vectors = self.embedding_function.embed_documents(texts)
+        ids = [str(uuid.uuid4()) for _ in documents]
+        with self._write_lock:
+            self._add_to_collection(ids, texts, vectors, [document.metadata for document in documents])
+        return ids
+
+    def _add_to_collection(self, ids: List[str], texts: List[str], vectors: List[List[float]],
+                           metadatas: List[Dict[str, Any]]) -> None:
+        """Write embedded chunks to Chroma in batches, and to the flat store if enabled. Call with _write_lock held."""
+        collection = self.vector_store._collection
+        for batch in chunk_list(list(range(len(ids))), settings.RAG_UPSERT_BATCH_SIZE):
+            # Chroma rejects empty metadata dicts, so add those rows without metadata
+            with_meta = [i for i in batch if metadatas[i]]
+            without_meta = [i for i in batch if not metadatas[i]]
+            for indices, include_meta in ((with_meta, True), (without_meta, False)):
+                if not indices:
+                    continue
+                collection.add(
+                    ids=[ids[i] for i in indices],
+                    embeddings=[vectors[i] for i in indices],
+                    documents=[texts[i] for i in indices],
+                    metadatas=[metadatas[i] for i in indices] if include_meta else None
+                )
+        if self.flat_store is not None:
+            self.flat_store.append(ids, vectors, texts, metadatas)
+
+    def get_indexed_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the registry entry for an already indexed document, if its chunks are still stored.
+        
+        A registry entry whose chunks have disappeared from the collection
+        (e.g. after delete_collection) is dropped so the document is re-indexed.
+        """
+        entry = self.document_registry.get(doc_id)
+        if entry is None:
+            return None
+        if entry.get("chunking") != chunking_signature(settings):
+            logger.info(f"Document {doc_id[:12]} was indexed with different chunking ({entry.get('chunking')}), re-indexing it")
+            return None
+        stored = self.vector_store._collection.get(where={"doc_id": doc_id}, limit=1, include=[])
+        if not stored["ids"]:
+            logger.warning(f"Registered document {doc_id[:12]} has no stored chunks, forgetting it")
+            self.document_registry.remove(doc_id)
+            return None
+        return entry
+
+    def get_document_retriever(self, doc_id: str) -> DocumentRetriever:
+        """Create a retriever that only searches chunks of one document."""
+        retriever = DocumentRetriever(store=self, doc_id=doc_id, k=settings.RETRIEVER_K)
+        logger.info(f"Created retriever scoped to document {doc_id[:12]}")
+        return retriever
+
+    def retrieve_for_queries(self, queries: List[str], doc_id: Optional[str] = None,
+                             k: Optional[int] = None, score_threshold: Optional[float] = None,
+                             min_k: Optional[int] = None) -> List[List[Document]]:
+        """
+        Retrieve the best-scoring chunks for several queries at once.
+        
+        All queries are embedded in a single batch and searched with a single
+        collection query, instead of one embedding pass and one search per query.
+        Chunks linked to a parent passage are replaced by that passage. Each
+        query keeps at most k distinct results; results below score_threshold
+        are dropped unless needed to reach min_k.
+        
+        Args:
+            queries: Query texts
+            doc_id: Optional document to restrict the search to
+            k: Maximum results per query (defaults to RETRIEVER_K)
+            score_threshold: Minimum cosine similarity (defaults to RETRIEVER_SCORE_THRESHOLD)
+            min_k: Results kept regardless of score (defaults to RETRIEVER_MIN_K)
+            
+        Returns:
+            One list of Documents per query, best match first, with the
+            cosine similarity in metadata["score"]
+        """
+        if not queries:
+            return []
+        k = k or settings.RETRIEVER_K
+        fetch_k = self._fetch_k(k)
+        try:
+            query_embeddings = self.query_embedding_function.embed_documents(queries)
+            index = self._get_document_index(doc_id) if doc_id and settings.EXACT_INDEX_ENABLED else None
+            if index is not None:
+                hits = [
+                    [
+                        Document(page_content=doc.page_content, metadata={**doc.metadata, "score": score})
+                        for doc, score in query_hits
+                    ]
+                    for query_hits in index.search(query_embeddings, fetch_k)
+                ]
+            elif doc_id is None and self.flat_store is not None:
+                hits = self._search_flat_store(query_embeddings, fetch_k)
+            else:
+                hits = self._search_collection(query_embeddings, fetch_k, doc_id)
+        except Exception as e:
+            logger.error(f"Failed to retrieve for {len(queries)} queries: {e}")
+            raise ConnectionError(f"Could not retrieve for queries: {e}")
+        
+        return self._select_hits(hits, k, score_threshold, min_k)
+
+    @staticmethod
+    def _fetch_k(k: int) -> int:
+        """Chunks to fetch for k results; parent-child chunking needs extra hits to fill k distinct passages."""
+        return k * settings.PARENT_FETCH_FACTOR if settings.CHUNKING_MODE == CHUNKING_PARENT_CHILD else k
+
+    def _select_hits(self, hits: List[List[Document]], k: int, score_threshold: Optional[float] = None,
+                     min_k: Optional[int] = None) -> List[List[Document]]:
+        """Expand scored chunk hits to parent passages and cut each query's results off by score."""
+        score_threshold = settings.RETRIEVER_SCORE_THRESHOLD if score_threshold is None else score_threshold
+        min_k = settings.RETRIEVER_MIN_K if min_k is None else min_k
+        hits = self._expand_to_parents(hits, k)
+        
+        selected = [
+            [doc for doc, _ in select_by_score(
+                [(doc, doc.metadata["score"]) for doc in query_hits], score_threshold, min_k, k
+            )]
+            for query_hits in hits
+        ]
+        dropped = sum(len(h) for h in hits) - sum(len(h) for h in selected)
+        logger.debug(
+            f"Retrieved {sum(len(h) for h in selected)} passages for {len(hits)} queries in one batch, "
+            f"dropped {dropped} below score {score_threshold}"
+        )
+        return selected
+
+    def attribute_routing_signature(self, queries: Dict[str, str]) -> str:
+        """Fingerprint of the attribute queries and everything else that decides their routes."""
+        payload = json.dumps({
+            "queries": queries,
+            "embeddings": self._cache_model_name(),
+            "chunking": chunking_signature(settings),
+            "fetch_k": self._fetch_k(settings.RETRIEVER_K),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def ensure_attribute_routes(self, doc_id: str, queries: Dict[str, str]) -> bool:
+        """
+        Precompute a document's best chunks per attribute, unless its stored routes are current.
+        
+        Routes are rebuilt whenever the attribute queries (including the set
+        of attributes), the embedding model, chunking or RETRIEVER_K change.
+        
+        Args:
+            doc_id: Indexed document
+            queries: Retrieval query per attribute name
+            
+        Returns:
+            True if routes were (re)built
+        """
+        signature = self.attribute_routing_signature(queries)
+        if self.document_registry.get_routes(doc_id, signature) is not None:
+            return False
+        names = list(queries)
+        query_embeddings = self.query_embedding_function.embed_documents([queries[name] for name in names])
+        hits = self._search_chunk_ids(query_embeddings, self._fetch_k(settings.RETRIEVER_K), doc_id)
+        self.document_registry.set_routes(doc_id, signature, dict(zip(names, hits)))
+        logger.info(f"Routed {len(names)} attributes for document {doc_id[:12]}")
+        return True
+
+    def retrieve_routed(self, doc_id: str, names: List[str], queries: Dict[str, str],
+                        k: Optional[int] = None, score_threshold: Optional[float] = None,
+                        min_k: Optional[int] = None) -> Optional[List[List[Document]]]:
+        """
+        Retrieve chunks for attributes from the document's precomputed routes.
+        
+        Looks chunks up by ID, with no embedding or vector search. Results are
+        expanded and cut off by score like those of retrieve_for_queries.
+        
+        Args:
+            doc_id: Indexed document
+            names: Attributes to retrieve for
+            queries: Retrieval query per attribute name, as passed to ensure_attribute_routes
+            k: Maximum results per attribute (defaults to RETRIEVER_K)
+            score_threshold: Minimum cosine similarity (defaults to RETRIEVER_SCORE_THRESHOLD)
+            min_k: Results kept regardless of score (defaults to RETRIEVER_MIN_K)
+            
+        Returns:
+            One list of Documents per name, or None if the routes are missing or stale
+        """
+        routes = self.document_registry.get_routes(doc_id, self.attribute_routing_signature(queries))
+        if routes is None or any(name not in routes for name in names):
+            return None
+        chunk_ids = list(dict.fromkeys(chunk_id for name in names for chunk_id, _ in routes[name]))
+        chunks = self._get_chunks(doc_id, chunk_ids)
+        if len(chunks) < len(chunk_ids):
+            logger.warning(f"Routes of document {doc_id[:12]} point at missing chunks, ignoring them")
+            return None
+        hits = [
+            [
+                Document(page_content=chunks[chunk_id].page_content,
+                         metadata={**chunks[chunk_id].metadata, "score": score})
+                for chunk_id, score in routes[name]
+            ]
+            for name in names
+        ]
+        return self._select_hits(hits, k or settings.RETRIEVER_K, score_threshold, min_k)
+
+    def _search_chunk_ids(self, query_embeddings: List[List[float]], n_results: int,
+                          doc_id: str) -> List[List[Tuple[str, float]]]:
+        """Rank one document's chunks per query, returning (chunk ID, cosine similarity) pairs."""
+        index = self._get_document_index(doc_id) if settings.EXACT_INDEX_ENABLED else None
+        if index is not None and index.ids is not None:
+            return index.search_ids(query_embeddings, n_results)
+        results = self.vector_store._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where={"doc_id": doc_id},
+            include=["distances"]
+        )
+        space = (self.vector_store._collection.metadata or {}).get("hnsw:space", "l2")
+        return [
+            [(chunk_id, distance_to_similarity(distance, space)) for chunk_id, distance in zip(ids, distances)]
+            for ids, distances in zip(results["ids"], results["distances"])
+        ]
+
+    def _get_chunks(self, doc_id: str, chunk_ids: List[str]) -> Dict[str, Document]:
+        """Look chunks up by ID, from the document's in-memory index if loaded, else from Chroma."""
+        with self._index_lock:
+            index = self._document_indexes.get(doc_id)
+        if index is not None:
+            chunks = index.get_documents(chunk_ids)
+            if len(chunks) == len(chunk_ids):
+                return chunks
+        stored = self.vector_store._collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+        return {
+            chunk_id: Document(page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+
+    def _search_collection(self, query_embeddings: List[List[float]], n_results: int,
+                           doc_id: Optional[str] = None) -> List[List[Document]]:
+        """Query the Chroma collection, returning scored Documents per query."""
+        results = self.vector_store._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where={"doc_id": doc_id} if doc_id else None,
+            include=["documents", "metadatas", "distances"]
+        )
+        space = (self.vector_store._collection.metadata or {}).get("hnsw:space", "l2")
+        return [
+            [
+                Document(
+                    page_content=text,
+                    metadata={**(metadata or {}), "score": distance_to_similarity(distance, space)}
+                )
+                for text, metadata, distance in zip(texts, metadatas, distances)
+            ]
+            for texts, metadatas, distances in zip(results["documents"], results["metadatas"], results["distances"])
+        ]
+
+    def _search_flat_store(self, query_embeddings: List[List[float]], n_results: int) -> List[List[Document]]:
+        """Exact search over the whole corpus in the memory-mapped flat store."""
+        return [
+            [
+                Document(page_content=hit["document"] or "", metadata={**hit["metadata"], "score": hit["score"]})
+                for hit in query_hits
+            ]
+            for query_hits in self.flat_store.search(query_embeddings, n_results)
+        ]
+
+    def _get_document_index(self, doc_id: str) -> Optional[ExactIndex]:
+        """
+        Return the in-memory index of one document's chunks, loading it from Chroma if needed.
+        
+        Returns None for documents with more than EXACT_INDEX_MAX_CHUNKS chunks
+        or with no stored chunks, which are searched in the collection instead.
+        """
+        with self._index_lock:
+            if doc_id in self._oversized_documents:
+                return None
+            index = self._document_indexes.get(doc_id)
+            if index is not None:
+                self._document_indexes.move_to_end(doc_id)
+                return index
+        
+        # Load under the write lock, so a document being re-indexed or deleted
+        # is never read half-written
+        with self._write_lock:
+            with self._index_lock:
+                index = self._document_indexes.get(doc_id)
+                if index is not None or doc_id in self._oversized_documents:
+                    return index
+            
+            # Registered documents know their size, so large ones are never fetched
+            entry = self.document_registry.get(doc_id)
+            if entry is not None and entry["chunk_count"] > settings.EXACT_INDEX_MAX_CHUNKS:
+                with self._index_lock:
+                    self._oversized_documents.add(doc_id)
+                return None
+            
+            stored = self.vector_store._collection.get(
+                where={"doc_id": doc_id}, include=["embeddings", "documents", "metadatas"]
+            )
+            if not stored["ids"]:
+                # Unknown or emptied documents are not cached
+                return None
+            if len(stored["ids"]) > settings.EXACT_INDEX_MAX_CHUNKS:
+                with self._index_lock:
+                    self._oversized_documents.add(doc_id)
+                return None
+            index = ExactIndex(
+                stored["embeddings"],
+                [Document(page_content=text, metadata=metadata or {})
+                 for text, metadata in zip(stored["documents"], stored["metadatas"])],
+                stored["ids"]
+            )
+            self._cache_document_index(doc_id, index)
+        logger.debug(f"Loaded in-memory index for document {doc_id[:12]} with {len(index)} chunks")
+        return index
+
+    def _cache_document_index(self, doc_id: str, index: ExactIndex) -> None:
+        if len(index) > settings.EXACT_INDEX_MAX_CHUNKS:
+            with self._index_lock:
+                self._oversized_documents.add(doc_id)
+            return
+        with self._index_lock:
+            self._document_indexes[doc_id] = index
+            self._document_indexes.move_to_end(doc_id)
+            while len(self._document_indexes) > settings.EXACT_INDEX_MAX_DOCUMENTS:
+                self._document_indexes.popitem(last=False)
+
+    def _forget_document_indexes(self, doc_ids: Iterable[str]) -> None:
+        """Drop cached indexes and size verdicts of documents whose chunks changed."""
+        with self._index_lock:
+            for doc_id in doc_ids:
+                self._document_indexes.pop(doc_id, None)
+                self._oversized_documents.discard(doc_id)
+
+    def _expand_to_parents(self, hits: List[List[Document]], k: int) -> List[List[Document]]:
+        """Replace chunks by their parent passages, keeping the first k distinct results per query."""
+        parent_ids = [
+            doc.metadata[PARENT_ID_KEY] for query_hits in hits for doc in query_hits
+            if doc.metadata.get(PARENT_ID_KEY)
+        ]
+        passages = self.document_registry.get_passages(parent_ids) if parent_ids else {}
+        
+        expanded: List[List[Document]] = []
+        for query_hits in hits:
+            results: List[Document] = []
+            seen = set()
+            for doc in query_hits:
+                parent_id = doc.metadata.get(PARENT_ID_KEY)
+                key = parent_id if parent_id in passages else doc.page_content
+                if key in seen:
+                    continue
+                seen.add(key)
+                if parent_id in passages:
+                    # Hits are ranked, so the passage keeps the score of its best unit
+                    doc = Document(page_content=passages[parent_id], metadata=doc.metadata)
+                results.append(doc)
+                if len(results) == k:
+                    break
+            expanded.append(results)
+        return expanded
+
+    def close(self) -> None:
+        """Stop the embedding batcher and release the embedding cache, document registry and flat store."""
+        if self.embedding_batcher is not None:
+            self.embedding_batcher.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        self.document_registry.close()
+        if self.flat_store is not None:
+            self.flat_store.close()
+
     def search(self, query: str, k: int = 5):
         try:
             results = self.vector_store.similarity_search(query, k=k)
@@ -79,7 +677,14 @@ class VectorStore:
 
     def delete_collection(self):
         try:
-            self.vector_store.delete_collection()
+            with self._write_lock:
+                self.vector_store.delete_collection()
+                self.document_registry.clear()
+                if self.flat_store is not None:
+                    self.flat_store.clear()
+                with self._index_lock:
+                    self._document_indexes.clear()
+                    self._oversized_documents.clear()
             logger.info("Successfully deleted vector store collection")
         except Exception as e:
             logger.error(f"Failed to delete vector store collection: {e}")
@@ -91,7 +696,16 @@ class VectorStore:
             return {
                 "count": collection.count(),
                 "name": collection.name,
-                "metadata": collection.metadata
+                "metadata": collection.metadata,
+                "embedding_backend": self.embedding_backend,
+                "embedding_cache": self.embedding_cache.stats() if self.embedding_cache else None,
+                "embedding_batcher": self.embedding_batcher.stats() if self.embedding_batcher else None,
+                "document_indexes": {
+                    "documents": len(self._document_indexes),
+                    "chunks": sum(len(index) for index in self._document_indexes.values()),
+                    "bytes": sum(index.nbytes for index in self._document_indexes.values())
+                },
+                "flat_store": self.flat_store.stats() if self.flat_store else None
             }
         except Exception as e:
             logger.error(f"Failed to get collection stats: {e}")
@@ -116,6 +730,13 @@ class VectorStore:
             logger.warning("No texts provided for embedding creation")
             return []
 
+        if settings.BULK_EMBEDDING_WORKERS > 0 and len(texts) >= settings.BULK_EMBEDDING_MIN_TEXTS:
+            try:
+                return await asyncio.to_thread(self.bulk_add_texts, texts, metadata)
+            except Exception as e:
+                logger.error(f"Failed to bulk create embeddings: {e}")
+                return []
+
         try:
             # Create documents with metadata if provided
             documents = [
@@ -125,14 +746,14 @@ class VectorStore:
 
             # Add documents to vector store
             if self.vector_store:
-                self.vector_store.add_documents(documents)
-                
-                # Persist if configured
-                if settings.CHROMA_PERSIST_DIRECTORY:
-                    self.vector_store.persist()
+                ids = await asyncio.to_thread(self._add_documents, documents)
+                with self._write_lock:
+                    # Persist if configured
+                    if settings.CHROMA_PERSIST_DIRECTORY:
+                        self.vector_store.persist()
                 
                 logger.success(f"Created embeddings for {len(texts)} texts")
-                return [str(i) for i in range(len(texts))]  # Return placeholder IDs
+                return ids
             else:
                 logger.error("Vector store not initialized")
                 return []
@@ -140,6 +761,52 @@ class VectorStore:
             logger.error(f"Failed to create embeddings: {e}")
             return []
 
+    def bulk_add_texts(
+        self,
+        texts: List[str],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        workers: Optional[int] = None
+    ) -> List[str]:
+        """
+        Embed many texts in sharded worker processes and add them to the collection in order.
+        
+        Texts already in the embedding cache are not re-embedded. The worker
+        pool is started for this call and stopped afterwards.
+        
+        Args:
+            texts: Texts to embed and store
+            metadata: Optional metadata per text
+            workers: Worker processes (defaults to BULK_EMBEDDING_WORKERS)
+            
+        Returns:
+            IDs of the stored texts, in input order
+        """
+        sharded = ShardedEmbeddings(
+            workers=workers or settings.BULK_EMBEDDING_WORKERS,
+            threads_per_worker=settings.BULK_EMBEDDING_THREADS_PER_WORKER,
+            shard_size=settings.BULK_EMBEDDING_SHARD_SIZE,
+            backend=self.embedding_backend
+        )
+        embeddings = sharded
+        if self.embedding_cache is not None:
+            embeddings = CachedEmbeddings(
+                sharded, self.embedding_cache,
+                model_name=self._cache_model_name(), normalize=settings.NORMALIZE_EMBEDDINGS
+            )
+        try:
+            vectors = embeddings.embed_documents(texts)
+        finally:
+            sharded.close()
+        
+        metadatas = metadata or [{}] * len(texts)
+        ids = [str(uuid.uuid4()) for _ in texts]
+        with self._write_lock:
+            self._add_to_collection(ids, texts, vectors, metadatas)
+            if settings.CHROMA_PERSIST_DIRECTORY:
+                self.vector_store.persist()
+        logger.success(f"Bulk stored {len(texts)} texts")
+        return ids
+
     async def search_similar(
         self,
         query: str,
@@ -167,20 +834,15 @@ class VectorStore:
             # Use configured k value if not specified
             k = k or settings.RETRIEVER_K
             
-            # Create retriever with search parameters
-            retriever = self.vector_store.as_retriever(
-                search_kwargs={"k": k}
-            )
-            
-            # Perform search
-            results = retriever.get_relevant_documents(query)
+            # Perform scored search
+            results = (await asyncio.to_thread(self.retrieve_for_queries, [query], None, k))[0]
             
             # Format results
             formatted_results = [
                 {
                     "text": doc.page_content,
-                    "metadata": doc.metadata,
-                    "score": 1.0  # Placeholder score
+                    "metadata": {key: value for key, value in doc.metadata.items() if key != "score"},
+                    "score": doc.metadata["score"]
                 }
                 for doc in results
             ]
@@ -207,12 +869,23 @@ class VectorStore:
 
         try:
             if self.vector_store:
-                # Delete documents from vector store
-                self.vector_store.delete(ids)
-                
-                # Persist if configured
-                if settings.CHROMA_PERSIST_DIRECTORY:
-                    self.vector_store.persist()
+                with self._write_lock:
+                    # Note the documents the chunks belong to, so their cached indexes can be dropped
+                    stored = self.vector_store._collection.get(ids=ids, include=["metadatas"])
+                    doc_ids = {metadata["doc_id"] for metadata in stored["metadatas"] if metadata and metadata.get("doc_id")}
+                    
+                    # Delete documents from vector store
+                    self.vector_store.delete(ids)
+                    if self.flat_store is not None:
+                        self.flat_store.delete(ids)
+                    self._forget_document_indexes(doc_ids)
+                    # A partly deleted document must be re-indexed rather than reused
+                    for doc_id in doc_ids:
+                        self.document_registry.remove(doc_id)
+                    
+                    # Persist if configured
+                    if settings.CHROMA_PERSIST_DIRECTORY:
+                        self.vector_store.persist()
                 
                 logger.success(f"Deleted {len(ids)} embeddings")
                 return True
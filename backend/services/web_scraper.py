@@ -6,9 +6,19 @@ import re
 
 class WebScraper:
     def __init__(self):
+        self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
+        # The single page is shared by every caller, so navigations are serialized
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Created lazily so it binds to the serving event loop; the scraper
+        # itself may be built in a worker thread during startup
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
 
     async def __aenter__(self):
         await self.initialize()
@@ -20,8 +30,8 @@ class WebScraper:
     async def initialize(self):
         """Initialize the browser and context."""
         try:
-            playwright = await async_playwright().start()
-            self.browser = await playwright.chromium.launch(headless=True)
+            self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(headless=True)
             self.context = await self.browser.new_context()
             self.page = await self.context.new_page()
         except Exception as e:
@@ -37,8 +47,15 @@ class WebScraper:
                 await self.context.close()
             if self.browser:
                 await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
+        finally:
+            self.page = None
+            self.context = None
+            self.browser = None
+            self.playwright = None
 
     async def scrape_website_table_html(self, part_number: str) -> Optional[str]:
         """
@@ -50,6 +67,11 @@ class WebScraper:
         Returns:
             Optional[str]: The scraped table HTML if found, None otherwise
         """
+        async with self._get_lock():
+            return await self._scrape_website_table_html(part_number)
+
+    async def _scrape_website_table_html(self, part_number: str) -> Optional[str]:
+        """Scrape table HTML using the shared page; callers must hold self._lock."""
         try:
             # Initialize if not already done
             if not self.page:
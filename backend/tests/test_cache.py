@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from utils.cache import AsyncTTLCache
+
+def test_concurrent_callers_share_one_load():
+    async def main():
+        cache = AsyncTTLCache(max_entries=8, ttl_seconds=60)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        values = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(3)))
+        assert values == ["value"] * 3
+        assert await cache.get_or_load("key", loader) == "value"
+        return cache, calls
+
+    cache, calls = asyncio.run(main())
+    assert len(calls) == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 2, 1)
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def main():
+        cache = AsyncTTLCache(max_entries=8, ttl_seconds=60)
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.ensure_future(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == "value"
+        assert cache.get("key") == (True, "value")
+
+    asyncio.run(main())
+
+def test_failed_load_is_not_cached():
+    async def main():
+        cache = AsyncTTLCache(max_entries=8, ttl_seconds=60)
+
+        async def failing():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await cache.get_or_load("key", failing)
+        assert cache.get("key") == (False, None)
+
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+from langchain.docstore.document import Document
+
+from services.context_packer import ContextPacker
+
+def count_words(text):
+    return len(text.split())
+
+def header(i, doc):
+    return ("\n\n---\n\n" if i else "") + f"Chunk {i + 1} from '{doc.metadata['source']}':\n"
+
+def doc(text, score):
+    return Document(page_content=text, metadata={"source": "a.pdf", "score": score})
+
+def test_keeps_the_ranked_order():
+    docs = [
+        doc("Height is twelve millimetres overall.", 0.9),
+        doc("Colour of the housing is black.", 0.2),
+        doc("Width is twenty millimetres overall.", 0.8),
+    ]
+    result = ContextPacker(count_words).pack(docs, 100)
+    assert [d.page_content for d in result.documents] == [d.page_content for d in docs]
+
+def test_budget_includes_headers():
+    docs = [doc(" ".join(["word"] * 10) + ".", 0.9) for _ in range(2)]
+    docs[1].page_content = " ".join(["other"] * 10) + "."
+    budget = 18
+    result = ContextPacker(count_words).pack(docs, budget, chunk_header=header)
+    packed = "".join(header(i, d) + d.page_content for i, d in enumerate(result.documents))
+    assert count_words(packed) <= budget
+    assert result.tokens_after == count_words(packed)
+
+def test_truncated_first_chunk_fits():
+    docs = [doc(" ".join(["word"] * 50) + ".", 0.9)]
+    result = ContextPacker(count_words).pack(docs, 10, chunk_header=header)
+    packed = header(0, result.documents[0]) + result.documents[0].page_content
+    assert 0 < count_words(packed) <= 10
@@ -0,0 +1,62 @@
+import numpy as np
+
+from services.flat_store import FlatVectorStore
+
+DIMENSION = 8
+
+def unit_vectors(count, seed):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_search_and_delete(tmp_path):
+    store = FlatVectorStore(str(tmp_path), dtype="float32")
+    vectors = unit_vectors(3, 0)
+    store.append(["a", "b", "c"], vectors, ["A", "B", "C"], [{"n": 0}, {"n": 1}, {"n": 2}])
+    hit = store.search(vectors[1:2], 1)[0][0]
+    assert (hit["id"], hit["document"], hit["metadata"]) == ("b", "B", {"n": 1})
+    assert abs(hit["score"] - 1.0) < 1e-5
+
+    store.delete(["b"])
+    assert "b" not in [hit["id"] for hit in store.search(vectors[1:2], 3)[0]]
+    store.close()
+
+def test_search_interleaved_with_rebuild(tmp_path):
+    store = FlatVectorStore(str(tmp_path), dtype="float32")
+    old_vectors = unit_vectors(4, 1)
+    store.append(["old0", "old1", "old2", "old3"], old_vectors, ["0", "1", "2", "3"])
+    store.delete(["old0", "old1"])
+
+    # The rebuild compacts the store into different rows after the search has
+    # scanned the old mapping but before it looks the hits up
+    new_vectors = unit_vectors(4, 2)
+    expected = dict(zip(["new0", "new1", "new2", "new3"], new_vectors))
+    search_view = store._search_view
+    calls = []
+
+    def search_then_rebuild(*args):
+        result = search_view(*args)
+        if not calls:
+            store.rebuild([(list(expected), new_vectors, list(expected), None)])
+        calls.append(result)
+        return result
+
+    store._search_view = search_then_rebuild
+    query = old_vectors[2:3]
+    hits = store.search(query, 4)[0]
+
+    assert len(calls) == 2
+    assert [hit["id"] for hit in hits] and all(hit["id"] in expected for hit in hits)
+    for hit in hits:
+        assert abs(hit["score"] - float(expected[hit["id"]] @ query[0])) < 1e-5
+    store.close()
+
+def test_clear_keeps_old_mapping_readable(tmp_path):
+    store = FlatVectorStore(str(tmp_path), dtype="float32")
+    store.append(["a"], unit_vectors(1, 3))
+    view = store._current_view()[0]
+    other = FlatVectorStore(str(tmp_path), dtype="float32")
+    other.clear()
+    assert np.isfinite(np.asarray(view)).all()
+    assert store.search(unit_vectors(1, 3), 1) == [[]]
+    other.close()
+    store.close()
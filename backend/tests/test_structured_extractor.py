@@ -0,0 +1,67 @@
+from services.structured_extractor import Field, StructuredExtractor, parse_fields
+
+extractor = StructuredExtractor()
+
+def pairs(markdown):
+    return [(field.key, field.value) for field in parse_fields(markdown, 1)]
+
+def test_bold_pairs():
+    assert pairs("**Colour:** Black **Material:** PA66") == [("Colour", "Black"), ("Material", "PA66")]
+
+def test_two_column_table_with_pair_in_header():
+    markdown = "| Colour | Black (RAL 9005) |\n|---|---|\n| Material | PA66 GF30 |"
+    assert pairs(markdown) == [("Colour", "Black (RAL 9005)"), ("Material", "PA66 GF30")]
+
+def test_two_column_table_is_not_read_horizontally():
+    markdown = "| Colour | Black |\n|---|---|\n| Material | PA66 |"
+    fields = parse_fields(markdown, 1)
+    assert ("Colour", "Material") not in [(field.key, field.value) for field in fields]
+    assert extractor.extract(fields, ["Colour"]) == {"Colour": "Black"}
+
+def test_two_column_table_with_value_header():
+    markdown = "| Property | Value |\n|---|---|\n| Height [mm] | 12.5 |\n| Width | 20 mm |"
+    fields = parse_fields(markdown, 1)
+    assert pairs(markdown) == [("Height [mm]", "12.5"), ("Width", "20 mm")]
+    assert extractor.extract(fields, ["Height [MM]", "Width [MM]"]) == {"Height [MM]": "12.5", "Width [MM]": "20"}
+
+def test_horizontal_table():
+    markdown = "| Height | Width | Length |\n|---|---|---|\n| 10 mm | 2 cm | 1 in |"
+    fields = parse_fields(markdown, 1)
+    assert extractor.extract(fields, ["Height [MM]", "Width [MM]", "Length [MM]"]) == {
+        "Height [MM]": "10", "Width [MM]": "20", "Length [MM]": "25.4"
+    }
+
+def test_min_max_columns_with_unit_column():
+    markdown = (
+        "| Parameter | Min | Max | Unit |\n|---|---|---|---|\n"
+        "| Operating temperature | -40 | 125 | °C |"
+    )
+    fields = parse_fields(markdown, 1)
+    assert extractor.extract(fields, ["Min. Working Temperature [°C]", "Max. Working Temperature [°C]"]) == {
+        "Min. Working Temperature [°C]": "-40", "Max. Working Temperature [°C]": "125"
+    }
+
+def test_temperature_range():
+    fields = [Field("Operating temperature", "-40 °C to +85 °C", 1)]
+    assert extractor.extract(fields, ["Min. Working Temperature [°C]", "Max. Working Temperature [°C]"]) == {
+        "Min. Working Temperature [°C]": "-40", "Max. Working Temperature [°C]": "85"
+    }
+
+def test_conflicting_values_are_left_to_the_llm():
+    fields = [Field("Height", "10 mm", 1), Field("Height", "12 mm", 2)]
+    assert extractor.extract(fields, ["Height [MM]"]) == {}
+
+def test_counts():
+    fields = [Field("Number of ways", "12-way", 1), Field("Rows", "2", 1)]
+    assert extractor.extract(fields, ["Number of Cavities", "Number of Rows"]) == {
+        "Number of Cavities": "12", "Number of Rows": "2"
+    }
+
+def test_colour():
+    fields = [Field("Colour", "Black (RAL 9005)", 1), Field("Housing color", "black", 2)]
+    assert extractor.extract(fields, ["Colour"]) == {"Colour": "Black"}
+    assert extractor.extract([Field("Colour", "Light grey", 1)], ["Colour"]) == {"Colour": "Light grey"}
+
+def test_colour_placeholders_are_left_to_the_llm():
+    for value in ("Not specified", "n/a", "See drawing", "Various", "On request", "Any", "PA66"):
+        assert extractor.extract([Field("Colour", value, 1)], ["Colour"]) == {}
@@ -0,0 +1,152 @@
+"""
+In-process caching helpers for the backend.
+This module contains small, dependency-free cache primitives shared by services.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class AsyncTTLCache:
+    """
+    Size-bounded LRU cache with per-entry expiry and single-flight loading.
+
+    Concurrent callers asking for the same missing key share one load instead
+    of each running the loader. The load runs as its own task, so a caller
+    that is cancelled (e.g. on client disconnect) does not cancel it for the
+    others.
+
+    Example:
+        cache = AsyncTTLCache(max_entries=128, ttl_seconds=600)
+        value = await cache.get_or_load("key", lambda: fetch("key"))
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept before evicting the least recently used
+            ttl_seconds: Default lifetime of an entry in seconds
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # Callers that joined a load already in flight
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a key.
+
+        Returns:
+            Tuple of (found, value); expired entries count as not found
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entries beyond max_entries.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl_seconds: Optional lifetime overriding the default TTL
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            logger.debug(f"Evicted cache entry: {evicted_key}")
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove a key from the cache if present."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None
+    ) -> Any:
+        """
+        Return the cached value for key, loading it once if missing.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument coroutine factory producing the value
+            ttl_for: Optional function choosing a TTL from the loaded value
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader, ttl_for))
+            task.add_done_callback(self._retrieve_exception)
+            self._in_flight[key] = task
+        # Cancelling this caller leaves the shared load running for the others
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_for: Optional[Callable[[Any], Optional[float]]]
+    ) -> Any:
+        try:
+            value = await loader()
+            self.set(key, value, ttl_for(value) if ttl_for else None)
+            return value
+        finally:
+            self._in_flight.pop(key, None)
+
+    @staticmethod
+    def _retrieve_exception(task: "asyncio.Task[Any]") -> None:
+        # Mark retrieved so a failure whose callers all went away is not reported as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/coalesced counters and current size."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
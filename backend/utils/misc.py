@@ -3,11 +3,12 @@ Miscellaneous utility functions for the backend.
 This module contains reusable helper functions that are framework-agnostic.
 """
 
+import asyncio
 import logging
 import time
 import os
 import hashlib
-from typing import Any, Callable, Optional, TypeVar, Union
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar, Union
 from functools import wraps
 from datetime import datetime
 
@@ -79,6 +80,27 @@ def generate_id(content: str) -> str:
     """
     return hashlib.sha256(content.encode()).hexdigest()
 
+def generate_file_id(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Generate an ID for a file's contents using SHA-256 hashing.
+    
+    Args:
+        file_path: Path to the file
+        block_size: Number of bytes read at a time
+        
+    Returns:
+        SHA-256 hash of the file contents
+        
+    Example:
+        >>> generate_file_id("datasheet.pdf")
+        '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 def format_timestamp() -> str:
     """
     Get current timestamp in ISO format.
@@ -166,6 +188,55 @@ def chunk_list(lst: list, chunk_size: int) -> list:
     """
     return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
 
+def distance_to_similarity(distance: float, space: str = "l2") -> float:
+    """
+    Convert a Chroma distance into a cosine similarity.
+    
+    Chroma returns 1 - cos for the "cosine" and "ip" spaces (with unit
+    vectors), and the squared Euclidean distance, 2 - 2cos for unit
+    vectors, for "l2".
+    
+    Args:
+        distance: Distance returned by a Chroma query
+        space: The collection's hnsw:space
+        
+    Returns:
+        Cosine similarity, 1.0 for identical vectors
+        
+    Example:
+        >>> distance_to_similarity(0.5, "l2")
+        0.75
+    """
+    if space == "l2":
+        return 1.0 - distance / 2.0
+    return 1.0 - distance
+
+def select_by_score(scored: List[Tuple[T, float]], threshold: float, min_k: int, max_k: int) -> List[Tuple[T, float]]:
+    """
+    Keep the best-scoring items above a threshold, within a min/max count.
+    
+    Items are ranked by score; those below the threshold are dropped unless
+    they are needed to reach min_k, and at most max_k are kept.
+    
+    Args:
+        scored: (item, score) pairs
+        threshold: Minimum score to keep an item beyond the first min_k
+        min_k: Items kept regardless of score
+        max_k: Maximum number of items kept
+        
+    Returns:
+        (item, score) pairs, best first
+        
+    Example:
+        >>> select_by_score([("a", 0.9), ("b", 0.2), ("c", 0.5)], 0.4, 1, 3)
+        [('a', 0.9), ('c', 0.5)]
+    """
+    ranked = sorted(scored, key=lambda pair: pair[1], reverse=True)
+    return [
+        pair for i, pair in enumerate(ranked[:max_k])
+        if i < min_k or pair[1] >= threshold
+    ]
+
 def format_file_size(size_bytes: int) -> str:
     """
     Format file size in bytes to human readable format.
@@ -184,4 +255,37 @@ def format_file_size(size_bytes: int) -> str:
         if size_bytes < 1024.0:
             return f"{size_bytes:.1f} {unit}"
         size_bytes /= 1024.0
-    return f"{size_bytes:.1f} PB" 
\ No newline at end of file
+    return f"{size_bytes:.1f} PB"
+
+async def gather_with_concurrency(
+    limit: int,
+    awaitables: Iterable[Awaitable[T]],
+    return_exceptions: bool = False
+) -> List[Union[T, BaseException]]:
+    """
+    Await a collection of awaitables with at most `limit` running at once.
+    
+    Results are returned in the same order as the input, regardless of
+    completion order, mirroring asyncio.gather.
+    
+    Args:
+        limit: Maximum number of awaitables in flight (values < 1 are treated as 1)
+        awaitables: Awaitables to run
+        return_exceptions: If True, exceptions are returned in place of results
+        
+    Returns:
+        List of results in input order
+        
+    Example:
+        >>> await gather_with_concurrency(2, [fetch(u) for u in urls])
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(awaitable: Awaitable[T]) -> T:
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(
+        *(_run(a) for a in awaitables),
+        return_exceptions=return_exceptions
+    )
@@ -0,0 +1,149 @@
+"""
+Upload ingestion helpers for the API routers.
+Streams uploaded files to unique temporary files with size and type checks,
+under a global budget of upload bytes being processed at once.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from config import get_settings
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF-"
+
+class SavedUpload(NamedTuple):
+    """An upload streamed to a temporary file."""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+class UploadBudget:
+    """
+    Global budget of upload bytes in flight.
+
+    Each upload reserves its (expected) size before it is streamed and releases
+    it once processing is done. When the budget is used up, new uploads wait
+    instead of piling more data onto disk and into processing. A single upload
+    larger than the remaining budget is still admitted once nothing else is in
+    flight, so it cannot wait forever.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the serving event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, num_bytes: int) -> None:
+        """Wait until num_bytes fit in the budget, then reserve them."""
+        condition = self._get_condition()
+        async with condition:
+            if self.in_flight and self.in_flight + num_bytes > self.max_bytes:
+                logger.info(f"Upload waiting for budget: {self.in_flight} of {self.max_bytes} bytes in flight")
+            await condition.wait_for(
+                lambda: self.in_flight == 0 or self.in_flight + num_bytes <= self.max_bytes
+            )
+            self.in_flight += num_bytes
+
+    async def release(self, num_bytes: int) -> None:
+        """Return num_bytes to the budget and wake waiting uploads."""
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight = max(0, self.in_flight - num_bytes)
+            condition.notify_all()
+
+@lru_cache()
+def get_upload_budget() -> UploadBudget:
+    """Get the process-wide upload budget."""
+    return UploadBudget(get_settings().UPLOAD_INFLIGHT_BYTES_BUDGET)
+
+@asynccontextmanager
+async def spooled_pdf_upload(file: UploadFile) -> AsyncIterator[SavedUpload]:
+    """
+    Stream an uploaded PDF to a unique temporary file and remove it afterwards.
+
+    The body is copied in UPLOAD_CHUNK_SIZE chunks, MAX_FILE_SIZE is enforced
+    while streaming, and the first bytes must carry the %PDF- header. The
+    upload's bytes count against the global in-flight budget until the
+    context exits.
+
+    Args:
+        file: Uploaded file
+
+    Yields:
+        SavedUpload with the temporary path, original filename, size and SHA-256
+
+    Raises:
+        HTTPException: 400 for a non-PDF upload, 413 if it exceeds MAX_FILE_SIZE
+
+    Example:
+        async with spooled_pdf_upload(file) as upload:
+            docs = await pdf_service.process_single_pdf(upload.path, upload.filename)
+    """
+    settings = get_settings()
+    filename = os.path.basename(file.filename or "upload.pdf")
+    if not filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+
+    max_size = settings.MAX_FILE_SIZE
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File size exceeds maximum limit of {max_size/1024/1024}MB"
+    )
+    if file.size is not None and file.size > max_size:
+        raise too_large
+
+    budget = get_upload_budget()
+    reserved = file.size if file.size is not None else max_size
+    await budget.acquire(reserved)
+
+    temp_path = None
+    try:
+        fd, temp_path = tempfile.mkstemp(prefix="upload_", suffix=".pdf", dir=settings.UPLOAD_TEMP_DIR)
+        digest = hashlib.sha256()
+        size = 0
+        header = b""
+        with os.fdopen(fd, "wb") as temp_file:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise too_large
+                if len(header) < len(PDF_MAGIC):
+                    header += chunk[:len(PDF_MAGIC) - len(header)]
+                    if len(header) == len(PDF_MAGIC) and header != PDF_MAGIC:
+                        raise HTTPException(status_code=400, detail="Uploaded file is not a valid PDF")
+                digest.update(chunk)
+                await asyncio.to_thread(temp_file.write, chunk)
+
+        if header != PDF_MAGIC:
+            raise HTTPException(status_code=400, detail="Uploaded file is not a valid PDF")
+
+        logger.info(f"Saved upload {filename} ({size} bytes) to {temp_path}")
+        yield SavedUpload(path=temp_path, filename=filename, size=size, sha256=digest.hexdigest())
+    finally:
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError as e:
+                logger.warning(f"Could not remove temporary upload {temp_path}: {e}")
+        await budget.release(reserved)